@@ -0,0 +1,98 @@
+"""
+连接池基准测试 - 对比「每个账号一个 ClientSession」与「所有账号共用连接池」
+
+在本地启动一个模拟心跳接口，N 个账号每轮同时发送一次心跳，统计每次心跳新建的 socket 数。
+线上为 HTTPS，每个新建 socket 都对应一次 TLS 握手，因此 socket 数即握手数。
+
+用法: python benchmarks/bench_connection_pool.py [账号数N] [心跳轮数] [心跳间隔秒]
+心跳间隔超过 aiohttp 默认的 15 秒 keep-alive 时，独立 ClientSession 每次心跳都会重新握手
+"""
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import ClientSession, ClientTimeout, web
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import pool  # noqa: E402
+
+
+async def _start_server():
+    async def heartbeat(request):
+        await request.read()
+        return web.json_response({"code": 0, "message": "0", "data": {"heartbeat_interval": 30}})
+
+    app = web.Application()
+    app.router.add_post("/xlive/data-interface/v1/heartbeat/mobileHeartBeat", heartbeat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/xlive/data-interface/v1/heartbeat/mobileHeartBeat"
+
+
+async def _run(sessions, url: str, accounts: int, rounds: int, interval: float):
+    async def _beat(session):
+        async with session.post(url, data={"seq_id": "1"}) as resp:
+            await resp.json()
+
+    for key in pool.pool_stats:
+        pool.pool_stats[key] = 0
+    start = time.perf_counter()
+    for index in range(rounds):
+        await asyncio.gather(*[_beat(sessions[i % len(sessions)]) for i in range(accounts)])
+        if interval and index < rounds - 1:
+            await asyncio.sleep(interval)
+    elapsed = time.perf_counter() - start
+    beats = accounts * rounds
+    stats = dict(pool.pool_stats)
+    return {
+        "heartbeats": beats,
+        "sockets": stats["connections_created"],
+        "sockets_per_heartbeat": stats["connections_created"] / beats,
+        "reused": stats["connections_reused"],
+        "dns_lookups": stats["dns_lookups"],
+        "elapsed": elapsed,
+    }
+
+
+def _report(title: str, result: dict):
+    print(f"\n[{title}]")
+    print(f"  心跳次数: {result['heartbeats']}")
+    print(f"  新建 socket / TLS 握手: {result['sockets']}")
+    print(f"  每次心跳新建 socket: {result['sockets_per_heartbeat']:.4f}")
+    print(f"  复用连接次数: {result['reused']}")
+    print(f"  DNS 解析次数: {result['dns_lookups']}")
+    print(f"  耗时: {result['elapsed']:.2f}s")
+
+
+async def main(accounts: int, rounds: int, interval: float):
+    runner, url = await _start_server()
+    try:
+        # 旧方式：每个账号一个 ClientSession，各自独立的连接池
+        sessions = [
+            ClientSession(
+                timeout=ClientTimeout(total=3),
+                trace_configs=[pool._build_trace_config()],
+            )
+            for _ in range(accounts)
+        ]
+        _report(f"每账号独立 ClientSession x{accounts}", await _run(sessions, url, accounts, rounds, interval))
+        await asyncio.gather(*[s.close() for s in sessions])
+
+        # 新方式：所有账号共用一个连接池
+        shared = pool.create_session()
+        _report("共享连接池", await _run([shared], url, accounts, rounds, interval))
+        await shared.close()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    r = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    i = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+    asyncio.run(main(n, r, i))
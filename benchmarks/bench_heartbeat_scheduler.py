@@ -0,0 +1,65 @@
+"""
+心跳调度基准测试 - 对比每个心跳流各自 asyncio.sleep 与全局调度器
+
+模拟 N 个同时开始的心跳流（最坏情况：所有流相位相同），统计第一次心跳之后的突发峰值和迟到时长。
+
+用法: python benchmarks/bench_heartbeat_scheduler.py [心跳流数N] [心跳间隔秒] [轮数]
+"""
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scheduler import HeartbeatScheduler  # noqa: E402
+
+
+async def _run(streams: int, interval: float, rounds: int, scheduler=None):
+    loop = asyncio.get_running_loop()
+    sends = Counter()  # 以 100ms 为粒度统计发送次数
+    lateness = []
+
+    async def _stream():
+        for index in range(rounds):
+            if index:
+                sends[int(loop.time() * 10)] += 1
+            if scheduler is None:
+                deadline = loop.time() + interval
+                await asyncio.sleep(interval)
+                lateness.append(max(0.0, loop.time() - deadline))
+            else:
+                lateness.append(await scheduler.sleep(interval))
+
+    start = time.process_time()
+    await asyncio.gather(*[_stream() for _ in range(streams)])
+    cpu = time.process_time() - start
+    lateness.sort()
+    return {
+        "peak_per_100ms": max(sends.values()),
+        "lateness_p99": lateness[int(len(lateness) * 0.99)] if lateness else 0,
+        "lateness_max": lateness[-1] if lateness else 0,
+        "cpu": cpu,
+    }
+
+
+def _report(title: str, result: dict):
+    print(f"\n[{title}]")
+    print(f"  100ms 内最大发送数: {result['peak_per_100ms']}")
+    print(f"  迟到 P99: {result['lateness_p99'] * 1000:.1f}ms  最大: {result['lateness_max'] * 1000:.1f}ms")
+    print(f"  CPU 时间: {result['cpu']:.2f}s")
+
+
+async def main(streams: int, interval: float, rounds: int):
+    _report(f"{streams} 个独立 asyncio.sleep", await _run(streams, interval, rounds))
+    scheduler = HeartbeatScheduler(tolerance=0.1, max_per_window=max(1, streams // 20), max_spread=interval / 2, report_interval=0)
+    _report("全局心跳调度器", await _run(streams, interval, rounds, scheduler))
+    print(f"  调度统计: {scheduler.stats()}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    i = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+    r = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    asyncio.run(main(n, i, r))
@@ -0,0 +1,123 @@
+"""
+粉丝牌内存基准测试 - 旧的嵌套字典与 __slots__ Medal 的内存占用对比
+
+为 N 个账号各生成 M 个 MedalWall 原始条目（默认 1000 × 200），分别转换为：
+- 旧格式：每个粉丝牌 4 个嵌套字典（medal / anchor_info / room_info / 顶层）
+- Medal：单个 __slots__ 对象
+用 tracemalloc 统计转换结果额外占用的内存（原始条目本身由 MedalWall 缓存持有，两种方式相同，不计入），
+并对比按 target_id 查找单个粉丝牌时线性扫描与索引的耗时。
+
+用法: python benchmarks/bench_medal_memory.py [账号数] [每个账号的粉丝牌数]
+"""
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.medal import Medal  # noqa: E402
+
+
+def _legacy_convert(item: dict, room_id: int) -> dict:
+    """改造前 convertMedalWallItem 的返回结构"""
+    medal_info = item.get("medal_info", {})
+    return {
+        "medal": {
+            "target_id": medal_info.get("target_id", 0),
+            "level": medal_info.get("level", 0),
+            "medal_name": medal_info.get("medal_name", ""),
+            "today_feed": medal_info.get("today_feed", 0),
+            "intimacy": medal_info.get("intimacy", 0),
+            "next_intimacy": medal_info.get("next_intimacy", 0),
+            "is_lighted": medal_info.get("is_lighted", medal_info.get("is_light", 1)),
+        },
+        "anchor_info": {
+            "nick_name": item.get("target_name", "未知"),
+            "face": item.get("target_icon", ""),
+        },
+        "room_info": {
+            "room_id": room_id,
+        },
+        "live_status": item.get("live_status", 0),
+        "weight": 100,
+    }
+
+
+def _new_convert(item: dict, room_id: int) -> Medal:
+    medal = Medal.from_wall_item(item, room_id)
+    medal.weight = 100
+    return medal
+
+
+def _wall(rng: random.Random, medals: int) -> list:
+    items = []
+    for target_id in rng.sample(range(1, 10_000_000), medals):
+        items.append({
+            "medal_info": {
+                "target_id": target_id,
+                "level": rng.randint(1, 40),
+                "medal_name": f"牌{target_id % 10000}",
+                "today_feed": rng.choice((0, 6, 12, 30)),
+                "intimacy": rng.randint(0, 5000),
+                "next_intimacy": 5000,
+                "is_lighted": rng.randint(0, 1),
+            },
+            "target_name": f"主播{target_id}",
+            "target_icon": f"https://i0.hdslb.com/bfs/face/{target_id}.jpg",
+            "link": f"https://live.bilibili.com/{target_id + 1}",
+            "live_status": rng.randint(0, 1),
+        })
+    return items
+
+
+def _measure(walls: list, convert) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    converted = [[convert(item, index + 1) for index, item in enumerate(wall)] for wall in walls]
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return converted, size, elapsed
+
+
+def _lookup(walls: list, rounds: int = 20000) -> tuple:
+    rng = random.Random(1)
+    wall = walls[0]
+    targets = [rng.choice(wall)["medal_info"]["target_id"] for _ in range(rounds)]
+
+    started = time.perf_counter()
+    for target_id in targets:
+        next(item for item in wall if item.get("medal_info", {}).get("target_id") == target_id)
+    scan = time.perf_counter() - started
+
+    index = {item.get("medal_info", {}).get("target_id", 0): item for item in wall}
+    started = time.perf_counter()
+    for target_id in targets:
+        index.get(target_id)
+    indexed = time.perf_counter() - started
+    return scan / rounds, indexed / rounds
+
+
+if __name__ == "__main__":
+    accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    per_account = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(0)
+    walls = [_wall(rng, per_account) for _ in range(accounts)]
+    total = accounts * per_account
+    print(f"{accounts} 个账号 × {per_account} 个粉丝牌 = {total} 个粉丝牌")
+
+    results = {}
+    for title, convert in (("嵌套字典", _legacy_convert), ("Medal (__slots__)", _new_convert)):
+        converted, size, elapsed = _measure(walls, convert)
+        results[title] = size
+        print(f"  {title:<18} {size / 1024 / 1024:8.1f} MiB  每个 {size / total:6.0f} B  转换耗时 {elapsed:.2f}s")
+        del converted
+    legacy, slotted = results.values()
+    print(f"  内存减少 {1 - slotted / legacy:.0%}（{legacy / slotted:.1f}x）")
+
+    scan, indexed = _lookup(walls)
+    print(f"按 target_id 查找（{per_account} 个粉丝牌）: 线性扫描 {scan * 1e6:.2f}us, 索引 {indexed * 1e6:.3f}us")
@@ -0,0 +1,93 @@
+"""
+签名请求构造基准测试 - 对比 SingableDict 与预编译的 RequestSigner
+
+分别用两种方式构造 MedalWall（参数少）和 mobileHeartBeat（参数多）的签名请求，
+统计每次构造并编码为可发送字符串的耗时，并校验两者结果完全一致。
+
+用法: python benchmarks/bench_request_signing.py [次数]
+"""
+import os
+import sys
+import time
+from urllib.parse import urlencode
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api import Crypto, RequestSigner, SingableDict  # noqa: E402
+
+ACCESS_KEY = "0123456789abcdef0123456789abcdef"
+UUIDS = ["3f1c2a8e-6f0b-4d2c-9d57-0a1b2c3d4e5f", "9e8d7c6b-5a49-4382-a1b0-c9d8e7f6a5b4"]
+
+
+def _heartbeat_fields(seq_id: int) -> dict:
+    now = int(time.time())
+    return {
+        "platform": "android",
+        "uuid": UUIDS[0],
+        "buvid": "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789A",
+        "seq_id": f"{seq_id}",
+        "room_id": "21013446",
+        "parent_id": "6",
+        "area_id": "283",
+        "timestamp": f"{now - 30}",
+        "secret_key": "axoaadsffcazxksectbbb",
+        "watch_time": "30",
+        "up_id": "3117538",
+        "up_level": "40",
+        "jump_from": "30000",
+        "gu_id": "abcdefghijklmnopqrstuvwxyz0123456789abcdefg",
+        "play_type": "0",
+        "play_url": "",
+        "s_time": "0",
+        "data_behavior_id": "",
+        "data_source_id": "",
+        "up_session": f"l:one:live:record:21013446:{now - 30}",
+        "visit_id": "abcdefghijklmnopqrstuvwxyz012345",
+        "watch_status": "%7B%22pk_id%22%3A0%2C%22screen_status%22%3A1%7D",
+        "click_id": UUIDS[1],
+        "session_id": "",
+        "player_type": "0",
+        "client_ts": f"{now}",
+        "client_sign": "f" * 128,
+        "ts": now,
+    }
+
+
+HEARTBEAT_DYNAMIC = (
+    "buvid", "seq_id", "room_id", "timestamp", "watch_time", "up_id", "gu_id",
+    "up_session", "visit_id", "client_ts", "client_sign", "ts",
+)
+
+
+def _old(fields: dict) -> str:
+    params = {"access_key": ACCESS_KEY, "actionKey": "appkey", "appkey": Crypto.APPKEY, **fields}
+    # aiohttp 发送 dict 时同样会做一次 urlencode
+    return urlencode(SingableDict(params).signed)
+
+
+def _bench(title: str, rounds: int, build_fields, dynamic_keys):
+    signer = RequestSigner(ACCESS_KEY)
+    samples = [build_fields(i) for i in range(rounds)]
+    static = samples[0]
+
+    start = time.perf_counter()
+    old = [_old(fields) for fields in samples]
+    old_cost = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    new = [
+        signer.sign(title, {key: fields[key] for key in dynamic_keys}, static=static)
+        for fields in samples
+    ]
+    new_cost = (time.perf_counter() - start) / rounds
+
+    assert old == new, "签名结果不一致"
+    print(f"\n[{title}] 参数 {len(static) + 3} 个")
+    print(f"  SingableDict:  {old_cost * 1e6:.2f} us/请求")
+    print(f"  RequestSigner: {new_cost * 1e6:.2f} us/请求 ({old_cost / new_cost:.2f}x)")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    _bench("MedalWall", n, lambda i: {"ts": int(time.time()) + i, "target_id": 3117538}, ("ts", "target_id"))
+    _bench("mobileHeartBeat", n, _heartbeat_fields, HEARTBEAT_DYNAMIC)
@@ -0,0 +1,130 @@
+"""
+可选性能依赖基准测试 - 对比标准库与 uvloop / orjson
+
+模拟一批账号同时发心跳：每个心跳计算一次 client_sign、解析一次心跳响应，
+每 10 个心跳解析一次 MedalWall 响应，统计每个心跳消耗的 CPU 时间。
+同时校验 orjson 路径下 client_sign 的结果与标准库逐字节一致。
+
+用法: python benchmarks/bench_speedups.py [账号数] [每个账号的心跳数]
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import speedups  # noqa: E402
+from src.api import client_sign  # noqa: E402
+
+HEARTBEAT_RESPONSE = json.dumps({
+    "code": 0, "message": "0", "ttl": 1,
+    "data": {"heartbeat_interval": 30, "timestamp": 1700000000, "secret_rule": [2, 5, 1, 4], "secret_key": "seacasdgyijfhofiuxoannn"},
+})
+MEDAL_WALL_RESPONSE = json.dumps({
+    "code": 0, "message": "0", "ttl": 1,
+    "data": {
+        "list": [
+            {
+                "medal_info": {
+                    "target_id": 3117538 + i, "level": 20, "medal_name": f"勋章{i}", "today_feed": 12,
+                    "intimacy": 1500, "next_intimacy": 2000, "is_lighted": 1,
+                },
+                "target_name": f"主播{i}", "target_icon": "https://i0.hdslb.com/bfs/face/x.jpg",
+                "live_status": i % 2, "link": f"https://live.bilibili.com/{21013446 + i}",
+            }
+            for i in range(50)
+        ],
+        "count": 50, "name": "用户", "icon": "", "uid": 1,
+    },
+}, ensure_ascii=False)
+
+
+def _heartbeat_data(account: int, seq_id: int) -> dict:
+    now = int(time.time())
+    return {
+        "platform": "android",
+        "uuid": f"3f1c2a8e-6f0b-4d2c-9d57-{account:012d}",
+        "buvid": "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789A",
+        "seq_id": f"{seq_id}",
+        "room_id": f"{21013446 + account}",
+        "parent_id": "6",
+        "area_id": "283",
+        "timestamp": f"{now - 30}",
+        "secret_key": "axoaadsffcazxksectbbb",
+        "watch_time": "30",
+        "up_id": f"{3117538 + account}",
+        "up_level": "40",
+        "jump_from": "30000",
+        "gu_id": "abcdefghijklmnopqrstuvwxyz0123456789abcdefg",
+        "play_type": "0",
+        "play_url": "",
+        "s_time": "0",
+        "data_behavior_id": "",
+        "data_source_id": "",
+        "up_session": f"l:one:live:record:{21013446 + account}:{now - 30}",
+        "visit_id": "abcdefghijklmnopqrstuvwxyz012345",
+        "watch_status": "%7B%22pk_id%22%3A0%2C%22screen_status%22%3A1%7D",
+        "click_id": "9e8d7c6b-5a49-4382-a1b0-c9d8e7f6a5b4",
+        "session_id": "",
+        "player_type": "0",
+        "client_ts": f"{now}",
+    }
+
+
+def _reference_sign(data: dict) -> str:
+    # 改动前的 client_sign 实现
+    _str = json.dumps(data, separators=(",", ":"))
+    for n in ["sha512", "sha3_512", "sha384", "sha3_384", "blake2b"]:
+        _str = hashlib.new(n, _str.encode("utf-8")).hexdigest()
+    return _str
+
+
+async def _account(account: int, heartbeats: int):
+    heartbeat_body = HEARTBEAT_RESPONSE.encode()
+    medal_wall_body = MEDAL_WALL_RESPONSE.encode()
+    for seq_id in range(1, heartbeats + 1):
+        client_sign(_heartbeat_data(account, seq_id))
+        await asyncio.sleep(0)  # 模拟等待网络响应时的任务切换
+        speedups.json_loads(heartbeat_body.decode("utf-8"))
+        if seq_id % 10 == 0:
+            speedups.json_loads(medal_wall_body.decode("utf-8"))
+
+
+async def _fleet(accounts: int, heartbeats: int):
+    await asyncio.gather(*[_account(i, heartbeats) for i in range(accounts)])
+
+
+def _run(title: str, enabled: bool, accounts: int, heartbeats: int) -> float:
+    speedups.enable(enabled)
+    loop = speedups.new_event_loop()
+    try:
+        start = time.process_time()
+        loop.run_until_complete(_fleet(accounts, heartbeats))
+        cost = (time.process_time() - start) / (accounts * heartbeats)
+    finally:
+        loop.close()
+    print(f"  {title}: {cost * 1e6:.2f} us CPU/心跳  (生效: {speedups.available()})")
+    return cost
+
+
+if __name__ == "__main__":
+    accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    heartbeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    # 校验 client_sign 输入逐字节一致
+    samples = [_heartbeat_data(i, i) for i in range(1000)]
+    samples.append({**samples[0], "play_url": "中文"})  # 非 ASCII 退回标准库
+    for enabled in (False, True):
+        speedups.enable(enabled)
+        for data in samples:
+            assert speedups.dumps_compact(data) == json.dumps(data, separators=(",", ":")).encode("utf-8")
+            assert client_sign(data) == _reference_sign(data), "client_sign 结果不一致"
+    print("client_sign 校验通过（标准库 / 可选依赖结果逐字节一致）")
+
+    print(f"\n模拟 {accounts} 个账号，每个账号 {heartbeats} 次心跳")
+    base = _run("标准库      ", False, accounts, heartbeats)
+    fast = _run("uvloop/orjson", True, accounts, heartbeats)
+    print(f"\n每心跳 CPU 降低 {(1 - fast / base) * 100:.1f}% ({base / fast:.2f}x)")
@@ -0,0 +1,139 @@
+"""
+冷启动基准测试 - 从启动 main.py 到各账号发出第一个心跳的耗时
+
+在临时目录中复制 main.py 和 src/，生成 N 个账号的 users.yaml 和一份 fansmedal_weight.yaml，
+将 API_BASE_URL 指向进程内的模拟服务（benchmarks/bili_emulator.py），启动守护进程并记录
+模拟服务收到每个账号第一个心跳的时间。每种账号数运行两次：
+- 首次：没有配置解析缓存，需要导入 yaml 并解析
+- 再次：配置文件未修改，直接读取解析缓存
+为排除限速器的影响，基准测试中放开了所有接口的限速。
+
+用法: python benchmarks/bench_startup.py [账号数...]   默认 1 100 1000
+"""
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import bili_emulator  # noqa: E402
+
+UNLIMITED = {"rate": 100000, "burst": 100000, "account_rate": 100000, "account_burst": 100000}
+
+
+class _EmulatorThread:
+    """在后台线程的事件循环中运行模拟服务，避免与被测进程争抢同一个事件循环"""
+
+    def __init__(self, medals: int = 10):
+        self.emulator = bili_emulator.Emulator(medals=medals, latency=0.005)
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def _run():
+            asyncio.set_event_loop(self.loop)
+            self.runner, self.base_url = self.loop.run_until_complete(bili_emulator.start(self.emulator))
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=_run, daemon=True)
+        self.thread.start()
+        started.wait()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def _prepare(workdir: str, accounts: int, base_url: str):
+    shutil.copy(os.path.join(ROOT, "main.py"), workdir)
+    shutil.copytree(os.path.join(ROOT, "src"), os.path.join(workdir, "src"))
+    users = {
+        "USERS": [{"access_key": f"bench{i:05d}"} for i in range(accounts)],
+        "VERBOSE_LOG": 0,
+        "API_BASE_URL": base_url,
+        "RATE_LIMITS": {group: UNLIMITED for group in ("heartbeat", "medal_wall", "like", "room_info", "default")},
+    }
+    with open(os.path.join(workdir, "users.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump(users, f, allow_unicode=True)
+    weights = {str(1000 + i): {"up_name": f"主播{1000 + i}", "weight": 100 + i % 50} for i in range(500)}
+    with open(os.path.join(workdir, "fansmedal_weight.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump(weights, f, allow_unicode=True)
+
+
+def _clear_cache(workdir: str):
+    for name in os.listdir(workdir):
+        if name.endswith(".cache"):
+            os.remove(os.path.join(workdir, name))
+
+
+def _measure_import(workdir: str) -> float:
+    """只导入 main（加载配置、导入模块），不启动任务"""
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", "import main"], cwd=workdir, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - started
+
+
+def _measure(emu: _EmulatorThread, workdir: str, accounts: int, timeout: float = 300) -> list:
+    emu.emulator.first_heartbeat.clear()
+    started = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=workdir,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        # 没有开播直播间的账号不会发心跳：所有账号都发出心跳，或 5 秒内没有新账号发心跳时结束
+        last_count, last_change = 0, time.time()
+        while time.time() - started < timeout:
+            time.sleep(0.01)
+            count = len(emu.emulator.first_heartbeat)
+            if count != last_count:
+                last_count, last_change = count, time.time()
+            if count >= accounts or (count and time.time() - last_change > 5):
+                break
+    finally:
+        proc.kill()
+        proc.wait()
+    return sorted(t - started for t in list(emu.emulator.first_heartbeat.values()))
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1, 100, 1000]
+    emu = _EmulatorThread()
+    try:
+        for accounts in sizes:
+            workdir = tempfile.mkdtemp(prefix="bili_startup_")
+            try:
+                _prepare(workdir, accounts, emu.base_url)
+                print(f"\n[{accounts} 个账号]")
+                for title, cold in (("首次启动（无解析缓存）", True), ("再次启动（命中解析缓存）", False)):
+                    if cold:
+                        _clear_cache(workdir)
+                    import_cost = _measure_import(workdir)
+                    if cold:
+                        _clear_cache(workdir)
+                    times = _measure(emu, workdir, accounts)
+                    if not times:
+                        print(f"  {title}: 导入并加载配置 {import_cost:.2f}s, 未收到心跳")
+                        continue
+                    print(f"  {title}: 导入并加载配置 {import_cost:.2f}s")
+                    print(
+                        f"    第一个心跳 {times[0]:.2f}s, 中位数 {statistics.median(times):.2f}s, "
+                        f"最后一个 {times[-1]:.2f}s ({len(times)}/{accounts} 个账号发出心跳)"
+                    )
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        emu.stop()
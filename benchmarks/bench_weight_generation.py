@@ -0,0 +1,78 @@
+"""
+粉丝牌权重生成基准测试 - generate_fansmedal_weight.py 处理 N 个账号的总耗时
+
+在临时目录中复制 generate_fansmedal_weight.py 和 src/，生成 N 个账号的 users.yaml，
+将 API_BASE_URL 指向进程内的模拟服务（benchmarks/bili_emulator.py），以不同的并发数运行生成工具：
+- 首次：所有权重文件都需要新建
+- 再次：粉丝牌没有变化，不写入任何文件
+同时检查再次运行后各权重文件的修改时间没有变化。为排除限速器的影响，基准测试中放开了所有接口的限速。
+
+用法: python benchmarks/bench_weight_generation.py [账号数] [并发数...]   默认 500 1 16 64
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_startup import UNLIMITED, _EmulatorThread  # noqa: E402
+
+
+def _prepare(workdir: str, accounts: int, base_url: str):
+    shutil.copy(os.path.join(ROOT, "generate_fansmedal_weight.py"), workdir)
+    shutil.copytree(os.path.join(ROOT, "src"), os.path.join(workdir, "src"))
+    users = {
+        "USERS": [{"access_key": f"bench{i:05d}"} for i in range(accounts)],
+        "VERBOSE_LOG": 0,
+        "API_BASE_URL": base_url,
+        "RATE_LIMITS": {group: UNLIMITED for group in ("heartbeat", "medal_wall", "like", "room_info", "default")},
+    }
+    with open(os.path.join(workdir, "users.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump(users, f, allow_unicode=True)
+
+
+def _weight_files(workdir: str) -> dict:
+    return {
+        name: os.stat(os.path.join(workdir, name)).st_mtime_ns
+        for name in os.listdir(workdir)
+        if name.startswith("fansmedal_weight_") and name.endswith(".yaml")
+    }
+
+
+def _measure(workdir: str, concurrency: int) -> float:
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "generate_fansmedal_weight.py", "--no-pause", "-c", str(concurrency)],
+        cwd=workdir, check=True, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    levels = [int(arg) for arg in sys.argv[2:]] or [1, 16, 64]
+    emu = _EmulatorThread(medals=50)
+    try:
+        print(f"[{accounts} 个账号，每个账号 50 个粉丝牌]")
+        for concurrency in levels:
+            workdir = tempfile.mkdtemp(prefix="bili_weights_")
+            try:
+                _prepare(workdir, accounts, emu.base_url)
+                first = _measure(workdir, concurrency)
+                files = _weight_files(workdir)
+                again = _measure(workdir, concurrency)
+                rewritten = sum(1 for name, mtime in _weight_files(workdir).items() if files.get(name) != mtime)
+                print(
+                    f"  并发 {concurrency:>3}: 首次 {first:6.2f}s（生成 {len(files)} 个文件）  "
+                    f"再次 {again:6.2f}s（重写 {rewritten} 个文件）"
+                )
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        emu.stop()
@@ -0,0 +1,364 @@
+"""
+B 站接口本地模拟服务 - 用于离线压测和集成测试
+
+实现 BiliApi 用到的接口（MedalWall、mobileEntry、mobileHeartBeat、likeReportV3、user_medal_info、
+Room/get_info、get_status_info_by_uids、account/mine、get_user_info 等），并模拟：
+- 按心跳 watch_time 累计观看时长，每 5 分钟 +6 亲密度，每日上限 30
+- 主播按各自的周期开播 / 下播
+- 按概率返回 10030（限流）和 -504（服务超时），以及可配置的响应延迟
+- 校验 app 端签名，签名错误返回 -3
+
+所有域名的接口都由同一个端口提供，在 users.yaml 中配置 API_BASE_URL（或环境变量 API_BASE_URL）
+指向该地址即可让整个 main.py 守护进程运行在模拟服务上。access_key 任意，以 invalid 开头的视为过期。
+
+用法: python benchmarks/bili_emulator.py [--port 8080] [--medals 30] [--latency 0.02] [--rate-limit 0.001] [--timeout 0.001]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import sys
+import time
+from datetime import date
+from urllib.parse import parse_qsl, urlencode
+
+from aiohttp import web
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api import Crypto  # noqa: E402
+
+
+class Anchor:
+    def __init__(self, uid: int, room_id: int, rng: random.Random, time_scale: float):
+        self.uid = uid
+        self.room_id = room_id
+        self.name = f"主播{uid}"
+        # 每个主播有自己的开播周期和开播占比
+        self.period = rng.uniform(2, 6) * 3600 / time_scale
+        self.duty = rng.uniform(0.3, 0.7)
+        self.phase = rng.random()
+        # 部分主播的 MedalWall link 是个人空间链接，需要额外查询 room_id
+        self.space_link = rng.random() < 0.2
+
+    def live_status(self, now: float) -> int:
+        return 1 if (now / self.period + self.phase) % 1 < self.duty else 0
+
+    def live_time(self, now: float) -> int:
+        """本场直播的开播时间戳，未开播时为 0"""
+        if not self.live_status(now):
+            return 0
+        return int(now - ((now / self.period + self.phase) % 1) * self.period)
+
+
+class Medal:
+    def __init__(self, anchor: Anchor, rng: random.Random):
+        self.anchor = anchor
+        self.level = rng.randint(1, 30)
+        self.today_feed = rng.choice([0, 0, 0, 6, 12, 24, 30])
+        self.is_light = 1 if rng.random() < 0.8 else 0
+        self.watched = 0.0  # 今日累计观看秒数（未折算成亲密度的部分）
+        self.likes = 0
+
+
+class Account:
+    def __init__(self, access_key: str, medals: int, anchors: list):
+        self.access_key = access_key
+        seed = int(hashlib.md5(access_key.encode()).hexdigest()[:8], 16)
+        rng = random.Random(seed)
+        self.mid = 0 if access_key.startswith("invalid") else 10000000 + seed % 90000000
+        self.name = f"模拟用户{self.mid}"
+        self.medals = {anchor.uid: Medal(anchor, rng) for anchor in rng.sample(anchors, min(medals, len(anchors)))}
+        self.day = date.today()
+
+    def reset_if_new_day(self):
+        if date.today() != self.day:
+            self.day = date.today()
+            for medal in self.medals.values():
+                medal.today_feed = 0
+                medal.watched = 0.0
+
+
+def _app_auth(handler=None, anonymous: bool = False):
+    """校验 app 端签名并取出账号；anonymous 的接口对无效账号返回 mid=0 而不是 -101（与线上一致）"""
+    if handler is None:
+        return lambda handler: _app_auth(handler, anonymous)
+
+    async def wrapper(self, request):
+        params = await self._signed_params(request)
+        if not self._check_sign(params):
+            return self.error(-3, "API校验密匙错误")
+        account = self.account(params.get("access_key", ""))
+        if not account.mid and not anonymous:
+            return self.error(-101, "账号未登录")
+        return await handler(self, request, params, account)
+    return wrapper
+
+
+class Emulator:
+    def __init__(
+        self,
+        medals: int = 30,
+        anchors: int = 500,
+        latency: float = 0.02,
+        rate_limit: float = 0.0,
+        timeout: float = 0.0,
+        time_scale: float = 1.0,
+        seed: int = 0,
+        wall_page_size: int = 0,
+    ):
+        """
+        :param medals: 每个账号的粉丝牌数
+        :param anchors: 主播总数（账号的粉丝牌从中随机抽取）
+        :param latency: 平均响应延迟（秒）
+        :param rate_limit: 返回 10030 的概率
+        :param timeout: 返回 -504 的概率
+        :param time_scale: 时间加速倍数，影响主播开播周期
+        :param wall_page_size: MedalWall 每页条目数，0 表示不分页（与线上接口一致）
+        """
+        rng = random.Random(seed)
+        self.anchors = [Anchor(1000 + i, 20000 + i, rng, time_scale) for i in range(anchors)]
+        self.by_uid = {anchor.uid: anchor for anchor in self.anchors}
+        self.by_room = {anchor.room_id: anchor for anchor in self.anchors}
+        self.medals = medals
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.timeout = timeout
+        self.wall_page_size = wall_page_size
+        self.accounts = {}
+        self.rng = rng
+        self.stats = {}
+        self.first_heartbeat = {}  # mid -> 收到该账号第一个心跳的时间（启动耗时基准测试用）
+
+    # ---------- 工具方法 ----------
+
+    def account(self, access_key: str) -> Account:
+        account = self.accounts.get(access_key)
+        if account is None:
+            account = self.accounts[access_key] = Account(access_key, self.medals, self.anchors)
+        account.reset_if_new_day()
+        return account
+
+    @staticmethod
+    def ok(data=None):
+        return web.json_response({"code": 0, "message": "0", "ttl": 1, "data": data if data is not None else {}})
+
+    @staticmethod
+    def error(code: int, message: str):
+        return web.json_response({"code": code, "message": message, "ttl": 1, "data": {}})
+
+    @staticmethod
+    def _check_sign(params: dict) -> bool:
+        if "sign" not in params:
+            return False
+        unsigned = {key: value for key, value in params.items() if key != "sign"}
+        qs = urlencode(dict(sorted(unsigned.items())))
+        return Crypto.md5(qs + Crypto.APPSECRET) == params["sign"]
+
+    async def _signed_params(self, request) -> dict:
+        if request.method == "POST":
+            body = await request.text()
+            params = dict(parse_qsl(body, keep_blank_values=True))
+            # sendmsg 等接口签名在 query 上
+            if "sign" not in params:
+                params = dict(parse_qsl(request.query_string, keep_blank_values=True))
+            return params
+        return dict(parse_qsl(request.query_string, keep_blank_values=True))
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        path = request.path.rsplit("/", 1)[-1]
+        self.stats[path] = self.stats.get(path, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.latency)
+        if request.method != "HEAD":
+            roll = self.rng.random()
+            if roll < self.rate_limit:
+                return self.error(10030, "请求过于频繁，请稍后再试")
+            if roll < self.rate_limit + self.timeout:
+                return self.error(-504, "服务调用超时")
+        return await handler(request)
+
+    # ---------- 账号 ----------
+
+    @_app_auth(anonymous=True)
+    async def account_mine(self, request, params, account):
+        return self.ok({"mid": account.mid, "name": account.name})
+
+    @_app_auth
+    async def get_user_info(self, request, params, account):
+        return self.ok({"uid": account.mid, "uname": account.name, "medal": None})
+
+    @_app_auth
+    async def fans_medal_info(self, request, params, account):
+        return self.ok({"has_fans_medal": False, "my_fans_medal": {}})
+
+    # ---------- 粉丝牌 ----------
+
+    @_app_auth
+    async def medal_wall(self, request, params, account):
+        now = time.time()
+        items = []
+        for medal in account.medals.values():
+            anchor = medal.anchor
+            link = (
+                f"https://space.bilibili.com/{anchor.uid}?from=medal"
+                if anchor.space_link else f"https://live.bilibili.com/{anchor.room_id}?from=medal"
+            )
+            items.append({
+                "medal_info": {
+                    "target_id": anchor.uid,
+                    "level": medal.level,
+                    "medal_name": f"牌子{anchor.uid}",
+                    "today_feed": medal.today_feed,
+                    "intimacy": medal.level * 100,
+                    "next_intimacy": (medal.level + 1) * 100,
+                    "is_lighted": medal.is_light,
+                },
+                "target_name": anchor.name,
+                "target_icon": "",
+                "link": link,
+                "live_status": anchor.live_status(now),
+            })
+        if not self.wall_page_size:
+            return self.ok({"list": items, "count": len(items)})
+        page = max(int(params.get("page", 1)), 1)
+        total_page = max((len(items) + self.wall_page_size - 1) // self.wall_page_size, 1)
+        return self.ok({
+            "list": items[(page - 1) * self.wall_page_size:page * self.wall_page_size],
+            "count": len(items),
+            "page_info": {"current_page": page, "total_page": total_page, "has_more": page < total_page},
+        })
+
+    @_app_auth
+    async def user_medal_info(self, request, params, account):
+        medal = account.medals.get(int(params.get("up_uid", 0)))
+        return self.ok({"curr_show": {"is_light": medal.is_light if medal else 1}})
+
+    @_app_auth
+    async def like_report(self, request, params, account):
+        medal = account.medals.get(int(params.get("anchor_id", 0)))
+        if medal:
+            medal.likes += int(params.get("click_time", 1))
+            if medal.likes >= 30:
+                medal.is_light = 1
+        return self.ok({})
+
+    # ---------- 心跳 ----------
+
+    @_app_auth
+    async def mobile_entry(self, request, params, account):
+        anchor = self.by_room.get(int(params.get("room_id", 0)))
+        if anchor is None:
+            return self.error(1, "房间不存在")
+        return self.ok({"heartbeat_interval": 30, "timestamp": int(time.time()), "secret_rule": []})
+
+    @_app_auth
+    async def mobile_heartbeat(self, request, params, account):
+        anchor = self.by_room.get(int(params.get("room_id", 0)))
+        if anchor is None:
+            return self.error(1, "房间不存在")
+        self.first_heartbeat.setdefault(account.mid, time.time())
+        medal = account.medals.get(anchor.uid)
+        if medal and anchor.live_status(time.time()) and medal.is_light:
+            medal.watched += min(60, max(0, int(params.get("watch_time", 0))))
+            # 每观看 5 分钟 +6 亲密度，每日上限 30
+            while medal.watched >= 300 and medal.today_feed < 30:
+                medal.watched -= 300
+                medal.today_feed = min(30, medal.today_feed + 6)
+        return self.ok({"heartbeat_interval": 30, "timestamp": int(time.time())})
+
+    # ---------- 直播间 ----------
+
+    async def room_info(self, request):
+        anchor = self.by_room.get(int(request.query.get("room_id", 0)))
+        if anchor is None:
+            return self.error(1, "房间不存在")
+        return self.ok({
+            "room_id": anchor.room_id,
+            "uid": anchor.uid,
+            "live_status": anchor.live_status(time.time()),
+            "title": f"{anchor.name}的直播间",
+        })
+
+    async def status_by_uids(self, request):
+        body = await request.json()
+        now = time.time()
+        data = {}
+        for uid in body.get("uids", []):
+            anchor = self.by_uid.get(int(uid))
+            if anchor:
+                data[str(uid)] = {
+                    "room_id": anchor.room_id,
+                    "live_status": anchor.live_status(now),
+                    "live_time": anchor.live_time(now),
+                    "title": f"{anchor.name}的直播间",
+                }
+        return self.ok(data)
+
+    async def space_info(self, request):
+        anchor = self.by_uid.get(int(request.query.get("mid", 0)))
+        room_id = anchor.room_id if anchor else 0
+        return self.ok({"mid": int(request.query.get("mid", 0)), "live_room": {"roomid": room_id}})
+
+    async def root(self, request):
+        return web.Response(text="bili emulator")
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get("/", self.root)
+        app.router.add_get("/x/v2/account/mine", self.account_mine)
+        app.router.add_get("/xlive/app-ucenter/v1/user/get_user_info", self.get_user_info)
+        app.router.add_get("/xlive/app-ucenter/v1/fansMedal/fans_medal_info", self.fans_medal_info)
+        app.router.add_get("/xlive/web-ucenter/user/MedalWall", self.medal_wall)
+        app.router.add_get("/xlive/app-ucenter/v1/fansMedal/user_medal_info", self.user_medal_info)
+        app.router.add_post("/xlive/app-ucenter/v1/like_info_v3/like/likeReportV3", self.like_report)
+        app.router.add_post("/xlive/data-interface/v1/heartbeat/mobileEntry", self.mobile_entry)
+        app.router.add_post("/xlive/data-interface/v1/heartbeat/mobileHeartBeat", self.mobile_heartbeat)
+        app.router.add_get("/room/v1/Room/get_info", self.room_info)
+        app.router.add_post("/room/v1/Room/get_status_info_by_uids", self.status_by_uids)
+        app.router.add_get("/x/space/acc/info", self.space_info)
+        return app
+
+
+async def start(emulator: Emulator, host: str = "127.0.0.1", port: int = 0):
+    """
+    启动模拟服务，返回 (AppRunner, base_url)，用完后调用 runner.cleanup()
+    """
+    runner = web.AppRunner(emulator.build_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B 站接口本地模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--medals", type=int, default=30, help="每个账号的粉丝牌数")
+    parser.add_argument("--anchors", type=int, default=500, help="主播总数")
+    parser.add_argument("--latency", type=float, default=0.02, help="平均响应延迟（秒）")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="返回 10030 的概率")
+    parser.add_argument("--timeout", type=float, default=0.0, help="返回 -504 的概率")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="主播开播周期的时间加速倍数")
+    parser.add_argument("--wall-page-size", type=int, default=0, help="MedalWall 每页条目数，0 表示不分页")
+    args = parser.parse_args()
+
+    emulator = Emulator(
+        medals=args.medals,
+        anchors=args.anchors,
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        timeout=args.timeout,
+        time_scale=args.time_scale,
+        wall_page_size=args.wall_page_size,
+    )
+    print(f"模拟服务地址: http://{args.host}:{args.port}  （在 users.yaml 中设置 API_BASE_URL 指向该地址）")
+    web.run_app(emulator.build_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
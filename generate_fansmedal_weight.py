@@ -1,100 +1,111 @@
 import asyncio
-import json
 import os
 import shutil
 import sys
+import uuid
 from typing import Dict, Any, Tuple, Optional
 
 from loguru import logger
 
-from src import BiliUser
+from src.api import BiliApi
+from src.config import get_base_dir, load_users, load_yaml, save_yaml
+from src.logsink import setup_console
+from src.pool import close_session, get_session
 
 
 log = logger.bind(user="粉丝牌权重生成工具")
 
 
-def _get_base_dir() -> str:
-    """
-    获取程序基目录（配置文件所在目录）.
-    在 PyInstaller 打包后，返回 exe 文件所在目录；
-    否则返回脚本所在目录。
-    """
-    if getattr(sys, 'frozen', False):
-        # PyInstaller 打包后的情况
-        return os.path.dirname(sys.executable)
-    else:
-        # 开发环境
-        return os.path.dirname(os.path.abspath(__file__))
-
-
 def _load_users_config() -> Dict[str, Any]:
     """
     加载 users.yaml 或环境变量 USERS.
     """
     try:
-        if os.environ.get("USERS"):
-            users = json.loads(os.environ.get("USERS"))
-        else:
-            import yaml
-            base_dir = _get_base_dir()
-            config_path = os.path.join(base_dir, "users.yaml")
-            with open(config_path, "r", encoding="utf-8") as f:
-                users = yaml.load(f, Loader=yaml.FullLoader)
-        return users
+        return load_users()
     except Exception as e:  # pragma: no cover - 防御性日志
         log.error(f"读取配置文件失败, 请检查配置文件格式是否正确: {e}")
         raise
 
 
-async def _collect_medals() -> Dict[int, Tuple[int, str, Dict[int, Dict[str, Any]]]]:
-    """
-    使用已有的 BiliUser / BiliApi 逻辑, 获取一次所有账号的粉丝牌列表.
+def _api_config(users_cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """生成工具只用到接口相关的配置，与 main.py 使用同样的键名"""
+    return {
+        "RATE_LIMITS": users_cfg.get("RATE_LIMITS") or {},
+        "RETRY_DEADLINE": users_cfg.get("RETRY_DEADLINE", 30),
+        "POOL_LIMIT": users_cfg.get("POOL_LIMIT", 200),
+        "POOL_LIMIT_PER_HOST": users_cfg.get("POOL_LIMIT_PER_HOST", 50),
+        "API_BASE_URL": os.environ.get("API_BASE_URL") or users_cfg.get("API_BASE_URL", ""),
+    }
 
-    返回:
-         { user_id: (user_id, user_name, { target_id: { 'up_name': str, 'medal_name': str } }) }
+
+class _Account:
+    """
+    BiliApi 需要的最少账号信息
+    生成工具只列出粉丝牌，不创建 BiliUser，也就不会打开观看进度检查点、room_id 缓存等运行时组件
     """
-    users_cfg = _load_users_config()
-    user_medals_map: Dict[int, Tuple[int, str, Dict[int, Dict[str, Any]]]] = {}
 
-    for user in users_cfg.get("USERS", []):
-        access_key = user.get("access_key")
-        if not access_key:
-            continue
+    def __init__(self, access_key: str, config: Dict[str, Any]):
+        self.access_key = access_key
+        self.config = config
+        self.mid, self.name = 0, ""
+        self.uuids = [str(uuid.uuid4()) for _ in range(2)]
 
-        white_uid = user.get("white_uid", "")
-        banned_uid = user.get("banned_uid", "")
-        config = {}
 
-        bili_user = BiliUser(access_key, white_uid, banned_uid, config)
-        ok = await bili_user.loginVerify()
-        if not ok:
+async def _collect_user(
+    user: Dict[str, Any], config: Dict[str, Any], semaphore: asyncio.Semaphore
+) -> Optional[Tuple[int, str, Dict[int, Dict[str, Any]]]]:
+    """
+    获取单个账号的粉丝牌列表，失败时返回 None，不影响其他账号
+    只需要 mid 和昵称，直接调用 loginVerift，省去 loginVerify 中加载权重、查询佩戴粉丝牌的请求
+    """
+    async with semaphore:
+        account = _Account(user["access_key"], config)
+        api = BiliApi(account, get_session(config))
+        try:
+            loginInfo = await api.loginVerift()
+        except Exception as e:
+            log.warning(f"账号登录失败，跳过该账号: {e}")
+            return None
+        if not loginInfo.get("mid"):
             log.warning("账号登录失败，跳过该账号")
-            continue
+            return None
+        account.mid, account.name = loginInfo["mid"], loginInfo["name"]
 
-        user_id = bili_user.mid
-        user_name = bili_user.name
         medals_map: Dict[int, Dict[str, Any]] = {}
+        log.info(f"开始获取账号【{account.name}】(ID: {account.mid}) 的粉丝牌列表")
+        try:
+            async for medal in api.getFansMedalandRoomID(verbose=False):
+                if not medal.target_id:
+                    continue
+                medals_map[medal.target_id] = {
+                    "up_name": medal.nick_name,
+                    "medal_name": medal.medal_name,
+                }
+        except Exception as e:
+            log.warning(f"获取账号【{account.name}】(ID: {account.mid}) 的粉丝牌列表失败，跳过该账号: {e}")
+            return None
+        return account.mid, account.name, medals_map
 
-        log.info(f"开始获取账号【{user_name}】(ID: {user_id}) 的粉丝牌列表")
-        async for medal in bili_user.api.getFansMedalandRoomID(verbose=False):
-            medal_info = medal.get("medal", {})
-            anchor_info = medal.get("anchor_info", {})
-            target_id = int(medal_info.get("target_id", 0) or 0)
-            if not target_id:
-                continue
-
-            up_name = anchor_info.get("nick_name", "未知")
-            medal_name = medal_info.get("medal_name", "")
 
-            medals_map[target_id] = {
-                "up_name": up_name,
-                "medal_name": medal_name,
-            }
+async def _collect_medals(concurrency: int) -> Dict[int, Tuple[int, str, Dict[int, Dict[str, Any]]]]:
+    """
+    使用已有的 BiliApi 逻辑, 获取一次所有账号的粉丝牌列表.
+    最多同时处理 concurrency 个账号，请求频率仍受 RATE_LIMITS 限速.
 
-        user_medals_map[user_id] = (user_id, user_name, medals_map)
-        await bili_user.session.close()
+    返回:
+         { user_id: (user_id, user_name, { target_id: { 'up_name': str, 'medal_name': str } }) }
+    """
+    users_cfg = _load_users_config()
+    config = _api_config(users_cfg)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    users = [user for user in users_cfg.get("USERS", []) if user.get("access_key")]
+    try:
+        results = await asyncio.gather(*(_collect_user(user, config, semaphore) for user in users))
+    finally:
+        await close_session()
 
-    return user_medals_map
+    # 按配置文件中的账号顺序输出
+    return {result[0]: result for result in results if result is not None}
 
 
 def _load_existing_weights(path: str) -> Tuple[Dict[str, Any], bool, Optional[str]]:
@@ -110,25 +121,23 @@ def _load_existing_weights(path: str) -> Tuple[Dict[str, Any], bool, Optional[st
     if not os.path.exists(path):
         return {}, False, None
 
-    import yaml
-
-    with open(path, "r", encoding="utf-8") as f:
+    try:
+        # 与主程序共用解析缓存，文件未修改时不必重新解析
+        data = load_yaml(path) or {}
+    except Exception as e:  # pragma: no cover
+        # 格式错误，备份原文件
+        base_dir = os.path.dirname(path)
+        filename = os.path.basename(path)
+        # 如果文件名包含用户ID，备份文件名也包含用户ID
+        backup_filename = filename.replace(".yaml", "_backup.yaml")
+        backup_path = os.path.join(base_dir, backup_filename)
         try:
-            data = yaml.load(f, Loader=yaml.FullLoader) or {}
-        except Exception as e:  # pragma: no cover
-            # 格式错误，备份原文件
-            base_dir = os.path.dirname(path)
-            filename = os.path.basename(path)
-            # 如果文件名包含用户ID，备份文件名也包含用户ID
-            backup_filename = filename.replace(".yaml", "_backup.yaml")
-            backup_path = os.path.join(base_dir, backup_filename)
-            try:
-                shutil.copy2(path, backup_path)
-                log.warning(f"检测到 {path} 格式错误，已备份到 {backup_path}")
-            except Exception as backup_error:
-                log.error(f"备份文件失败: {backup_error}")
-                backup_path = None
-            return {}, True, backup_path
+            shutil.copy2(path, backup_path)
+            log.warning(f"检测到 {path} 格式错误，已备份到 {backup_path}")
+        except Exception as backup_error:
+            log.error(f"备份文件失败: {backup_error}")
+            backup_path = None
+        return {}, True, backup_path
     if not isinstance(data, dict):
         # 数据格式不正确，也视为格式错误
         base_dir = os.path.dirname(path)
@@ -143,17 +152,22 @@ def _load_existing_weights(path: str) -> Tuple[Dict[str, Any], bool, Optional[st
             log.error(f"备份文件失败: {backup_error}")
             backup_path = None
         return {}, True, backup_path
-    return data, False, None
-
+    # load_yaml 返回的是共享的缓存对象，复制一份再合并
+    return {key: dict(entry) if isinstance(entry, dict) else entry for key, entry in data.items()}, False, None
 
-def _save_weights(path: str, data: Dict[str, Any]) -> None:
-    import yaml
 
-    with open(path, "w", encoding="utf-8") as f:
-        yaml.safe_dump(data, f, allow_unicode=True, sort_keys=True)
+def _pause(no_pause: bool) -> None:
+    """双击运行时等待按键再关闭窗口；--no-pause 或非交互环境（定时任务、管道）下直接结束"""
+    if no_pause or not sys.stdin.isatty():
+        return
+    print("\n按任意键结束...")
+    try:
+        input()
+    except (KeyboardInterrupt, EOFError):
+        pass
 
 
-async def main():
+async def main(concurrency: int = 16, no_pause: bool = False):
     """
     获取一次粉丝牌列表, 为每个用户生成/更新 fansmedal_weight_{用户ID}.yaml.
 
@@ -164,21 +178,17 @@ async def main():
       medal_name: 某某粉丝牌
       weight: 100
     """
-    base_dir = _get_base_dir()
+    base_dir = get_base_dir()
     os.chdir(base_dir)
 
-    user_medals_map = await _collect_medals()
+    user_medals_map = await _collect_medals(concurrency)
     if not user_medals_map:
         log.warning("未获取到任何账号的粉丝牌, 不生成任何权重文件")
         print("\n" + "=" * 60)
         print("任务完成")
         print("=" * 60)
         print("未获取到任何账号的粉丝牌，未生成任何权重文件")
-        print("\n按任意键结束...")
-        try:
-            input()
-        except (KeyboardInterrupt, EOFError):
-            pass
+        _pause(no_pause)
         return
 
     # 为每个用户生成单独的权重文件
@@ -232,9 +242,8 @@ async def main():
                     updated_count += 1
                 existing[key] = entry
 
-        # 保存文件（格式错误时也会覆盖原文件）
-        if updated or has_format_error or not file_existed:
-            _save_weights(weight_file, existing)
+        # 保存文件（格式错误时也会覆盖原文件）；内容与原文件相同时 save_yaml 不会写入
+        if (updated or has_format_error or not file_existed) and save_yaml(weight_file, existing):
             if has_format_error:
                 log.success(f"已重新生成 {weight_file}，共记录 {len(existing)} 个粉丝牌（默认权重为 100）")
             elif not file_existed:
@@ -272,14 +281,18 @@ async def main():
     print("任务完成")
     print("=" * 60)
     print(f"共处理 {processed_users} 个账号")
-    print("\n按任意键结束...")
-    try:
-        input()
-    except (KeyboardInterrupt, EOFError):
-        pass
+    _pause(no_pause)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import argparse
+
+    parser = argparse.ArgumentParser(description="生成/更新各账号的粉丝牌权重文件 fansmedal_weight_{用户ID}.yaml")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="同时获取粉丝牌列表的账号数（默认 16）")
+    parser.add_argument("--no-pause", action="store_true", help="结束时不等待按键，用于定时任务等非交互场景")
+    args = parser.parse_args()
+
+    setup_console(_load_users_config().get("VERBOSE_LOG", 1))
+    asyncio.run(main(args.concurrency, args.no_pause))
 
 
@@ -1,12 +1,18 @@
-import json
 import os
 import sys
 from loguru import logger
 import warnings
 import asyncio
-import aiohttp
 import itertools
 from src import BiliUser
+from src.pool import WARMUP_HOSTS, get_session, warmup, close_session
+from src import metrics
+from src.logsink import UserLogRouter, setup_console
+from src import speedups
+from src.config import get_base_dir, load_users
+from src.checkpoint import get_checkpoint_store
+from src.roomcache import get_room_cache
+from src.ratelimit import parse_rate_limits
 
 log = logger.bind(user="B站粉丝勋章自动挂亲密度小助手")
 __VERSION__ = "1.0.0"
@@ -17,127 +23,276 @@ warnings.filterwarnings(
 )
 
 
-def _get_base_dir() -> str:
-    """
-    获取程序基目录（配置文件所在目录）.
-    在 PyInstaller 打包后，返回 exe 文件所在目录；
-    否则返回脚本所在目录。
-    """
-    if getattr(sys, 'frozen', False):
-        # PyInstaller 打包后的情况
-        return os.path.dirname(sys.executable)
-    else:
-        # 开发环境
-        return os.path.dirname(os.path.abspath(__file__))
-
-
-base_dir = _get_base_dir()
+base_dir = get_base_dir()
 os.chdir(base_dir)
 
 try:
-    if os.environ.get("USERS"):
-        users = json.loads(os.environ.get("USERS"))
-    else:
-        import yaml
-        config_path = os.path.join(base_dir, "users.yaml")
-        with open(config_path, "r", encoding="utf-8") as f:
-            users = yaml.load(f, Loader=yaml.FullLoader)
+    # 配置只在这里解析一次（文件未修改时直接读取解析缓存），其他模块通过 config 取值
+    users = load_users()
     config = {
         "VERBOSE_LOG": users.get("VERBOSE_LOG", 1),  # 默认1表示详细日志
+        "POOL_LIMIT": users.get("POOL_LIMIT", 200),  # 连接池总连接数上限
+        "POOL_LIMIT_PER_HOST": users.get("POOL_LIMIT_PER_HOST", 50),  # 每个域名的连接数上限
+        "DNS_CACHE_TTL": users.get("DNS_CACHE_TTL", 600),  # DNS 缓存时间（秒）
+        "KEEPALIVE_TIMEOUT": users.get("KEEPALIVE_TIMEOUT", 60),  # 空闲连接保持时间（秒）
+        "MAX_CONCURRENT_ROOMS": users.get("MAX_CONCURRENT_ROOMS", 1),  # 每个账号同时观看的直播间数
+        "MEDAL_WALL_CACHE_TTL": users.get("MEDAL_WALL_CACHE_TTL", 60),  # MedalWall 结果缓存时间（秒）
+        "ROOM_ID_CACHE_TTL": users.get("ROOM_ID_CACHE_TTL", 7 * 86400),  # 已确认 room_id 的缓存时间（秒）
+        "ROOM_ID_NEGATIVE_TTL": users.get("ROOM_ID_NEGATIVE_TTL", 3600),  # 确认没有直播间的结果的缓存时间（秒），查询失败不缓存
+        "ROOM_ID_RESOLVE_CONCURRENCY": users.get("ROOM_ID_RESOLVE_CONCURRENCY", 8),  # 并发查询 room_id 的上限
+        "RATE_LIMITS": users.get("RATE_LIMITS") or {},  # 各接口限速配置，未配置的使用默认值
+        "RETRY_DEADLINE": users.get("RETRY_DEADLINE", 30),  # 单次接口调用（含重试）的最长耗时（秒）
+        "BREAKER_FAILURE_THRESHOLD": users.get("BREAKER_FAILURE_THRESHOLD", 5),  # 同一域名连续失败多少次后熔断
+        "BREAKER_RESET_TIMEOUT": users.get("BREAKER_RESET_TIMEOUT", 30),  # 熔断持续时间（秒）
+        "METRICS_PORT": int(os.environ.get("METRICS_PORT") or users.get("METRICS_PORT", 0)),  # 指标服务端口，0 表示不启动
+        "API_BASE_URL": os.environ.get("API_BASE_URL") or users.get("API_BASE_URL", ""),  # 替换 B 站接口地址（本地模拟服务压测用）
+        "HEARTBEAT_TOLERANCE": users.get("HEARTBEAT_TOLERANCE", 0.5),  # 心跳合并唤醒的容忍窗口（秒）
+        "HEARTBEAT_MAX_PER_WINDOW": users.get("HEARTBEAT_MAX_PER_WINDOW", 50),  # 每个窗口最多发送的心跳数
+        "HEARTBEAT_MAX_SPREAD": users.get("HEARTBEAT_MAX_SPREAD", 5),  # 削峰时心跳允许错开的最大秒数
+        "WORKERS": int(os.environ.get("WORKERS") or users.get("WORKERS", 1)),  # 分片进程数，1 为单进程，0 为 CPU 核数
+        "SPEEDUPS": users.get("SPEEDUPS", 1),  # 安装了 uvloop / orjson 时是否使用
+        "PRIORITIZER": users.get("PRIORITIZER", "weight"),  # 直播间排序策略
+        "EXPECTED_STREAM_MINUTES": users.get("EXPECTED_STREAM_MINUTES", 180),  # 估计剩余直播时长用的典型直播时长（分钟）
+        "CHECKPOINT": users.get("CHECKPOINT", 1),  # 是否保存观看进度，重启后续传
+        "CHECKPOINT_RESUME_WINDOW": users.get("CHECKPOINT_RESUME_WINDOW", 120),  # 上次心跳在多少秒内的直播间可续传
+        "LIKE_CLICK_TIME": users.get("LIKE_CLICK_TIME", 10),  # 点亮粉丝牌时每次请求上报的点赞次数
+        "RELIGHT_CONCURRENCY": users.get("RELIGHT_CONCURRENCY", 5),  # 每个账号同时点亮的粉丝牌数
+        "CONFIG_RELOAD_INTERVAL": users.get("CONFIG_RELOAD_INTERVAL", 10),  # 检查 users.yaml 是否修改的间隔（秒），0 表示不热加载
     }
+    # 所有账号合计同时观看的直播间数（热加载新增的账号不计入），共享心跳限速按它和心跳间隔确定
+    config["FLEET_ROOMS"] = sum(
+        int(user.get("max_concurrent_rooms") or config["MAX_CONCURRENT_ROOMS"] or 1) for user in users["USERS"]
+    )
+    # 限速配置有误时启动即报错，而不是在第一个请求时才失败
+    parse_rate_limits(config["RATE_LIMITS"], config["FLEET_ROOMS"])
+    speedups.enable(config["SPEEDUPS"])
     # 根据 VERBOSE_LOG 配置设置日志级别
     verbose_log = config.get("VERBOSE_LOG", 1)
     log_level = "DEBUG" if verbose_log else "INFO"
-    # 重新配置 logger，使用配置的日志级别
-    logger.remove()
-    logger.add(
-        sys.stdout,
-        colorize=True,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> <blue> {extra[user]} </blue> <level>{message}</level>",
-        backtrace=True,
-        diagnose=True,
-        level=log_level,
-    )
+    setup_console(verbose_log)
     log = logger.bind(user="B站粉丝勋章自动挂亲密度小助手")
 except Exception as e:
     log.error(f"读取配置文件失败,请检查配置文件格式是否正确: {e}")
     exit(1)
 
 
-def _add_user_file_logger(user_id: int, user_name: str):
+def _add_user_file_logger() -> UserLogRouter:
     """
-    为指定用户添加文件日志处理器
-    日志文件名为 {用户ID}.log，追加模式，每次运行前添加两行换行
+    添加所有账号共用的文件日志处理器
+    日志按账号 uid 分发到 {用户ID}.log，追加模式，每次运行前添加两行换行
+    由一个后台线程批量写入，按大小 / 时间轮转并压缩旧文件
     """
-    log_file = os.path.join(base_dir, f"{user_id}.log")
-    
-    # 如果文件已存在，先添加两行换行
-    if os.path.exists(log_file):
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write("\n\n")
-    
-    # 添加文件日志处理器，只记录该用户的日志（根据用户名过滤）
+    router = UserLogRouter(
+        base_dir,
+        max_bytes=int(float(users.get("LOG_ROTATION_SIZE_MB", 10)) * 1024 * 1024),
+        max_age=float(users.get("LOG_ROTATION_HOURS", 0)) * 3600,
+        retention=int(users.get("LOG_RETENTION", 7)),
+        compression=bool(users.get("LOG_COMPRESSION", 1)),
+    )
     logger.add(
-        log_file,
+        router,
         format="{time:YYYY-MM-DD HH:mm:ss} {extra[user]} {message}",
         level=log_level,
-        encoding="utf-8",
-        enqueue=True,  # 异步写入，避免阻塞
-        filter=lambda record: record["extra"].get("user") == user_name,
+        filter=router.accepts,
     )
+    return router
 
 
-@log.catch
-async def main():
+def _user_config(user: dict) -> dict:
+    """账号级配置覆盖全局配置"""
+    user_config = dict(config)
+    if user.get("max_concurrent_rooms"):
+        user_config["MAX_CONCURRENT_ROOMS"] = user["max_concurrent_rooms"]
+    return user_config
+
+
+async def _run_user(biliUser: BiliUser, log_router: UserLogRouter):
+    await biliUser.init()
+    # 登录成功后注册文件日志（写入 {用户ID}.log）
+    if getattr(biliUser, "isLogin", False) and biliUser.mid and biliUser.name:
+        log_router.register(biliUser.mid)
+    await biliUser.start()
+
+
+def _hot_reload_enabled() -> bool:
+    """通过环境变量 USERS 传入配置或 CONFIG_RELOAD_INTERVAL 为 0 时不热加载 users.yaml"""
+    return bool(config["CONFIG_RELOAD_INTERVAL"]) and not os.environ.get("USERS")
+
+
+def _new_config_watcher(accounts: list, shard: tuple = None):
+    if not _hot_reload_enabled():
+        return None
+    from src.reload import ConfigWatcher
+
+    accept = None
+    if shard is not None:
+        from src.shard import shard_of
+
+        index, shards = shard
+        accept = lambda user: shard_of(user["access_key"], shards) == index  # noqa: E731
+    return ConfigWatcher(
+        os.path.join(base_dir, "users.yaml"), accounts, interval=config["CONFIG_RELOAD_INTERVAL"], accept=accept
+    )
+
+
+@log.catch(reraise=True)
+async def main(accounts: list = None, report=None, metrics_port: int = None, shard: tuple = None):
+    """
+    运行一组账号（默认为配置中的全部账号）
+    :param report: 分片模式下用于把汇总消息交给主进程的回调，不传则直接打印
+    :param metrics_port: 指标服务端口，不传则使用 METRICS_PORT
+    :param shard: 分片模式下为 (分片序号, 分片数)，热加载时只接管属于本分片的账号
+    """
     messageList = []
-    session = aiohttp.ClientSession(trust_env=True)
-    biliUsers = []  # 保存 BiliUser 对象引用
-    initTasks = []
-    startTasks = []
-    catchMsg = []
-    for user in users["USERS"]:
+    # 可选的本地指标服务（Prometheus 格式）
+    metrics_runner = None
+    metrics_port = config["METRICS_PORT"] if metrics_port is None else metrics_port
+    if metrics_port:
+        metrics_runner = await metrics.start_server(metrics_port)
+    # 所有账号共用一个连接池，启动时先预热
+    session = get_session(config)
+    await warmup(session, [config["API_BASE_URL"]] if config["API_BASE_URL"] else WARMUP_HOSTS)
+    accounts = users["USERS"] if accounts is None else accounts
+    running = {}  # access_key -> (BiliUser, 运行任务)
+    users_changed = asyncio.Event()
+    log_router = _add_user_file_logger()
+
+    def start_user(user: dict):
+        biliUser = BiliUser(
+            user["access_key"],
+            user.get("white_uid", ""),
+            user.get("banned_uid", ""),
+            _user_config(user),
+        )
+        running[user["access_key"]] = (biliUser, asyncio.ensure_future(_run_user(biliUser, log_router)))
+
+    async def apply_changes(added: list, removed: list, changed: list):
+        """热加载：只启动新增账号、停止移除的账号，其余账号保持当前的观看进度"""
+        for user in removed:
+            biliUser, task = running.pop(user["access_key"], (None, None))
+            if task is None:
+                continue
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            log.info(f"账号 {biliUser.name or '未登录'} 已从配置中移除，停止运行")
+        for user in changed:
+            biliUser, task = running.get(user["access_key"], (None, None))
+            if task is None:
+                # 之前因配置有误没能启动的账号，配置修正后按新增账号启动
+                added = added + [user]
+                continue
+            if task.done():
+                continue
+            try:
+                biliUser.reconfigure(
+                    user.get("white_uid", ""),
+                    user.get("banned_uid", ""),
+                    _user_config(user)["MAX_CONCURRENT_ROOMS"],
+                )
+                log.info(f"账号 {biliUser.name} 的配置已更新，下一次重新筛选时生效")
+            except ValueError as e:
+                log.error(f"账号 {biliUser.name} 的新配置有误，保持原配置: {e}")
+        for user in added:
+            try:
+                start_user(user)
+                log.info("新增账号，开始登录")
+            except ValueError as e:
+                log.error(f"新增账号的配置有误: {e}")
+        users_changed.set()
+
+    for user in accounts:
         if user["access_key"]:
-            biliUser = BiliUser(
-                user["access_key"],
-                user.get("white_uid", ""),
-                user.get("banned_uid", ""),
-                config,
-            )
-            biliUsers.append(biliUser)  # 保存引用
-            initTasks.append(biliUser.init())
-            startTasks.append(biliUser.start())
-            catchMsg.append(biliUser.sendmsg())
+            start_user(user)
+    watcher = _new_config_watcher(accounts, shard)
+    watch_task = asyncio.ensure_future(watcher.run(apply_changes)) if watcher is not None else None
     try:
-        # 先执行初始化任务
-        await asyncio.gather(*initTasks)
-        
-        # 为每个成功登录的用户添加文件日志处理器
-        for biliUser in biliUsers:
-            if hasattr(biliUser, 'isLogin') and biliUser.isLogin and hasattr(biliUser, 'mid') and biliUser.mid and hasattr(biliUser, 'name') and biliUser.name:
-                _add_user_file_logger(biliUser.mid, biliUser.name)
-        
-        await asyncio.gather(*startTasks)
-    except Exception as e:
-        log.exception(e)
-        # messageList = messageList + list(itertools.chain.from_iterable(await asyncio.gather(*catchMsg)))
-        messageList.append(f"任务执行失败: {e}")
+        # 等待所有账号结束；启用热加载时一直运行，等待新增的账号
+        while True:
+            pending = [task for _, task in running.values() if not task.done()]
+            if not pending and watch_task is None:
+                break
+            users_changed.clear()
+            changed_waiter = asyncio.ensure_future(users_changed.wait())
+            try:
+                done, _ = await asyncio.wait(pending + [changed_waiter], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                changed_waiter.cancel()
+            for task in done:
+                if task is not changed_waiter and not task.cancelled() and task.exception() is not None:
+                    e = task.exception()
+                    log.opt(exception=e).error(f"账号任务异常: {e}")
+                    messageList.append(f"任务执行失败: {e}")
     finally:
+        if watch_task is not None:
+            watch_task.cancel()
         messageList = messageList + list(
-            itertools.chain.from_iterable(await asyncio.gather(*catchMsg))
+            itertools.chain.from_iterable(
+                await asyncio.gather(*(biliUser.sendmsg() for biliUser, _ in running.values()))
+            )
+        )
+    if report is not None:
+        report(messageList)
+    else:
+        [log.info(message) for message in messageList]
+    await close_session()
+    get_room_cache(config).close()
+    get_checkpoint_store(config).close()
+    log_router.stop()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+
+
+def _run_shard(index: int, accounts: list, reports):
+    """分片子进程入口：在独立的事件循环中运行分到的账号，结束时把汇总消息发回主进程"""
+    # 每个分片各自提供指标服务，端口为 METRICS_PORT + 分片序号
+    metrics_port = config["METRICS_PORT"] + index if config["METRICS_PORT"] else 0
+    # 限速器是进程内的，共享限速（RATE_LIMITS 的 rate/burst）按进程数平分，合计不超过配置值
+    config["RATE_LIMIT_SHARES"] = _workers()
+    loop = speedups.new_event_loop()
+    try:
+        loop.run_until_complete(
+            main(
+                accounts,
+                report=lambda messages: reports.put((index, messages)),
+                metrics_port=metrics_port,
+                shard=(index, _workers()),
+            )
         )
-    [log.info(message) for message in messageList]
-    await session.close()
+    except Exception:
+        # 异常已由 log.catch 记录；以非 0 退出码结束，由主进程重启该分片
+        sys.exit(1)
+
+
+def _workers() -> int:
+    return config["WORKERS"] or os.cpu_count() or 1
 
 
 def run(*args, **kwargs):
-    loop = asyncio.new_event_loop()
-    # main() 中的 watchinglive() 是无限循环，会一直运行
-    loop.run_until_complete(main())
+    workers = _workers()
+    if workers > 1 and len(users["USERS"]) > 1:
+        # 账号按 access_key 分到多个进程，每个进程一个事件循环，充分利用多核
+        from src.shard import ShardSupervisor  # 单进程运行时不需要导入 multiprocessing
+
+        log.info(f"分片模式：{len(users['USERS'])} 个账号分到 {workers} 个进程")
+        ShardSupervisor(
+            _run_shard, users["USERS"], workers, keep_empty=_hot_reload_enabled()
+        ).run()
+    else:
+        loop = speedups.new_event_loop()
+        # main() 中的 watchinglive() 是无限循环，会一直运行
+        try:
+            loop.run_until_complete(main())
+        except Exception:
+            pass  # 异常已由 log.catch 记录
     # 正常情况下不会执行到这里，除非发生异常
     log.warning("任务意外退出。")
 
 
 if __name__ == "__main__":
+    # PyInstaller 打包后分片子进程需要
+    import multiprocessing
+
+    multiprocessing.freeze_support()
     log.info("启动守护模式，任务将持续运行。")
     # 由于 watchinglive() 是无限循环，任务会一直运行，不需要调度器
     # 直接运行一次即可，任务内部会持续执行
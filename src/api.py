@@ -1,19 +1,28 @@
 import asyncio
+import functools
 from hashlib import md5
 import hashlib
 import os
 import random
 import sys
 import time
-import json
 import re
-from typing import Union
+from types import MappingProxyType
+from contextlib import aclosing
+from typing import Optional, Union
 from loguru import logger
-from urllib.parse import urlencode, urlparse
+from urllib.parse import quote_plus, urlencode, urlparse
 
 
 from aiohttp import ClientSession
 
+from . import metrics
+from .speedups import dumps_compact, json_loads
+from .breaker import get_breaker
+from .jsonstream import JsonArrayStream
+from .medal import Medal
+from .ratelimit import get_rate_limiter
+
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
@@ -51,37 +60,120 @@ class SingableDict(dict):
         return {**_sorted, "sign": Crypto.sign(_sorted)}
 
 
-def retry(tries=3, interval=1):
+class SignedTemplate:
+    """
+    单个接口的签名模板：静态参数只排序、编码一次，每次请求只编码动态字段
+    生成的结果与 SingableDict(params).signed 经 urlencode 后完全一致
+    """
+
+    def __init__(self, static: dict, dynamic: tuple):
+        self.dynamic = frozenset(dynamic)
+        # 按参数名排序后，相邻的静态参数预先拼接成一段
+        self._parts = []
+        for key in sorted(set(static) | self.dynamic):
+            if key in self.dynamic:
+                self._parts.append((key, f"{quote_plus(key)}="))
+            elif self._parts and self._parts[-1][0] is None:
+                self._parts[-1] = (None, f"{self._parts[-1][1]}&{quote_plus(key)}={quote_plus(str(static[key]))}")
+            else:
+                self._parts.append((None, f"{quote_plus(key)}={quote_plus(str(static[key]))}"))
+
+    def encode(self, dynamic: dict) -> str:
+        """返回带 sign 的 urlencoded 字符串，可直接作为 query 或表单 body 发送"""
+        qs = "&".join(
+            piece if key is None else piece + quote_plus(str(dynamic[key]))
+            for key, piece in self._parts
+        )
+        return f"{qs}&sign={Crypto.md5(qs + Crypto.APPSECRET)}"
+
+
+class RequestSigner:
+    """
+    每个账号一个的签名请求构造器，按接口缓存 SignedTemplate
+    access_key / actionKey / appkey 作为所有接口共有的静态参数
+    """
+
+    def __init__(self, access_key: str):
+        self.auth = {
+            "access_key": access_key,
+            "actionKey": "appkey",
+            "appkey": Crypto.APPKEY,
+        }
+        self._templates = {}
+
+    def sign(self, endpoint: str, dynamic: dict, static: dict = None) -> str:
+        """
+        :param endpoint: 接口名，同一接口每次调用的动态字段名必须一致
+        :param dynamic: 每次请求都会变化的字段（如 ts）
+        :param static: 接口固定参数，只在首次构造模板时使用
+        """
+        template = self._templates.get(endpoint)
+        if template is None:
+            template = SignedTemplate({**self.auth, **(static or {})}, tuple(dynamic))
+            self._templates[endpoint] = template
+        return template.encode(dynamic)
+
+
+def retry(tries=3, interval=1, max_interval=8):
+    """
+    BiliApi 请求重试：指数退避 + 随机抖动，按域名熔断
+    重试状态只保存在本次调用内；调用方可传入 deadline（秒）限制本次调用（含重试）的总耗时，
+    未传入时使用配置 RETRY_DEADLINE
+    每次请求前先在本地限速器排队拿令牌：排队时间计入 deadline，但排队超时不算域名失败，不触发熔断
+    """
     def decorate(func):
         async def wrapper(*args, **kwargs):
+            api, url = args[0], args[1]
+            deadline = kwargs.pop("deadline", None) or api.u.config.get("RETRY_DEADLINE", 30)
+            breaker = get_breaker(url, api.u.config)
+            log = api.log
+            started = time.monotonic()
             count = 0
-            func.isRetryable = False
-            log = logger.bind(user=f"{args[0].u.name}")
             while True:
+                remaining = deadline - (time.monotonic() - started)
+                try:
+                    await asyncio.wait_for(api.limiter.acquire(url, api.u.access_key), max(remaining, 0.1))
+                except asyncio.TimeoutError:
+                    log.error(f"API {urlparse(url).path} 本地限速排队超时，放弃本次调用（已重试{count}次）")
+                    raise
+                breaker.before_call()
+                remaining = deadline - (time.monotonic() - started)
                 try:
-                    result = await func(*args, **kwargs)
+                    result = await asyncio.wait_for(func(*args, **kwargs), max(remaining, 0.1))
                 except Exception as e:
                     count += 1
                     if type(e) == BiliApiError:
                         if e.code == 1011040:
+                            breaker.on_success()
                             raise e
                         elif e.code == 10030:
-                            await asyncio.sleep(10)
+                            # 被限流：降低该接口的令牌速率，由限速器控制重试节奏
+                            breaker.on_success()
+                            api.limiter.penalize(url, api.u.access_key)
                         elif e.code == -504:
-                            pass
+                            breaker.on_failure()
                         else:
+                            # 业务错误说明域名本身可用，不重试
+                            breaker.on_success()
                             raise e
-                    if count > tries:
-                        log.error(f"API {urlparse(args[1]).path} 调用出现异常: {str(e)}")
-                        raise e
                     else:
-                        # log.error(f"API {urlparse(args[1]).path} 调用出现异常: {str(e)}，重试中，第{count}次重试")
-                        await asyncio.sleep(interval)
-                    func.isRetryable = True
+                        # 网络错误、超时等
+                        breaker.on_failure()
+                    delay = min(max_interval, interval * 2 ** (count - 1))
+                    delay = delay / 2 + random.uniform(0, delay / 2)
+                    elapsed = time.monotonic() - started
+                    if count > tries or elapsed + delay >= deadline:
+                        log.error(
+                            f"API {urlparse(url).path} 调用出现异常: {str(e) or type(e).__name__}"
+                            f"（已重试{count - 1}次，耗时{elapsed:.1f}秒）"
+                        )
+                        raise e
+                    # log.error(f"API {urlparse(url).path} 调用出现异常: {str(e)}，重试中，第{count}次重试")
+                    metrics.api_retries.inc(metrics.endpoint_label(url))
+                    await asyncio.sleep(delay)
                 else:
-                    if func.isRetryable:
-                        pass
-                        # log.success(f"重试成功")
+                    breaker.on_success()
+                    api.limiter.recover(url, api.u.access_key)
                     return result
 
         return wrapper
@@ -90,10 +182,10 @@ def retry(tries=3, interval=1):
 
 
 def client_sign(data: dict):
-    _str = json.dumps(data, separators=(",", ":"))
+    _bytes = dumps_compact(data)
     for n in ["sha512", "sha3_512", "sha384", "sha3_384", "blake2b"]:
-        _str = hashlib.new(n, _str.encode("utf-8")).hexdigest()
-    return _str
+        _bytes = hashlib.new(n, _bytes).hexdigest().encode("ascii")
+    return _bytes.decode("ascii")
 
 
 def randomString(length: int = 16) -> str:
@@ -112,14 +204,53 @@ class BiliApiError(Exception):
 
 
 class BiliApi:
-    headers = {
+    headers = MappingProxyType({
         "User-Agent": "Mozilla/5.0 BiliDroid/6.73.1 (bbcallen@gmail.com) os/android model/Mi 10 Pro mobi_app/android build/6731100 channel/xiaomi innerVer/6731110 osVer/12 network/2",
-    }
+    })
+    # POST 表单请求使用的请求头，不再在每次请求时修改共享的 headers
+    formHeaders = MappingProxyType({
+        **headers,
+        "Content-Type": "application/x-www-form-urlencoded",
+    })
     from .user import BiliUser
 
     def __init__(self, u: BiliUser, s: ClientSession):
         self.u = u
         self.session = s
+        self.signer = RequestSigner(u.access_key)
+        self._log_key = None
+        self._log = None
+        # 所有请求都经过进程内共享的限速器
+        self.limiter = get_rate_limiter(u.config)
+        # MedalWall 缓存及请求计数
+        self._medal_wall = None
+        self._medal_wall_index = {}  # target_id -> MedalWall 原始条目
+        self._medal_wall_time = 0
+        self._medal_wall_lock = asyncio.Lock()
+        self._medal_wall_loader = None  # getMedalWallItem 在后台读取剩余部分的任务
+        self.medalWallStats = {"requests": 0, "cache_hits": 0}
+
+    @property
+    def log(self):
+        """
+        按账号缓存的 logger，避免在心跳等热路径上每次都重新 bind
+        登录后用户名 / UID 变化时重新生成
+        """
+        key = (self.u.name, self.u.mid)
+        if self._log_key != key:
+            self._log_key = key
+            self._log = logger.bind(user=self.u.name, uid=self.u.mid)
+        return self._log
+
+    def _url(self, url: str) -> str:
+        """
+        配置了 API_BASE_URL 时，把 B 站各域名替换为该地址（用于本地模拟服务压测）
+        """
+        base = self.u.config.get("API_BASE_URL")
+        if not base:
+            return url
+        parsed = urlparse(url)
+        return base.rstrip("/") + url[len(parsed.scheme) + 3 + len(parsed.netloc):]
 
     def __check_response(self, resp: dict) -> dict:
         if resp["code"] != 0 or ("mode_info" in resp["data"] and resp["message"] != ""):
@@ -129,113 +260,203 @@ class BiliApi:
     @retry()
     async def __get(self, *args, **kwargs):
         async with self.session.get(*args, **kwargs) as resp:
-            return self.__check_response(await resp.json())
+            return self.__check_response(await resp.json(loads=json_loads))
 
     @retry()
     async def __post(self, *args, **kwargs):
         async with self.session.post(*args, **kwargs) as resp:
-            return self.__check_response(await resp.json())
+            return self.__check_response(await resp.json(loads=json_loads))
 
-    async def getFansMedalandRoomID(self, verbose: bool = False) -> dict:
+    @retry()
+    async def __fetch(self, url: str, method: str = "GET", **kwargs) -> dict:
+        """同样经过限速、重试和熔断，但返回完整的响应 JSON，由调用方自行处理 code"""
+        async with self.session.request(method, url, **kwargs) as resp:
+            return await resp.json(loads=json_loads)
+
+    @retry()
+    async def __open(self, url: str, method: str = "GET", **kwargs):
         """
-        使用 MedalWall 接口获取粉丝牌信息
+        同样经过限速、重试和熔断，收到响应头后返回响应对象，用于边下载边解析的接口
+        重试只覆盖建立连接和等待响应头，调用方用 async with 读取响应体并释放连接
         """
-        url = "https://api.live.bilibili.com/xlive/web-ucenter/user/MedalWall"
-        # 使用 app 端认证方式（带签名）
-        params = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
-            "ts": int(time.time()),
-            "target_id": self.u.mid,
-        }
-        log = logger.bind(user=self.u.name if hasattr(self.u, 'name') else 'Unknown')
+        return await self.session.request(method, url, **kwargs)
+
+    def invalidateMedalWall(self):
+        """
+        使 MedalWall 缓存失效，下次读取时重新请求接口
+        """
+        self._medal_wall = None
+        self._medal_wall_index = {}
+        self._medal_wall_time = 0
+
+    def _medalWallFresh(self) -> bool:
+        ttl = self.u.config.get("MEDAL_WALL_CACHE_TTL", 60)
+        return self._medal_wall is not None and time.monotonic() - self._medal_wall_time < ttl
+
+    def _storeMedalWall(self, medal_list: list):
+        self._medal_wall = medal_list
+        self._medal_wall_index = {item.get("medal_info", {}).get("target_id", 0): item for item in medal_list}
+        self._medal_wall_time = time.monotonic()
+
+    async def getMedalWall(self, verbose: bool = False) -> list:
+        """
+        获取 MedalWall 原始列表，在 MEDAL_WALL_CACHE_TTL 秒内复用上一次的结果（返回同一个列表对象，只读使用）
+        并发的缓存未命中只会发出一次请求
+        """
+        async with self._medal_wall_lock:
+            if self._medalWallFresh():
+                self.medalWallStats["cache_hits"] += 1
+                return self._medal_wall
+            medal_list = [item async for item in self._streamMedalWall(verbose)]
+            self._storeMedalWall(medal_list)
+            return medal_list
+
+    async def iterMedalWall(self, verbose: bool = False):
+        """
+        逐条产出 MedalWall 原始条目：缓存有效时遍历缓存，否则边下载边解析，完整读完后写入缓存
+        调用方可以提前结束（用 contextlib.aclosing 包裹以立即释放连接），提前结束时不写入缓存
+        """
+        if self._medalWallFresh():
+            self.medalWallStats["cache_hits"] += 1
+            for item in self._medal_wall:
+                yield item
+            return
+        medal_list = []
+        async with aclosing(self._streamMedalWall(verbose)) as stream:
+            async for item in stream:
+                medal_list.append(item)
+                yield item
+        self._storeMedalWall(medal_list)
+
+    async def _streamMedalWall(self, verbose: bool = False):
+        """
+        请求 MedalWall，边接收响应边解析 data.list，逐条产出条目
+        响应中带有分页信息（data.page_info）且还有下一页时，继续请求下一页
+        """
+        url = self._url("https://api.live.bilibili.com/xlive/web-ucenter/user/MedalWall")
+        log = self.log
         if verbose:
             log.debug("[粉丝牌API] 调用 MedalWall (使用 app 端签名认证)")
 
-        # 使用 SingableDict 自动添加签名
-        async with self.session.get(url, params=SingableDict(params).signed, headers=self.headers) as resp:
-            resp_data = await resp.json()
+        page = 1
+        while True:
+            fields = {
+                "ts": int(time.time()),
+                "target_id": self.u.mid,
+            }
+            # 使用 app 端认证方式（带签名）；第一页不带 page 参数，与不分页时的请求相同
+            if page == 1:
+                params = self.signer.sign("MedalWall", fields)
+            else:
+                params = self.signer.sign("MedalWall.page", {**fields, "page": page})
+
+            self.medalWallStats["requests"] += 1
+            stream = JsonArrayStream("list")
+            count = 0
+            async with await self.__open(url, params=params, headers=self.headers) as resp:
+                async for chunk in resp.content.iter_any():
+                    for item in stream.feed(chunk):
+                        count += 1
+                        yield item
+                resp_data = stream.close()
             if resp_data.get("code") != 0:
                 error_msg = resp_data.get("message", "未知错误")
                 error_code = resp_data.get("code", -1)
+                if error_code == 10030:
+                    self.limiter.penalize(url, self.u.access_key)
                 log.error(f"[粉丝牌API] MedalWall 接口失败: code={error_code}, message={error_msg}")
                 raise BiliApiError(error_code, error_msg)
 
-            data = resp_data.get("data", {})
-            medal_list = data.get("list", [])
-
-            for item in medal_list:
-                medal_info = item.get("medal_info", {})
-                target_id = medal_info.get("target_id", 0)
-                link = item.get("link", "")
-                room_id = self.extractRoomIdFromLink(link)
-                converted_item = {
-                    "medal": {
-                        "target_id": target_id,
-                        "level": medal_info.get("level", 0),
-                        "medal_name": medal_info.get("medal_name", ""),
-                        "today_feed": medal_info.get("today_feed", 0),
-                        "intimacy": medal_info.get("intimacy", 0),
-                        "next_intimacy": medal_info.get("next_intimacy", 0),
-                    },
-                    "anchor_info": {
-                        "nick_name": item.get("target_name", "未知"),
-                        "face": item.get("target_icon", ""),
-                    },
-                    "room_info": {
-                        "room_id": room_id,
-                    },
-                    "live_status": item.get("live_status", 0),
-                }
-                yield converted_item
+            page_info = (resp_data.get("data") or {}).get("page_info") or {}
+            has_more = page_info.get("has_more", page < page_info.get("total_page", 0))
+            if not has_more or not count:
+                return
+            page += 1
+
+    async def getFansMedalandRoomID(self, verbose: bool = False):
+        """
+        使用 MedalWall 接口获取粉丝牌信息，边下载边解析，逐个产出
+        结果会缓存 MEDAL_WALL_CACHE_TTL 秒，需要最新数据时先调用 invalidateMedalWall()
+        """
+        async with aclosing(self.iterMedalWall(verbose)) as items:
+            async for item in items:
+                yield self.convertMedalWallItem(item)
 
+    def convertMedalWallItem(self, item: dict) -> Medal:
+        """把 MedalWall 原始条目转换为 getMedals 使用的 Medal（每次返回新的对象）"""
+        return Medal.from_wall_item(item, self.extractRoomIdFromLink(item.get("link", "")))
 
+    async def getMedalWallItem(self, target_id: int) -> Optional[dict]:
+        """
+        按 target_id 取 MedalWall 原始条目
+        缓存有效时直接查索引；否则在后台下载整个 MedalWall 并写入缓存，解析到目标条目时立即返回
+        """
+        if self._medalWallFresh():
+            self.medalWallStats["cache_hits"] += 1
+            return self._medal_wall_index.get(target_id)
+        found = asyncio.get_running_loop().create_future()
+        self._medal_wall_loader = asyncio.ensure_future(self._loadMedalWall(target_id, found))
+        self._medal_wall_loader.add_done_callback(functools.partial(self._medalWallLoaded, found))
+        return await found
+
+    async def _loadMedalWall(self, target_id: int, found: asyncio.Future):
+        async with self._medal_wall_lock:
+            if self._medalWallFresh():
+                # 等锁期间其他协程已经刷新了缓存
+                self.medalWallStats["cache_hits"] += 1
+            else:
+                medal_list = []
+                async for item in self._streamMedalWall():
+                    medal_list.append(item)
+                    if not found.done() and item.get("medal_info", {}).get("target_id") == target_id:
+                        found.set_result(item)
+                self._storeMedalWall(medal_list)
+        if not found.done():
+            found.set_result(self._medal_wall_index.get(target_id))
+
+    def _medalWallLoaded(self, found: asyncio.Future, task: asyncio.Future):
+        if task.cancelled():
+            found.cancel()
+            return
+        error = task.exception()
+        if found.done():
+            if error is not None:
+                self.log.debug(f"[粉丝牌API] 后台读取 MedalWall 剩余部分失败: {error}")
+        elif error is not None:
+            found.set_exception(error)
+        else:
+            found.set_result(None)
 
-    async def likeInteractV3(self, room_id: int, up_id: int, self_uid: int):
-        url = "https://api.live.bilibili.com/xlive/app-ucenter/v1/like_info_v3/like/likeReportV3"
-        data = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
-            "click_time": 1,
+    async def likeInteractV3(self, room_id: int, up_id: int, self_uid: int, click_time: int = 1):
+        """点赞直播间，click_time 为本次上报的点赞次数"""
+        url = self._url("https://api.live.bilibili.com/xlive/app-ucenter/v1/like_info_v3/like/likeReportV3")
+        data = self.signer.sign("likeReportV3", {
             "room_id": room_id,
             "anchor_id": up_id,
             "uid": up_id,
-        }
-        self.headers.update(
-            {
-                "Content-Type": "application/x-www-form-urlencoded",
-            }
-        ),
+            "click_time": click_time,
+        })
         # for _ in range(3):
-        await self.__post(url, data=SingableDict(data).signed, headers=self.headers)
+        await self.__post(url, data=data, headers=self.formHeaders)
 
     async def shareRoom(self, room_id: int):
         """
         分享直播间
         """
-        url = "https://api.live.bilibili.com/xlive/app-room/v1/index/TrigerInteract"
-        data = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        url = self._url("https://api.live.bilibili.com/xlive/app-room/v1/index/TrigerInteract")
+        data = self.signer.sign("TrigerInteract", {
             "ts": int(time.time()),
-            "interact_type": 3,
             "roomid": room_id,
-        }
-        self.headers.update(
-            {
-                "Content-Type": "application/x-www-form-urlencoded",
-            }
-        ),
-        await self.__post(url, data=SingableDict(data).signed, headers=self.headers)
+        }, static={
+            "interact_type": 3,
+        })
+        await self.__post(url, data=data, headers=self.formHeaders)
 
     async def sendDanmaku(self, room_id: int) -> str:
         """
         发送弹幕
         """
-        url = "https://api.live.bilibili.com/xlive/app-room/v1/dM/sendmsg"
+        url = self._url("https://api.live.bilibili.com/xlive/app-room/v1/dM/sendmsg")
         danmakus = [
             "(⌒▽⌒).",
             "（￣▽￣）.",
@@ -253,12 +474,9 @@ class BiliApi:
             "⁄(⁄ ⁄•⁄ω⁄•⁄ ⁄)⁄.",
             "←◡←.",
         ]
-        params = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        params = self.signer.sign("sendmsg", {
             "ts": int(time.time()),
-        }
+        })
         data = {
             "cid": room_id,
             "msg": random.choice(danmakus),
@@ -266,68 +484,51 @@ class BiliApi:
             "color": "16777215",
             "fontsize": "25",
         }
-        self.headers.update(
-            {
-                "Content-Type": "application/x-www-form-urlencoded",
-            }
-        ),
         resp = await self.__post(
-            url, params=SingableDict(params).signed, data=data, headers=self.headers
+            url, params=params, data=data, headers=self.formHeaders
         )
-        return json.loads(resp["mode_info"]["extra"])["content"]
+        return json_loads(resp["mode_info"]["extra"])["content"]
 
     async def loginVerift(self):
         """
         登录验证
         """
-        url = "https://app.bilibili.com/x/v2/account/mine"
-        params = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        url = self._url("https://app.bilibili.com/x/v2/account/mine")
+        params = self.signer.sign("account/mine", {
             "ts": int(time.time()),
-        }
-        return await self.__get(url, params=SingableDict(params).signed, headers=self.headers)
+        })
+        return await self.__get(url, params=params, headers=self.headers)
 
     async def doSign(self):
         """
         直播区签到
         """
-        url = "https://api.live.bilibili.com/rc/v1/Sign/doSign"
-        params = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        url = self._url("https://api.live.bilibili.com/rc/v1/Sign/doSign")
+        params = self.signer.sign("doSign", {
             "ts": int(time.time()),
-        }
-        return await self.__get(url, params=SingableDict(params).signed, headers=self.headers)
+        })
+        return await self.__get(url, params=params, headers=self.headers)
 
     async def getUserInfo(self):
         """
         用户直播等级
         """
-        url = "https://api.live.bilibili.com/xlive/app-ucenter/v1/user/get_user_info"
-        params = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        url = self._url("https://api.live.bilibili.com/xlive/app-ucenter/v1/user/get_user_info")
+        params = self.signer.sign("get_user_info", {
             "ts": int(time.time()),
-        }
-        return await self.__get(url, params=SingableDict(params).signed, headers=self.headers)
+        })
+        return await self.__get(url, params=params, headers=self.headers)
 
     async def getMedalsInfoByUid(self, uid: int):
         """
         用户勋章信息
         """
-        url = "https://api.live.bilibili.com/xlive/app-ucenter/v1/fansMedal/fans_medal_info"
-        params = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        url = self._url("https://api.live.bilibili.com/xlive/app-ucenter/v1/fansMedal/fans_medal_info")
+        params = self.signer.sign("fans_medal_info", {
             "ts": int(time.time()),
             "target_id": uid,
-        }
-        return await self.__get(url, params=SingableDict(params).signed, headers=self.headers)
+        })
+        return await self.__get(url, params=params, headers=self.headers)
 
     async def getUserMedalInfo(self, uid: int, up_uid: int):
         """
@@ -336,59 +537,52 @@ class BiliApi:
         :param up_uid: UP主UID
         :return: 返回data中的curr_show的is_light字段，1表示已点亮，0表示未点亮
         """
-        url = "https://api.live.bilibili.com/xlive/app-ucenter/v1/fansMedal/user_medal_info"
-        params = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        url = self._url("https://api.live.bilibili.com/xlive/app-ucenter/v1/fansMedal/user_medal_info")
+        params = self.signer.sign("user_medal_info", {
             "ts": int(time.time()),
             "uid": uid,
             "up_uid": up_uid,
-        }
-        return await self.__get(url, params=SingableDict(params).signed, headers=self.headers)
+        })
+        return await self.__get(url, params=params, headers=self.headers)
 
-    async def entryRoom(self, room_id: int, up_id: int):
+    async def entryRoom(self, room_id: int, up_id: int, deadline: float = None):
         """
         进入直播间（首次进入时需要调用）
+        :param deadline: 本次调用（含重试）的最长耗时（秒），一般为心跳间隔
         """
-        url = "https://live-trace.bilibili.com/xlive/data-interface/v1/heartbeat/mobileEntry"
+        url = self._url("https://live-trace.bilibili.com/xlive/data-interface/v1/heartbeat/mobileEntry")
         current_time = int(time.time())
         timestamp = current_time - 60  # 开始观看时间戳，当前时间减去60秒
         
-        data = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        data = self.signer.sign("mobileEntry", {
             "ts": current_time,
+            "buvid": randomString(37).upper(),
+            "room_id": f"{room_id}",
+            "timestamp": f"{timestamp}",
+            "up_id": f"{up_id}",
+            "gu_id": randomString(43).lower(),
+            "visit_id": randomString(32).lower(),
+            "client_ts": f"{current_time}",
+        }, static={
             "platform": "android",
             "uuid": self.u.uuids[0],
-            "buvid": randomString(37).upper(),
             "seq_id": "1",
-            "room_id": f"{room_id}",
             "parent_id": "6",
             "area_id": "283",
-            "timestamp": f"{timestamp}",
             "secret_key": "axoaadsffcazxksectbbb",
             "watch_time": "60",
-            "up_id": f"{up_id}",
             "up_level": "40",
             "jump_from": "30000",
-            "gu_id": randomString(43).lower(),
-            "visit_id": randomString(32).lower(),
             "click_id": self.u.uuids[1],
             "heart_beat": "[]",
-            "client_ts": f"{current_time}",
-        }
-        self.headers.update({
-            "Content-Type": "application/x-www-form-urlencoded",
         })
         try:
-            result = await self.__post(url, data=SingableDict(data).signed, headers=self.headers)
-            log = logger.bind(user=self.u.name if hasattr(self.u, 'name') else 'Unknown')
+            result = await self.__post(url, data=data, headers=self.formHeaders, deadline=deadline)
+            log = self.log
             log.debug(f"[entryRoom] 进入直播间响应: {result}")
             return result
         except Exception as e:
-            log = logger.bind(user=self.u.name if hasattr(self.u, 'name') else 'Unknown')
+            log = self.log
             log.error(f"[entryRoom] 进入直播间失败: {e}")
             raise
 
@@ -399,6 +593,7 @@ class BiliApi:
         watch_time: int = 60,
         start_timestamp: int = None,
         seq_id: int = 1,
+        deadline: float = None,
     ):
         """
         发送心跳包
@@ -407,8 +602,9 @@ class BiliApi:
         :param watch_time: 观看时长（秒），默认60秒
         :param start_timestamp: 开始观看的时间戳，如果为None则使用当前时间减去watch_time
         :param seq_id: 心跳序号，从1开始递增
+        :param deadline: 本次调用（含重试）的最长耗时（秒），一般为心跳间隔，避免重试拖到下一次心跳
         """
-        url = "https://live-trace.bilibili.com/xlive/data-interface/v1/heartbeat/mobileHeartBeat"
+        url = self._url("https://live-trace.bilibili.com/xlive/data-interface/v1/heartbeat/mobileHeartBeat")
         current_time = int(time.time())
         
         # 优先使用传入的 start_timestamp，确保时间戳连续
@@ -464,28 +660,29 @@ class BiliApi:
             "player_type": "0",
             "client_ts": f"{current_time}",
         }
-        data.update(
-            {
-                "client_sign": client_sign(data),
-                "access_key": self.u.access_key,
-                "actionKey": "appkey",
-                "appkey": Crypto.APPKEY,
-                "ts": int(time.time()),
-            }
-        )
-        self.headers.update(
-            {
-                "Content-Type": "application/x-www-form-urlencoded",
-            }
-        ),
+        # client_sign 依赖上面 data 的字段顺序，签名时只把变化的字段作为动态参数
+        body = self.signer.sign("mobileHeartBeat", {
+            "buvid": data["buvid"],
+            "seq_id": data["seq_id"],
+            "room_id": data["room_id"],
+            "timestamp": data["timestamp"],
+            "watch_time": data["watch_time"],
+            "up_id": data["up_id"],
+            "gu_id": data["gu_id"],
+            "up_session": data["up_session"],
+            "visit_id": data["visit_id"],
+            "client_ts": data["client_ts"],
+            "client_sign": client_sign(data),
+            "ts": int(time.time()),
+        }, static=data)
         try:
-            result = await self.__post(url, data=SingableDict(data).signed, headers=self.headers)
+            result = await self.__post(url, data=body, headers=self.formHeaders, deadline=deadline)
             # 记录心跳包响应（用于调试）
-            log = logger.bind(user=self.u.name if hasattr(self.u, 'name') else 'Unknown')
+            log = self.log
             log.debug(f"[heartbeat] 心跳#{seq_id} 响应: {result}")
             return result
         except Exception as e:
-            log = logger.bind(user=self.u.name if hasattr(self.u, 'name') else 'Unknown')
+            log = self.log
             log.error(f"[heartbeat] 请求失败: {e} | ctx={debug_info}")
             raise
 
@@ -493,58 +690,42 @@ class BiliApi:
         """
         佩戴粉丝牌
         """
-        url = "https://api.live.bilibili.com/xlive/app-ucenter/v1/fansMedal/wear"
-        data = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        url = self._url("https://api.live.bilibili.com/xlive/app-ucenter/v1/fansMedal/wear")
+        data = self.signer.sign("fansMedal/wear", {
             "ts": int(time.time()),
             "medal_id": medal_id,
+        }, static={
             "platform": "android",
             "type": "1",
             "version": "0",
-        }
-        self.headers.update(
-            {
-                "Content-Type": "application/x-www-form-urlencoded",
-            }
-        ),
-        return await self.__post(url, data=SingableDict(data).signed, headers=self.headers)
+        })
+        return await self.__post(url, data=data, headers=self.formHeaders)
 
     async def getGroups(self):
-        url = "https://api.vc.bilibili.com/link_group/v1/member/my_groups?build=0&mobi_app=web"
-        params = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        url = self._url("https://api.vc.bilibili.com/link_group/v1/member/my_groups?build=0&mobi_app=web")
+        params = self.signer.sign("my_groups", {
             "ts": int(time.time()),
-        }
-        res = await self.__get(url, params=SingableDict(params).signed, headers=self.headers)
+        })
+        res = await self.__get(url, params=params, headers=self.headers)
         list = res["list"] if "list" in res else []
         for group in list:
             yield group
 
     async def signInGroups(self, group_id: int, owner_id: int):
-        url = "https://api.vc.bilibili.com/link_setting/v1/link_setting/sign_in"
-        params = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        url = self._url("https://api.vc.bilibili.com/link_setting/v1/link_setting/sign_in")
+        params = self.signer.sign("sign_in", {
             "ts": int(time.time()),
             "group_id": group_id,
             "owner_id": owner_id,
-        }
-        return await self.__get(url, params=SingableDict(params).signed, headers=self.headers)
+        })
+        return await self.__get(url, params=params, headers=self.headers)
 
     async def getOneBattery(self):
-        url = "https://api.live.bilibili.com/xlive/app-ucenter/v1/userTask/UserTaskReceiveRewards"
-        data = {
-            "access_key": self.u.access_key,
-            "actionKey": "appkey",
-            "appkey": Crypto.APPKEY,
+        url = self._url("https://api.live.bilibili.com/xlive/app-ucenter/v1/userTask/UserTaskReceiveRewards")
+        data = self.signer.sign("UserTaskReceiveRewards", {
             "ts": int(time.time()),
-        }
-        return await self.__post(url, data=SingableDict(data).signed, headers=self.headers)
+        })
+        return await self.__post(url, data=data, headers=self.formHeaders)
 
     def extractRoomIdFromLink(self, link: str) -> int:
         """
@@ -565,64 +746,106 @@ class BiliApi:
         # 如果不是直播间链接，返回0（需要后续通过其他方式获取）
         return 0
 
-    async def getRoomIdByUid(self, uid: int) -> int:
+    async def getRoomIdByUid(self, uid: int) -> Optional[int]:
         """
         通过用户UID获取直播间room_id（备用方法，优先使用 extractRoomIdFromLink）
+        返回 0 表示接口确认该用户没有直播间，None 表示查询失败（网络错误、风控等），结果未知
         """
         try:
             # 方法1: 通过用户空间信息获取
-            url = f"https://api.bilibili.com/x/space/acc/info?mid={uid}"
+            url = self._url(f"https://api.bilibili.com/x/space/acc/info?mid={uid}")
             web_headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
                 "Referer": f"https://space.bilibili.com/{uid}",
             }
-            async with self.session.get(url, headers=web_headers) as resp:
-                resp_data = await resp.json()
-                if resp_data.get("code") == 0:
-                    data = resp_data.get("data", {})
-                    live_room = data.get("live_room", {})
-                    room_id = live_room.get("roomid", 0)
-                    if room_id:
-                        return room_id
+            resp_data = await self.__fetch(url, headers=web_headers)
+            if resp_data.get("code") != 0:
+                self.log.debug(
+                    f"通过UID {uid} 获取room_id失败: code={resp_data.get('code')}, message={resp_data.get('message', '')}"
+                )
+                return None
+            data = resp_data.get("data") or {}
+            live_room = data.get("live_room") or {}
+            return live_room.get("roomid", 0) or 0
         except Exception as e:
-            log = logger.bind(user=self.u.name if hasattr(self.u, 'name') else 'Unknown')
-            log.debug(f"通过UID {uid} 获取room_id失败: {e}")
-        
-        # 如果方法1失败，返回0
-        return 0
+            self.log.debug(f"通过UID {uid} 获取room_id失败: {e}")
+            return None
+
+    async def getStatusInfoByUids(self, uids: list, chunk_size: int = 50) -> dict:
+        """
+        批量获取主播的开播状态和直播间ID（按 chunk_size 分批并发请求）
+        返回: {uid: {"room_id": int, "live_status": int, "live_time": int, "title": str}}，查询失败的 UID 不在结果中
+        live_time 为本场直播的开播时间戳，未开播时为 0
+        """
+        log = self.log
+        url = self._url("https://api.live.bilibili.com/room/v1/Room/get_status_info_by_uids")
+        web_headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Referer": "https://live.bilibili.com/",
+        }
+        uids = list(dict.fromkeys(int(uid) for uid in uids if uid))
+
+        async def _fetch_chunk(chunk: list) -> dict:
+            try:
+                resp_data = await self.__fetch(url, "POST", json={"uids": chunk}, headers=web_headers)
+                if resp_data.get("code") != 0:
+                    log.warning(
+                        f"批量获取开播状态失败: code={resp_data.get('code')}, message={resp_data.get('message', '')}"
+                    )
+                    return {}
+                # 没有直播间的 UID 不会出现在返回结果中；空结果时 data 可能是列表
+                data = resp_data.get("data") or {}
+                if not isinstance(data, dict):
+                    return {}
+                return {
+                    int(uid): {
+                        "room_id": info.get("room_id", 0),
+                        "live_status": info.get("live_status", 0),
+                        "live_time": int(info.get("live_time") or 0),
+                        "title": info.get("title", ""),
+                    }
+                    for uid, info in data.items()
+                }
+            except Exception as e:
+                log.warning(f"批量获取开播状态异常: {e}")
+                return {}
+
+        result = {}
+        chunks = [uids[i:i + chunk_size] for i in range(0, len(uids), chunk_size)]
+        for part in await asyncio.gather(*[_fetch_chunk(chunk) for chunk in chunks]):
+            result.update(part)
+        return result
 
     async def getRoomInfo(self, room_id: int):
         """
         获取直播间信息
         统一返回格式: {"room_info": {"room_id": int, "live_status": int, "title": str}}
         """
-        log = logger.bind(user=self.u.name if hasattr(self.u, 'name') else 'Unknown')
+        log = self.log
         
         try:
-            url = f"https://api.live.bilibili.com/room/v1/Room/get_info?room_id={room_id}"
+            url = self._url(f"https://api.live.bilibili.com/room/v1/Room/get_info?room_id={room_id}")
             
             web_headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
                 "Referer": f"https://live.bilibili.com/{room_id}",
             }
             
-            async with self.session.get(url, headers=web_headers) as resp:
-                resp_data = await resp.json()
-                
-                if resp_data.get("code") == 0:
-                    data = resp_data.get("data", {})
-                    return {
-                        "room_info": {
-                            "room_id": data.get("room_id"),
-                            "live_status": data.get("live_status", 0),
-                            "title": data.get("title", ""),
-                        }
+            resp_data = await self.__fetch(url, headers=web_headers)
+            if resp_data.get("code") == 0:
+                data = resp_data.get("data", {})
+                return {
+                    "room_info": {
+                        "room_id": data.get("room_id"),
+                        "live_status": data.get("live_status", 0),
+                        "title": data.get("title", ""),
                     }
-                else:
-                    error_code = resp_data.get('code')
-                    error_msg = resp_data.get('message', '')
-                    log.warning(f"获取直播间 {room_id} 信息失败: code={error_code}, message={error_msg}")
-                    return None
+                }
+            else:
+                error_code = resp_data.get('code')
+                error_msg = resp_data.get('message', '')
+                log.warning(f"获取直播间 {room_id} 信息失败: code={error_code}, message={error_msg}")
+                return None
         except Exception as e:
             log.error(f"获取直播间 {room_id} 信息异常: {e}")
             return None
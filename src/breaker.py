@@ -0,0 +1,88 @@
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+from loguru import logger
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开时直接抛出，不再向故障域名发请求"""
+
+    def __init__(self, host: str, retry_after: float):
+        self.host = host
+        self.retry_after = retry_after
+
+    def __str__(self):
+        return f"{self.host} 连续请求失败，已熔断，{self.retry_after:.0f}秒后重试"
+
+
+class CircuitBreaker:
+    """
+    单个域名的熔断器
+    - closed: 正常放行，连续失败 failure_threshold 次后打开
+    - open: 直接失败，reset_timeout 秒后进入 half-open
+    - half-open: 只放行一个试探请求，成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, host: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+
+    def before_call(self):
+        if self.state == "closed":
+            return
+        now = time.monotonic()
+        if self.state == "open":
+            remaining = self._opened_at + self.reset_timeout - now
+            if remaining > 0:
+                raise CircuitOpenError(self.host, remaining)
+            self.state = "half-open"
+        # half-open：同一时间只放行一个试探请求（试探请求超时未结束的视为丢失）
+        if self._probing and now - self._probe_started < self.reset_timeout:
+            raise CircuitOpenError(self.host, self.reset_timeout)
+        self._probing = True
+        self._probe_started = now
+
+    def on_success(self):
+        if self.state != "closed":
+            logger.bind(user="熔断").info(f"{self.host} 已恢复，关闭熔断")
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def on_failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.bind(user="熔断").warning(
+                    f"{self.host} 连续失败 {self.failures} 次，熔断 {self.reset_timeout:.0f} 秒"
+                )
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(url: str, config: dict = {}) -> CircuitBreaker:
+    """
+    获取 URL 所属域名的熔断器（进程内共享）
+    - BREAKER_FAILURE_THRESHOLD: 连续失败多少次后熔断
+    - BREAKER_RESET_TIMEOUT: 熔断持续时间（秒）
+    """
+    host = urlparse(str(url)).netloc
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(
+            host,
+            failure_threshold=int(config.get("BREAKER_FAILURE_THRESHOLD", 5)),
+            reset_timeout=float(config.get("BREAKER_RESET_TIMEOUT", 30)),
+        )
+    return breaker
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .config import get_base_dir
+from .medal import Medal
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS screening (
+    mid INTEGER PRIMARY KEY,
+    uuids TEXT NOT NULL,
+    medals TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS room_sessions (
+    mid INTEGER NOT NULL,
+    room_id INTEGER NOT NULL,
+    target_id INTEGER NOT NULL,
+    heart_num INTEGER NOT NULL,
+    cycle_heart_num INTEGER NOT NULL,
+    heartbeat_interval INTEGER NOT NULL,
+    cycle_started REAL NOT NULL,
+    last_heartbeat REAL NOT NULL,
+    initial_intimacy INTEGER NOT NULL,
+    PRIMARY KEY (mid, room_id)
+);
+"""
+
+SESSION_FIELDS = (
+    "target_id", "heart_num", "cycle_heart_num", "heartbeat_interval",
+    "cycle_started", "last_heartbeat", "initial_intimacy",
+)
+
+FLUSH_INTERVAL = 5  # 检查点写入合并的时间窗口（秒）
+
+
+class WatchStateStore:
+    """
+    观看进度检查点（SQLite），重启后从上次的心跳继续，不必重新走一遍登录后的预热流程
+    - screening: 每个账号最近一次筛选出的直播间列表和设备 uuid
+    - room_sessions: 每个正在观看的直播间的心跳序号、周期进度和上次心跳时间
+    只有上次心跳在 resume_window 秒内的直播间才会恢复，更早的视为服务端会话已失效
+    path 为 None 时不做任何持久化
+    写入先在内存中合并（同一直播间只保留最新进度），每 FLUSH_INTERVAL 秒在线程池中用一个事务写入，
+    不在事件循环中等待 SQLite 提交；close() 时写入剩余的修改
+    """
+
+    def __init__(self, path: Optional[str], resume_window: float = 120):
+        self.path = path
+        self.resume_window = resume_window
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()  # 连接在事件循环和线程池之间共用
+        self._sessions: Dict[Tuple[int, int], Optional[tuple]] = {}  # (mid, room_id) -> 待写入的进度，None 表示删除
+        self._screening: Dict[int, tuple] = {}  # mid -> 待写入的筛选结果
+        self._flush_task: Optional[asyncio.Task] = None
+        self._inflight = None  # 正在线程池中写入的修改，close() 时重新写一遍，避免随取消丢失
+        if path:
+            try:
+                # 自动提交；WAL 模式下多个分片进程可以同时读写同一个文件
+                self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.executescript(_SCHEMA)
+            except sqlite3.Error as e:
+                logger.bind(user="检查点").warning(f"打开 {path} 失败，本次不保存观看进度: {e}")
+                self._conn = None
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            if self._conn is None:
+                return []
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                # 写检查点失败不影响观看
+                logger.bind(user="检查点").warning(f"读写观看进度失败: {e}")
+                return []
+
+    def save_screening(self, mid: int, uuids: list, medals: List[Medal]):
+        if self._conn is None:
+            return
+        # 粉丝牌对象之后还会被修改，先取快照，序列化放到写入时
+        self._screening[mid] = (list(uuids), [medal.to_dict() for medal in medals], time.time())
+        self._schedule_flush()
+
+    def save_session(self, mid: int, room_id: int, **state):
+        if self._conn is None:
+            return
+        self._sessions[(mid, room_id)] = tuple(state[field] for field in SESSION_FIELDS)
+        self._schedule_flush()
+
+    def drop_session(self, mid: int, room_id: int):
+        if self._conn is None:
+            return
+        self._sessions[(mid, room_id)] = None
+        self._schedule_flush()
+
+    def _take_pending(self):
+        sessions, self._sessions = self._sessions, {}
+        screening, self._screening = self._screening, {}
+        return sessions, screening
+
+    def _schedule_flush(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+        except RuntimeError:
+            self.flush()  # 不在事件循环中时直接写入
+
+    async def _flush_later(self):
+        await asyncio.sleep(FLUSH_INTERVAL)
+        self._inflight = self._take_pending()
+        await asyncio.get_running_loop().run_in_executor(None, self._write, *self._inflight)
+        self._inflight = None
+        if self._sessions or self._screening:
+            # 写入期间又有新的修改（当时本任务仍在运行，没有另外安排写入），接着安排下一次
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+
+    def _write(self, sessions: dict, screening: dict):
+        """在一个事务中写入合并后的修改，可在线程池中调用"""
+        if not sessions and not screening:
+            return
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute("BEGIN")
+                for mid, (uuids, medals, updated) in screening.items():
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO screening (mid, uuids, medals, updated) VALUES (?, ?, ?, ?)",
+                        (mid, json.dumps(uuids), json.dumps(medals, ensure_ascii=False), updated),
+                    )
+                for (mid, room_id), state in sessions.items():
+                    if state is None:
+                        self._conn.execute("DELETE FROM room_sessions WHERE mid = ? AND room_id = ?", (mid, room_id))
+                    else:
+                        self._conn.execute(
+                            f"INSERT OR REPLACE INTO room_sessions (mid, room_id, {', '.join(SESSION_FIELDS)}) "
+                            f"VALUES (?, ?, {', '.join('?' * len(SESSION_FIELDS))})",
+                            (mid, room_id, *state),
+                        )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                # 写检查点失败不影响观看
+                logger.bind(user="检查点").warning(f"写入观看进度失败: {e}")
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+
+    def flush(self):
+        """立即同步写入所有待写入的修改"""
+        self._write(*self._take_pending())
+
+    def load(self, mid: int) -> Optional[dict]:
+        """
+        返回可恢复的观看进度 {"uuids", "medals", "sessions": {room_id: state}}
+        没有可恢复的直播间时返回 None，并清理该账号过期的进度
+        """
+        self.flush()
+        threshold = time.time() - self.resume_window
+        rows = self._execute(
+            f"SELECT room_id, {', '.join(SESSION_FIELDS)} FROM room_sessions WHERE mid = ? AND last_heartbeat >= ?",
+            (mid, threshold),
+        )
+        self._execute("DELETE FROM room_sessions WHERE mid = ? AND last_heartbeat < ?", (mid, threshold))
+        screening = self._execute("SELECT uuids, medals FROM screening WHERE mid = ?", (mid,))
+        if not rows or not screening:
+            return None
+        sessions: Dict[int, dict] = {row[0]: dict(zip(SESSION_FIELDS, row[1:])) for row in rows}
+        try:
+            uuids = json.loads(screening[0][0])
+            medals = [Medal.from_dict(medal) for medal in json.loads(screening[0][1])]
+        except (ValueError, TypeError):
+            return None
+        return {"uuids": uuids, "medals": medals, "sessions": sessions}
+
+    def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._inflight is not None:
+            # 写入都是幂等的，先补写正在写入的部分，再写之后的修改，保证顺序
+            self._write(*self._inflight)
+            self._inflight = None
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_store: Optional[WatchStateStore] = None
+
+
+def get_checkpoint_store(config: dict = {}) -> WatchStateStore:
+    """
+    获取进程内共享的检查点存储
+    - CHECKPOINT: 是否保存观看进度，0 表示关闭
+    - CHECKPOINT_RESUME_WINDOW: 上次心跳在多少秒内的直播间重启后直接续传
+    """
+    global _store
+    if _store is None:
+        enabled = bool(config.get("CHECKPOINT", 1))
+        _store = WatchStateStore(
+            os.path.join(get_base_dir(), "watch_state.db") if enabled else None,
+            resume_window=float(config.get("CHECKPOINT_RESUME_WINDOW", 120)),
+        )
+    return _store
@@ -0,0 +1,115 @@
+import json
+import os
+import pickle
+import sys
+from typing import Any, Dict, Tuple
+
+# 配置文件解析缓存：
+# - 进程内按 (路径, mtime, 文件大小) 缓存解析结果，同一文件只解析一次
+# - 解析结果同时以 pickle 写到同目录下的 .{文件名}.cache，下次启动文件未变化时直接读取，不必导入和运行 yaml
+# 返回的对象在调用方之间共享，只读使用，不要修改
+
+_cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+
+
+def get_base_dir() -> str:
+    """程序基目录（配置文件所在目录）：PyInstaller 打包后为 exe 所在目录，否则为项目根目录"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _cache_path(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.cache")
+
+
+def _read_disk_cache(path: str, key: Tuple[int, int]):
+    try:
+        with open(_cache_path(path), "rb") as f:
+            cached_key, data = pickle.load(f)
+        if cached_key == key:
+            return True, data
+    except Exception:
+        pass  # 缓存不存在或已损坏，重新解析
+    return False, None
+
+
+def _write_disk_cache(path: str, key: Tuple[int, int], data):
+    cache_path = _cache_path(path)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump((key, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        # 目录只读等情况下不写缓存，不影响主流程
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def load_yaml(path: str) -> Any:
+    """
+    读取 yaml 文件，文件未修改时直接返回缓存的解析结果
+    文件不存在时抛出 FileNotFoundError，格式错误时抛出 yaml 的异常
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    hit, data = _read_disk_cache(path, key)
+    if not hit:
+        import yaml  # 只有缓存失效时才需要导入 yaml
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.load(f, Loader=yaml.FullLoader)
+        _write_disk_cache(path, key, data)
+    _cache[path] = (key, data)
+    return data
+
+
+def save_yaml(path: str, data: Any) -> bool:
+    """
+    原子地写入 yaml 文件（先写临时文件再替换，写到一半中断也不会留下不完整的文件）
+    内容与现有文件完全相同时不写入，返回是否写入
+    写入后同时更新解析缓存，之后 load_yaml 不必重新解析；data 写入后即与缓存共享，不要再修改
+    """
+    import yaml
+
+    # 有 libyaml 时使用 C 实现，输出与纯 Python 的 SafeDumper 相同
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    text = yaml.dump(data, Dumper=dumper, allow_unicode=True, sort_keys=True)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass  # 文件不存在或无法读取，直接写入
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    _write_disk_cache(path, key, data)
+    _cache[path] = (key, data)
+    return True
+
+
+def load_users() -> dict:
+    """读取账号配置：优先使用环境变量 USERS（JSON），否则读取 users.yaml"""
+    if os.environ.get("USERS"):
+        return json.loads(os.environ.get("USERS"))
+    return load_yaml(os.path.join(get_base_dir(), "users.yaml"))
@@ -0,0 +1,61 @@
+import codecs
+import json
+import re
+from typing import List
+
+_DECODER = json.JSONDecoder()
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+class JsonArrayStream:
+    """
+    增量解析 JSON 响应中某个键对应的对象数组
+    - feed() 每收到一块响应数据，就返回其中已经完整的数组元素，不必等整个响应体下载完
+    - close() 在响应结束后解析数组以外的部分（code、message、分页信息等），其中该数组为空列表
+    只匹配第一次出现的 "key": [，要求该键出现在同名的嵌套键之前（如 MedalWall 的 data.list）
+    """
+
+    def __init__(self, key: str = "list"):
+        self._start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._state = 0  # 0: 查找数组开头 1: 数组内 2: 数组已结束
+        self._head = ""  # 数组之前的部分
+
+    def feed(self, data: bytes) -> List[dict]:
+        self._buf += self._utf8.decode(data)
+        if self._state == 0:
+            match = self._start.search(self._buf)
+            if match is None:
+                return []
+            self._head = self._buf[:match.end()]
+            self._buf = self._buf[match.end():]
+            self._state = 1
+        if self._state != 1:
+            return []
+
+        items = []
+        buf, pos = self._buf, 0
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            if buf[pos] == "]":
+                self._state = 2
+                break
+            try:
+                item, pos = _DECODER.raw_decode(buf, pos)
+            except ValueError:
+                break  # 元素还没有接收完整
+            items.append(item)
+        self._buf = buf[pos:]
+        return items
+
+    def close(self) -> dict:
+        self._buf += self._utf8.decode(b"", final=True)
+        if self._state == 1:
+            raise ValueError(f"响应不完整或格式错误: {self._buf[:100]!r}")
+        if self._state == 0:
+            # 没有该数组（如错误响应），整体解析
+            return json.loads(self._buf)
+        return json.loads(self._head + self._buf)
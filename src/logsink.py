@@ -0,0 +1,214 @@
+import gzip
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from loguru import logger
+
+CONSOLE_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> <blue> {extra[user]} </blue> <level>{message}</level>"
+
+
+def setup_console(verbose: bool = True):
+    """替换 loguru 默认的控制台输出，VERBOSE_LOG 为 0 时只输出 INFO 及以上"""
+    logger.remove()
+    logger.add(
+        sys.stdout,
+        colorize=True,
+        format=CONSOLE_FORMAT,
+        backtrace=True,
+        diagnose=True,
+        level="DEBUG" if verbose else "INFO",
+    )
+
+
+def _report(message: str):
+    """日志写入线程自身出错时直接输出到 stderr，不能再经过 loguru"""
+    try:
+        print(f"[user-log-writer] {message}", file=sys.stderr, flush=True)
+    except Exception:
+        pass
+
+
+class _UserFile:
+    """单个账号的日志文件，负责按大小 / 时间轮转"""
+
+    def __init__(self, path: str, max_bytes: int, max_age: float, retention: int, compression: bool):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retention = retention
+        self.compression = compression
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.size = self.file.tell()
+        self.opened_at = time.time()
+
+    def write(self, text: str):
+        if self.file.closed:
+            # 上次打开或轮转失败，先尝试重新打开
+            self._open()
+        if self._should_rotate():
+            self.rotate()
+        self.file.write(text)
+        self.size += len(text.encode("utf-8"))
+
+    def _should_rotate(self) -> bool:
+        if self.max_bytes and self.size >= self.max_bytes:
+            return True
+        return bool(self.max_age) and self.size > 0 and time.time() - self.opened_at >= self.max_age
+
+    def rotate(self):
+        self.file.close()
+        base, ext = os.path.splitext(self.path)
+        try:
+            stamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+            rotated = f"{base}.{stamp}{ext}"
+            index = 1
+            while os.path.exists(rotated) or os.path.exists(f"{rotated}.gz"):
+                rotated = f"{base}.{stamp}_{index}{ext}"
+                index += 1
+            os.replace(self.path, rotated)
+            if self.compression:
+                with open(rotated, "rb") as src, gzip.open(f"{rotated}.gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(rotated)
+            self._cleanup(base, ext)
+        finally:
+            # 轮转中途失败也要重新打开，继续往当前文件写
+            self._open()
+
+    def _cleanup(self, base: str, ext: str):
+        # 只保留最近 retention 个轮转后的文件
+        if not self.retention:
+            return
+        directory = os.path.dirname(self.path) or "."
+        prefix = f"{os.path.basename(base)}."
+        rotated = sorted(
+            name for name in os.listdir(directory)
+            if name.startswith(prefix) and name != os.path.basename(self.path)
+            and (name.endswith(ext) or name.endswith(f"{ext}.gz"))
+        )
+        for name in rotated[:-self.retention]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class UserLogRouter:
+    """
+    所有账号共用的一个 loguru 文件 sink
+    - 按日志记录上绑定的 uid 直接查表分发到 {uid}.log，不再为每个账号单独过滤
+    - 由一个后台线程批量写入，支持按大小 / 时间轮转和 gzip 压缩
+    """
+
+    def __init__(
+        self,
+        base_dir: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        max_age: float = 0,
+        retention: int = 7,
+        compression: bool = True,
+        batch_size: int = 512,
+    ):
+        self.base_dir = base_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retention = retention
+        self.compression = compression
+        self.batch_size = batch_size
+
+        self._uids = set()
+        self._files: Dict[int, _UserFile] = {}
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="user-log-writer", daemon=True)
+        self._thread.start()
+
+    def register(self, uid: int):
+        """开始为该账号写入 {uid}.log，文件已存在时先追加两行换行"""
+        self._queue.put(("register", uid, None))
+        self._uids.add(uid)
+
+    def accepts(self, record) -> bool:
+        """loguru filter：只有已注册账号的日志才进入该 sink"""
+        return record["extra"].get("uid") in self._uids
+
+    def __call__(self, message):
+        self._queue.put(("write", message.record["extra"]["uid"], str(message)))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # 尽量一次取出队列里积压的日志，合并写入
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                stop = self._handle(batch)
+            except Exception as e:
+                # 写入线程一旦退出，队列会无限增长，这里只报告错误并继续
+                _report(f"处理日志批次失败: {e!r}")
+                stop = any(item is None for item in batch)
+            if stop:
+                return
+
+    def _handle(self, batch: list) -> bool:
+        pending: Dict[int, list] = {}
+        stop = False
+        for item in batch:
+            if item is None:
+                stop = True
+                continue
+            action, uid, text = item
+            if action == "register":
+                try:
+                    self._open(uid)
+                except Exception as e:
+                    _report(f"打开 {uid}.log 失败: {e!r}")
+            elif uid in self._files:
+                pending.setdefault(uid, []).append(text)
+        for uid, texts in pending.items():
+            user_file = self._files[uid]
+            try:
+                user_file.write("".join(texts))
+                user_file.flush()
+            except Exception as e:
+                # 写日志失败不影响主流程，丢弃这一批并报告到 stderr
+                _report(f"写入 {uid}.log 失败: {e!r}")
+        if stop:
+            for user_file in self._files.values():
+                try:
+                    user_file.close()
+                except Exception:
+                    pass
+        return stop
+
+    def _open(self, uid: int):
+        if uid in self._files:
+            return
+        path = os.path.join(self.base_dir, f"{uid}.log")
+        if os.path.exists(path):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n\n")
+        self._files[uid] = _UserFile(path, self.max_bytes, self.max_age, self.retention, self.compression)
+
+    def stop(self):
+        """写完队列中剩余的日志后关闭所有文件"""
+        self._queue.put(None)
+        self._thread.join(timeout=5)
@@ -0,0 +1,195 @@
+from typing import Dict, Iterator, Optional, Tuple
+
+# 兼容旧的嵌套字典写法：medal["medal"]["today_feed"]、medal["room_info"]["room_id"] 等
+SECTIONS: Dict[str, Tuple[str, ...]] = {
+    "medal": ("target_id", "level", "medal_name", "today_feed", "intimacy", "next_intimacy", "is_lighted"),
+    "anchor_info": ("nick_name", "face"),
+    "room_info": ("room_id",),
+}
+# 顶层字段；weight / score / live_time 为 None 时视为不存在（与旧字典中没有该键一致）
+TOP_LEVEL = ("live_status", "weight", "score", "live_time")
+OPTIONAL = ("weight", "score", "live_time")
+
+
+class _Section:
+    """Medal 某一部分字段的字典视图，读写直接落到 Medal 的属性上"""
+
+    __slots__ = ("_medal", "_fields")
+
+    def __init__(self, medal: "Medal", fields: Tuple[str, ...]):
+        self._medal = medal
+        self._fields = fields
+
+    def __getitem__(self, key: str):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self._medal, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self._fields:
+            raise KeyError(key)
+        setattr(self._medal, key, value)
+
+    def __contains__(self, key) -> bool:
+        return key in self._fields
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def get(self, key: str, default=None):
+        return getattr(self._medal, key) if key in self._fields else default
+
+    def keys(self):
+        return self._fields
+
+    def items(self):
+        return [(key, getattr(self._medal, key)) for key in self._fields]
+
+    def update(self, other: dict):
+        for key, value in other.items():
+            self[key] = value
+
+
+class Medal:
+    """
+    单个粉丝牌（MedalWall 条目转换而来），使用 __slots__ 存储，内存约为嵌套字典的几分之一
+    is_lighted 为 None 表示 MedalWall 没有返回点亮状态，需要单独查询
+    新代码直接访问属性（medal.today_feed）；旧代码的字典写法（medal["medal"]["today_feed"]、
+    medal.get("weight")）仍然可用，便于逐步迁移
+    """
+
+    __slots__ = (
+        "target_id", "level", "medal_name", "today_feed", "intimacy", "next_intimacy", "is_lighted",
+        "nick_name", "face", "room_id", "live_status", "weight", "score", "live_time",
+    )
+
+    def __init__(
+        self,
+        target_id: int,
+        level: int = 0,
+        medal_name: str = "",
+        today_feed: int = 0,
+        intimacy: int = 0,
+        next_intimacy: int = 0,
+        is_lighted: Optional[int] = None,
+        nick_name: str = "未知",
+        face: str = "",
+        room_id: int = 0,
+        live_status: int = 0,
+        weight: Optional[int] = None,
+        score: Optional[float] = None,
+        live_time: Optional[int] = None,
+    ):
+        self.target_id = target_id
+        self.level = level
+        self.medal_name = medal_name
+        self.today_feed = today_feed
+        self.intimacy = intimacy
+        self.next_intimacy = next_intimacy
+        self.is_lighted = is_lighted
+        self.nick_name = nick_name
+        self.face = face
+        self.room_id = room_id
+        self.live_status = live_status
+        self.weight = weight
+        self.score = score
+        self.live_time = live_time
+
+    @classmethod
+    def from_wall_item(cls, item: dict, room_id: int = 0) -> "Medal":
+        info = item.get("medal_info", {})
+        return cls(
+            info.get("target_id", 0),
+            info.get("level", 0),
+            info.get("medal_name", ""),
+            info.get("today_feed", 0),
+            info.get("intimacy", 0),
+            info.get("next_intimacy", 0),
+            info.get("is_lighted", info.get("is_light")),
+            item.get("target_name", "未知"),
+            item.get("target_icon", ""),
+            room_id,
+            item.get("live_status", 0),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Medal":
+        """从旧的嵌套字典（或 to_dict() 的结果）创建"""
+        kwargs = {}
+        for section, fields in SECTIONS.items():
+            part = data.get(section) or {}
+            kwargs.update({field: part[field] for field in fields if field in part})
+        kwargs.update({key: data[key] for key in TOP_LEVEL if key in data})
+        return cls(**kwargs)
+
+    def to_dict(self) -> dict:
+        """转换为旧的嵌套字典结构（用于保存检查点等需要 JSON 的地方）"""
+        data = {section: {field: getattr(self, field) for field in fields} for section, fields in SECTIONS.items()}
+        for key in TOP_LEVEL:
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        return data
+
+    def refresh(self, fresh: "Medal"):
+        """用最新的 MedalWall 数据更新，保留已解析的 room_id、权重和开播时间"""
+        self.level = fresh.level
+        self.medal_name = fresh.medal_name
+        self.today_feed = fresh.today_feed
+        self.intimacy = fresh.intimacy
+        self.next_intimacy = fresh.next_intimacy
+        self.is_lighted = fresh.is_lighted
+        self.nick_name = fresh.nick_name
+        self.face = fresh.face
+        self.live_status = fresh.live_status
+        if fresh.room_id:
+            self.room_id = fresh.room_id
+
+    # ---------- 字典兼容 ----------
+
+    def __getitem__(self, key: str):
+        fields = SECTIONS.get(key)
+        if fields is not None:
+            return _Section(self, fields)
+        if key in TOP_LEVEL:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        if key not in TOP_LEVEL:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key) -> bool:
+        if key in SECTIONS:
+            return True
+        return key in TOP_LEVEL and getattr(self, key) is not None
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key: str, *default):
+        if key not in OPTIONAL:
+            raise KeyError(key)
+        value = getattr(self, key)
+        setattr(self, key, None)
+        if value is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        return value
+
+    def setdefault(self, key: str, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def __repr__(self):
+        return f"Medal({self.target_id}, {self.nick_name}, level={self.level}, today_feed={self.today_feed})"
@@ -0,0 +1,91 @@
+from collections import namedtuple
+from typing import Callable, Dict, List, Optional
+
+# 事件类型
+ADDED = "added"  # 新增粉丝牌
+REMOVED = "removed"  # 粉丝牌消失（取消关注 / 被清空）
+WENT_LIVE = "live"  # 开播
+WENT_OFFLINE = "offline"  # 下播
+INTIMACY_CHANGED = "intimacy"  # 今日亲密度变化
+REACHED_CAP = "capped"  # 今日亲密度达到上限
+LIGHT_CHANGED = "light"  # 点亮 / 熄灭
+UPDATED = "updated"  # 其他字段变化（等级、直播间链接等）
+
+# old / new 为变化前后的值；item 为该粉丝牌最新的 MedalWall 原始条目（REMOVED 时为 None）
+MedalEvent = namedtuple("MedalEvent", ["kind", "target_id", "old", "new", "item"])
+
+INTIMACY_CAP = 30
+
+
+def _state(item: dict) -> tuple:
+    info = item.get("medal_info", {})
+    return (
+        item.get("live_status", 0),
+        info.get("today_feed", 0),
+        info.get("is_lighted", info.get("is_light", 1)),
+        info.get("level", 0),
+        info.get("intimacy", 0),
+        item.get("link", ""),
+        item.get("target_name", ""),
+    )
+
+
+class MedalWallDiffer:
+    """
+    比较相邻两次 MedalWall 结果，生成粉丝牌变化事件
+    - 每个粉丝牌只保存一个小的状态元组，没有变化的粉丝牌只做一次元组比较
+    - MedalWall 命中缓存（同一个列表对象）时直接返回空事件列表
+    - subscribe() 注册的回调会收到每个事件
+    """
+
+    def __init__(self):
+        self._snapshot: Dict[int, tuple] = {}
+        self._last: Optional[list] = None
+        self._subscribers: List[Callable[[MedalEvent], None]] = []
+
+    def subscribe(self, callback: Callable[[MedalEvent], None]):
+        self._subscribers.append(callback)
+
+    def reset(self):
+        """丢弃快照，下一次 diff 时所有粉丝牌都视为新增"""
+        self._snapshot = {}
+        self._last = None
+
+    def diff(self, items: list) -> List[MedalEvent]:
+        if items is self._last:
+            return []
+        self._last = items
+
+        events: List[MedalEvent] = []
+        snapshot: Dict[int, tuple] = {}
+        for item in items:
+            target_id = item.get("medal_info", {}).get("target_id", 0)
+            state = snapshot[target_id] = _state(item)
+            old = self._snapshot.get(target_id)
+            if old is None:
+                events.append(MedalEvent(ADDED, target_id, None, None, item))
+            elif old != state:
+                events.extend(self._compare(target_id, old, state, item))
+        for target_id in self._snapshot.keys() - snapshot.keys():
+            events.append(MedalEvent(REMOVED, target_id, None, None, None))
+        self._snapshot = snapshot
+
+        for callback in self._subscribers:
+            for event in events:
+                callback(event)
+        return events
+
+    @staticmethod
+    def _compare(target_id: int, old: tuple, new: tuple, item: dict) -> List[MedalEvent]:
+        events = []
+        if old[0] != new[0]:
+            events.append(MedalEvent(WENT_LIVE if new[0] == 1 else WENT_OFFLINE, target_id, old[0], new[0], item))
+        if old[1] != new[1]:
+            events.append(MedalEvent(INTIMACY_CHANGED, target_id, old[1], new[1], item))
+            if old[1] < INTIMACY_CAP <= new[1]:
+                events.append(MedalEvent(REACHED_CAP, target_id, old[1], new[1], item))
+        if old[2] != new[2]:
+            events.append(MedalEvent(LIGHT_CHANGED, target_id, old[2], new[2], item))
+        if old[3:] != new[3:]:
+            events.append(MedalEvent(UPDATED, target_id, old[3:], new[3:], item))
+        return events
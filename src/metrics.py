@@ -0,0 +1,188 @@
+import time
+from collections import deque
+from typing import Dict
+
+from loguru import logger
+
+# 秒级直方图的默认分桶
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labels
+        self._values: Dict[tuple, float] = {}
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = self._header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, *labels, value: float):
+        self._values[labels] = value
+
+    def render(self) -> list:
+        lines = self._header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}  # labels -> [各分桶计数..., sum, count]
+
+    def observe(self, *labels, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list:
+        lines = self._header()
+        for labels, series in self._series.items():
+            for index, bound in enumerate(self.buckets):
+                bucket_labels = _labels(self.labelnames, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {series[index]}")
+            bucket_labels = _labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+api_requests = Counter(
+    "bili_api_requests_total", "BiliApi 请求数（按接口和 HTTP 状态码）", ("endpoint", "status")
+)
+api_latency = Histogram(
+    "bili_api_request_duration_seconds", "BiliApi 请求耗时（秒）", ("endpoint",)
+)
+api_retries = Counter("bili_api_retries_total", "BiliApi 重试次数", ("endpoint",))
+heartbeat_lateness = Histogram(
+    "bili_heartbeat_lateness_seconds", "心跳相对计划时间的迟到秒数", ("account",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10),
+)
+heartbeats = Counter("bili_heartbeats_total", "发送的心跳数", ("account", "result"))
+active_rooms = Gauge("bili_active_rooms", "正在观看的直播间数", ("account",))
+intimacy_gained = Counter("bili_intimacy_gained_total", "累计获得的亲密度", ("account",))
+intimacy_per_hour = Gauge("bili_intimacy_per_hour", "最近一小时获得的亲密度", ("account",))
+
+_intimacy_window: Dict[str, deque] = {}
+_started = time.time()
+
+
+def record_intimacy(account, gained: int):
+    """记录一次亲密度增量（来自 MedalWall today_feed 的变化），并更新最近一小时的产出"""
+    account = str(account)
+    intimacy_gained.inc(account, amount=gained)
+    window = _intimacy_window.setdefault(account, deque())
+    now = time.time()
+    window.append((now, gained))
+    while window and now - window[0][0] > 3600:
+        window.popleft()
+    intimacy_per_hour.set(account, value=sum(value for _, value in window))
+
+
+def render() -> str:
+    lines = []
+    for metric in (
+        api_requests, api_latency, api_retries, heartbeat_lateness, heartbeats,
+        active_rooms, intimacy_gained, intimacy_per_hour,
+    ):
+        lines.extend(metric.render())
+    lines.append("# HELP bili_uptime_seconds 进程运行时长（秒）")
+    lines.append("# TYPE bili_uptime_seconds gauge")
+    lines.append(f"bili_uptime_seconds {time.time() - _started:.0f}")
+    return "\n".join(lines) + "\n"
+
+
+def endpoint_label(url) -> str:
+    """接口标签取 URL 路径的最后一段，避免把查询参数带进标签"""
+    path = getattr(url, "path", None) or str(url).split("?")[0]
+    return path.rstrip("/").rsplit("/", 1)[-1] or "/"
+
+
+def build_trace_config():
+    """返回记录每个请求耗时和状态码的 aiohttp TraceConfig"""
+    from aiohttp import TraceConfig
+
+    trace = TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        ctx.metrics_started = time.monotonic()
+
+    async def on_request_end(session, ctx, params):
+        endpoint = endpoint_label(params.url)
+        api_requests.inc(endpoint, str(params.response.status))
+        api_latency.observe(endpoint, value=time.monotonic() - ctx.metrics_started)
+
+    async def on_request_exception(session, ctx, params):
+        endpoint = endpoint_label(params.url)
+        api_requests.inc(endpoint, "error")
+        api_latency.observe(endpoint, value=time.monotonic() - ctx.metrics_started)
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+async def start_server(port: int, host: str = "0.0.0.0"):
+    """
+    启动本地指标服务：/metrics 为 Prometheus 文本格式，/healthz 为健康检查
+    返回 aiohttp 的 AppRunner，进程退出前调用其 cleanup()
+    """
+    from aiohttp import web
+
+    async def metrics_handler(request):
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    async def health_handler(request):
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    app.router.add_get("/healthz", health_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.bind(user="指标").info(f"指标服务已启动: http://{host}:{port}/metrics")
+    return runner
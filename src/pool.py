@@ -0,0 +1,112 @@
+import asyncio
+from typing import Optional
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+from loguru import logger
+
+from .metrics import build_trace_config as build_metrics_trace_config
+
+# BiliApi 会访问的几个域名，启动时预热连接
+WARMUP_HOSTS = [
+    "https://api.live.bilibili.com",
+    "https://live-trace.bilibili.com",
+    "https://app.bilibili.com",
+    "https://api.vc.bilibili.com",
+]
+
+_session: Optional[ClientSession] = None
+
+# 连接池统计（用于基准测试和排查）
+pool_stats = {
+    "requests": 0,  # 发出的请求数
+    "connections_created": 0,  # 新建的 socket（含 TLS 握手）
+    "connections_reused": 0,  # 复用 keep-alive 连接的次数
+    "dns_lookups": 0,  # 实际的 DNS 解析次数
+    "dns_cache_hits": 0,  # DNS 缓存命中次数
+}
+
+
+def _build_trace_config() -> TraceConfig:
+    trace = TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        pool_stats["requests"] += 1
+
+    async def on_connection_create_end(session, ctx, params):
+        pool_stats["connections_created"] += 1
+
+    async def on_connection_reuseconn(session, ctx, params):
+        pool_stats["connections_reused"] += 1
+
+    async def on_dns_resolvehost_end(session, ctx, params):
+        pool_stats["dns_lookups"] += 1
+
+    async def on_dns_cache_hit(session, ctx, params):
+        pool_stats["dns_cache_hits"] += 1
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_connection_create_end.append(on_connection_create_end)
+    trace.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace.on_dns_cache_hit.append(on_dns_cache_hit)
+    return trace
+
+
+def create_session(config: dict = {}) -> ClientSession:
+    """
+    按配置创建一个带连接池的 ClientSession
+    - POOL_LIMIT: 连接池总连接数上限
+    - POOL_LIMIT_PER_HOST: 每个域名的连接数上限
+    - DNS_CACHE_TTL: DNS 缓存时间（秒）
+    - KEEPALIVE_TIMEOUT: 空闲连接保持时间（秒），需大于心跳间隔才能复用连接
+    """
+    connector = TCPConnector(
+        limit=int(config.get("POOL_LIMIT", 200)),
+        limit_per_host=int(config.get("POOL_LIMIT_PER_HOST", 50)),
+        ttl_dns_cache=int(config.get("DNS_CACHE_TTL", 600)),
+        use_dns_cache=True,
+        keepalive_timeout=float(config.get("KEEPALIVE_TIMEOUT", 60)),
+    )
+    return ClientSession(
+        connector=connector,
+        timeout=ClientTimeout(total=3),
+        trust_env=True,
+        trace_configs=[_build_trace_config(), build_metrics_trace_config()],
+    )
+
+
+def get_session(config: dict = {}) -> ClientSession:
+    """
+    获取进程内共享的 ClientSession，所有账号的 BiliApi 共用同一个连接池
+    首次调用时按 config 创建，之后的调用忽略 config
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = create_session(config)
+    return _session
+
+
+async def warmup(session: Optional[ClientSession] = None, hosts: list = WARMUP_HOSTS):
+    """
+    启动时预热连接池：提前完成 DNS 解析和 TLS 握手，失败不影响主流程
+    """
+    session = session or get_session()
+    log = logger.bind(user="连接池")
+
+    async def _touch(host: str):
+        try:
+            async with session.head(host, allow_redirects=False) as resp:
+                await resp.read()
+        except Exception as e:
+            log.debug(f"预热 {host} 失败: {e}")
+
+    await asyncio.gather(*[_touch(host) for host in hosts])
+    log.debug(f"连接池预热完成: {pool_stats}")
+
+
+async def close_session():
+    """关闭共享的 ClientSession（进程退出前调用）"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
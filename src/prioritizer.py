@@ -0,0 +1,109 @@
+import importlib
+import math
+import time
+from typing import Dict, List, Type
+
+from .medal import Medal
+
+INTIMACY_CAP = 30  # 每日亲密度上限
+GAIN_PER_CYCLE = 6  # 每个观看周期获得的亲密度
+CYCLE_MINUTES = 5  # 每个观看周期的分钟数
+# 熄灭的粉丝牌要等后台点亮完成后心跳才开始累计；批量点赞很快，退回逐次点赞时约 1.5 分钟，按 1 分钟估计
+RELIGHT_MINUTES = 1
+
+
+class Prioritizer:
+    """
+    直播间排序策略的基类：score() 越大越优先
+    自定义策略可继承本类，在 users.yaml 中以 PRIORITIZER: "模块名:类名" 指定
+    """
+
+    # 为 True 时 getMedals 会额外批量查询开播时间（live_time），供 score() 使用
+    needs_live_time = False
+
+    def __init__(self, config: dict = {}):
+        self.config = config
+
+    def score(self, medal: Medal, now: float) -> float:
+        raise NotImplementedError
+
+    def rank(self, medals: List[Medal]) -> List[Medal]:
+        """按 score 由高到低排序（同分时等级高的优先），并把分数写入 medal.score"""
+        now = time.time()
+        for medal in medals:
+            medal.score = self.score(medal, now)
+        medals.sort(key=lambda medal: (medal.score, medal.level), reverse=True)
+        return medals
+
+
+class WeightLevelPrioritizer(Prioritizer):
+    """默认的排序方式：先按权重，再按粉丝团等级"""
+
+    def score(self, medal: Medal, now: float) -> float:
+        return 100 if medal.weight is None else medal.weight
+
+
+class YieldPrioritizer(Prioritizer):
+    """
+    按单位槽位时长能刷满的粉丝牌数排序，让每天有限的观看槽位尽量多地把粉丝牌刷满
+    - 还差多少亲密度（30 - today_feed）决定还需要几个周期，差得少的更快刷满（29/30 排在 0/30 前面）
+    - 直播已开播时长推算剩余时长，剩余时间不够刷满的只按能拿到的比例计入，排在能刷满的后面
+    - 熄灭的粉丝牌要等后台点亮后才开始累计，额外按 RELIGHT_MINUTES 占用槽位
+    - 配置的权重按比例放大或缩小收益（100 为基准，0 表示最后才看）
+    """
+
+    needs_live_time = True
+    # 无论已开播多久，都认为至少还能再播这么久（分钟）
+    min_remaining_minutes = 15
+
+    def __init__(self, config: dict = {}):
+        super().__init__(config)
+        # 直播的典型时长（分钟），用于由已开播时长估计剩余时长
+        self.expected_stream_minutes = float(config.get("EXPECTED_STREAM_MINUTES", 180))
+
+    def remaining_minutes(self, medal: Medal, now: float) -> float:
+        live_time = medal.live_time or 0
+        if live_time <= 0:
+            return self.expected_stream_minutes
+        uptime = max(0.0, (now - live_time) / 60)
+        return max(self.expected_stream_minutes - uptime, self.min_remaining_minutes)
+
+    def score(self, medal: Medal, now: float) -> float:
+        deficit = INTIMACY_CAP - medal.today_feed
+        if deficit <= 0:
+            return 0.0
+        needed_minutes = math.ceil(deficit / GAIN_PER_CYCLE) * CYCLE_MINUTES
+        watch_minutes = min(needed_minutes, self.remaining_minutes(medal, now))
+        gain = min(deficit, GAIN_PER_CYCLE * math.floor(watch_minutes / CYCLE_MINUTES))
+        if gain <= 0:
+            return 0.0
+        # 今天能完成的比例：能刷满时为 1，刷不满时仍按刷满所需的时长计，排在能刷满的后面
+        completion = gain / deficit
+        slot_minutes = needed_minutes + (RELIGHT_MINUTES if medal.is_lighted == 0 else 0)
+        weight = (100 if medal.weight is None else medal.weight) / 100
+        return round(weight * completion / slot_minutes, 4)
+
+
+PRIORITIZERS: Dict[str, Type[Prioritizer]] = {
+    "yield": YieldPrioritizer,
+    "weight": WeightLevelPrioritizer,
+}
+
+
+def get_prioritizer(config: dict = {}) -> Prioritizer:
+    """
+    按 PRIORITIZER 配置创建排序策略
+    - "weight"（默认）: 按权重和等级排序，权重为严格的优先级
+    - "yield": 按预期收益排序，权重作为收益的倍数
+    - "模块名:类名": 自定义的 Prioritizer 子类
+    """
+    name = str(config.get("PRIORITIZER") or "weight")
+    if ":" in name:
+        module_name, class_name = name.split(":", 1)
+        cls = getattr(importlib.import_module(module_name), class_name)
+    else:
+        try:
+            cls = PRIORITIZERS[name]
+        except KeyError:
+            raise ValueError(f"未知的 PRIORITIZER: {name}，可选 {', '.join(PRIORITIZERS)} 或 模块名:类名")
+    return cls(config)
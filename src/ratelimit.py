@@ -0,0 +1,189 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from loguru import logger
+
+# 接口路径关键字 -> 限速分组
+ENDPOINT_GROUPS = {
+    "mobileHeartBeat": "heartbeat",
+    "mobileEntry": "heartbeat",
+    "MedalWall": "medal_wall",
+    "likeReportV3": "like",
+    "get_info": "room_info",
+    "get_status_info_by_uids": "room_info",
+    "user_medal_info": "room_info",
+}
+
+# 每个直播间的心跳间隔（秒），以及共享心跳限速相对平均心跳速率的余量（容纳进房和同一时刻集中唤醒的心跳）
+HEARTBEAT_INTERVAL = 30
+HEARTBEAT_HEADROOM = 2
+
+# 默认限速（每秒请求数）：rate/burst 为所有账号共享的接口总量，account_rate/account_burst 为单个账号
+# heartbeat 的共享限速为下限，未配置时按所有账号合计的观看直播间数放大，见 parse_rate_limits
+DEFAULT_RATE_LIMITS = {
+    "heartbeat": {"rate": 50, "burst": 100, "account_rate": 2, "account_burst": 4},
+    "medal_wall": {"rate": 10, "burst": 20, "account_rate": 0.5, "account_burst": 2},
+    "like": {"rate": 20, "burst": 40, "account_rate": 1, "account_burst": 3},
+    "room_info": {"rate": 20, "burst": 40, "account_rate": 5, "account_burst": 10},
+    "default": {"rate": 20, "burst": 40, "account_rate": 5, "account_burst": 10},
+}
+
+
+def parse_rate_limits(limits: dict = None, rooms: int = 0) -> dict:
+    """
+    合并默认限速和 RATE_LIMITS 配置，各项必须为正数，否则抛出 ValueError
+    :param rooms: 所有账号合计同时观看的直播间数；未配置 heartbeat 的 rate/burst 时，
+                  共享心跳限速至少为 rooms / HEARTBEAT_INTERVAL * HEARTBEAT_HEADROOM，不会成为心跳的瓶颈
+    """
+    limits = limits or {}
+    if not isinstance(limits, dict):
+        raise ValueError("RATE_LIMITS 格式错误，应为 分组: {rate, burst, account_rate, account_burst}")
+    result = {group: dict(cfg) for group, cfg in DEFAULT_RATE_LIMITS.items()}
+    for group, cfg in limits.items():
+        if cfg is not None and not isinstance(cfg, dict):
+            raise ValueError(f"RATE_LIMITS.{group} 格式错误，应为 {{rate, burst, account_rate, account_burst}}")
+        result.setdefault(group, dict(DEFAULT_RATE_LIMITS["default"])).update(cfg or {})
+
+    heartbeat = limits.get("heartbeat") or {}
+    if "rate" not in heartbeat:
+        needed = rooms / HEARTBEAT_INTERVAL * HEARTBEAT_HEADROOM
+        result["heartbeat"]["rate"] = max(result["heartbeat"]["rate"], needed)
+    if "burst" not in heartbeat:
+        result["heartbeat"]["burst"] = max(result["heartbeat"]["burst"], 2 * result["heartbeat"]["rate"])
+
+    for group, cfg in result.items():
+        for key in ("rate", "burst", "account_rate", "account_burst"):
+            try:
+                value = float(cfg[key])
+            except (KeyError, TypeError, ValueError):
+                value = 0
+            if not value > 0:
+                raise ValueError(f"RATE_LIMITS.{group}.{key} 必须是大于 0 的数字，当前为 {cfg.get(key)!r}")
+            cfg[key] = value
+    return result
+
+
+def endpoint_of(url: str) -> str:
+    """根据 URL 路径判断所属的限速分组"""
+    path = urlparse(str(url)).path
+    for keyword, group in ENDPOINT_GROUPS.items():
+        if path.endswith(keyword):
+            return group
+    return "default"
+
+
+class TokenBucket:
+    """
+    令牌桶：按 rate 匀速补充令牌，最多积攒 burst 个
+    触发 B 站限流（10030）时速率减半，之后每次成功缓慢恢复到配置速率
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.configured_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        # 持锁等待，保证等待者按先后顺序拿到令牌
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def penalize(self, drain: bool = False):
+        """
+        被限流时速率减半，最低为配置速率的 5%
+        :param drain: 为 True 时额外透支一整桶令牌，相当于冷却 burst / rate 秒
+        """
+        self._refill()
+        self.rate = max(self.configured_rate * 0.05, self.rate / 2)
+        self.tokens = -self.burst if drain else min(self.tokens, 0)
+
+    def recover(self):
+        """请求成功时每次恢复配置速率的 1%"""
+        if self.rate < self.configured_rate:
+            self._refill()
+            self.rate = min(self.configured_rate, self.rate + self.configured_rate * 0.01)
+
+
+class RateLimiter:
+    """
+    进程内共享的限速器，所有 BiliApi 请求都要先拿到令牌
+    每个限速分组有一个所有账号共享的令牌桶，每个账号在每个分组还有自己的令牌桶
+    令牌桶只在进程内共享：多进程分片运行时传入 shares=进程数，共享的 rate/burst 平分到各进程，
+    所有进程合计仍不超过配置的总量（账号自己的令牌桶只在所属进程中，不需要平分）
+    """
+
+    def __init__(self, limits: dict = None, shares: int = 1, rooms: int = 0):
+        self.limits = parse_rate_limits(limits, rooms)
+        shares = max(1, int(shares))
+        for cfg in self.limits.values():
+            cfg["rate"] = cfg["rate"] / shares
+            cfg["burst"] = cfg["burst"] / shares
+        self._global: Dict[str, TokenBucket] = {}
+        self._accounts: Dict[Tuple[str, str], TokenBucket] = {}
+        self.stats = {"acquired": 0, "rate_limited": 0}
+
+    def _buckets(self, group: str, account: str) -> Tuple[TokenBucket, TokenBucket]:
+        cfg = self.limits.get(group) or self.limits["default"]
+        shared = self._global.get(group)
+        if shared is None:
+            shared = self._global[group] = TokenBucket(cfg["rate"], cfg["burst"])
+        own = self._accounts.get((group, account))
+        if own is None:
+            own = self._accounts[(group, account)] = TokenBucket(cfg["account_rate"], cfg["account_burst"])
+        return shared, own
+
+    async def acquire(self, url: str, account: str):
+        shared, own = self._buckets(endpoint_of(url), account)
+        # 先拿账号自己的令牌，避免单个账号占用共享令牌后再排队
+        await own.acquire()
+        await shared.acquire()
+        self.stats["acquired"] += 1
+
+    def penalize(self, url: str, account: str):
+        group = endpoint_of(url)
+        shared, own = self._buckets(group, account)
+        shared.penalize()
+        own.penalize(drain=True)
+        self.stats["rate_limited"] += 1
+        logger.bind(user="限速").warning(
+            f"{group} 接口触发限流(10030)，共享速率降为 {shared.rate:.2f}/s，账号速率降为 {own.rate:.2f}/s"
+        )
+
+    def recover(self, url: str, account: str):
+        shared, own = self._buckets(endpoint_of(url), account)
+        shared.recover()
+        own.recover()
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter(config: dict = {}) -> RateLimiter:
+    """
+    获取进程内共享的限速器，首次调用时按 config 中的 RATE_LIMITS 创建
+    RATE_LIMIT_SHARES 为分片进程数（由分片子进程设置），共享限速按进程数平分
+    FLEET_ROOMS 为所有账号合计同时观看的直播间数，用于确定共享的心跳限速
+    """
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(
+            config.get("RATE_LIMITS") or {},
+            shares=config.get("RATE_LIMIT_SHARES", 1),
+            rooms=config.get("FLEET_ROOMS", 0),
+        )
+    return _limiter
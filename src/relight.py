@@ -0,0 +1,83 @@
+import asyncio
+import functools
+import math
+from typing import Dict
+
+LIKES_TO_LIGHT = 30  # 点亮一个粉丝牌需要的点赞次数
+
+
+class Relighter:
+    """
+    在后台点亮熄灭的粉丝牌，不占用观看槽位
+    - 同一账号的多个熄灭粉丝牌并发点赞（最多 concurrency 个），各自按 interval 秒的间隔发送
+    - 每次请求通过 click_time 批量上报多次点赞；批量点赞后仍未点亮时，之后改为逐次点赞
+    - 同一个粉丝牌正在点亮时重复提交不会重复点赞
+    """
+
+    def __init__(self, user, click_time: int = 10, interval: float = 3, concurrency: int = 5):
+        self.u = user
+        self.click_time = max(1, min(int(click_time), LIKES_TO_LIGHT))
+        self.interval = interval
+        self._semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+        self._tasks: Dict[int, asyncio.Task] = {}  # target_id -> 点亮任务
+
+    def submit(self, medal) -> asyncio.Task:
+        """提交一个熄灭的粉丝牌，返回对应的后台任务（无需等待）"""
+        task = self._tasks.get(medal.target_id)
+        if task is None or task.done():
+            task = asyncio.ensure_future(self._relight(medal))
+            self._tasks[medal.target_id] = task
+            task.add_done_callback(functools.partial(self._forget, medal.target_id))
+        return task
+
+    def _forget(self, target_id: int, task: asyncio.Task):
+        if self._tasks.get(target_id) is task:
+            del self._tasks[target_id]
+
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def _relight(self, medal):
+        room_name, room_id, target_id = medal.nick_name, medal.room_id, medal.target_id
+        async with self._semaphore:
+            self.u.log.warning(f"{room_name} 粉丝牌未点亮，在后台点赞 {LIKES_TO_LIGHT} 次...")
+            click_time = self.click_time
+            await self._like(room_name, room_id, target_id, click_time)
+            if click_time > 1 and not await self._is_lighted(target_id):
+                # 接口没有按 click_time 计数，之后改为逐次点赞
+                self.u.log.warning(f"{room_name} 批量点赞后仍未点亮，改为逐次点赞")
+                self.click_time = 1
+                await self._like(room_name, room_id, target_id, 1)
+            self.u.log.info(f"{room_name} 点赞{LIKES_TO_LIGHT}次完成")
+            # MedalWall 刷新前不再重复提交
+            medal.is_lighted = 1
+
+    async def _like(self, room_name: str, room_id: int, target_id: int, click_time: int):
+        requests = math.ceil(LIKES_TO_LIGHT / click_time)
+        for index in range(1, requests + 1):
+            clicks = min(click_time, LIKES_TO_LIGHT - (index - 1) * click_time)
+            try:
+                await self.u.api.likeInteractV3(room_id, target_id, self.u.mid, click_time=clicks)
+                if self.u.verbose_log:
+                    self.u.log.info(f"{room_name} 点赞第 {index}/{requests} 次成功（{clicks} 下）")
+            except Exception as e:
+                if self.u.verbose_log:
+                    self.u.log.warning(f"{room_name} 点赞第 {index}/{requests} 次失败: {e}")
+            # 每次间隔 interval 秒（最后一次不需要等待）
+            if index < requests:
+                await asyncio.sleep(self.interval)
+
+    async def _is_lighted(self, target_id: int) -> bool:
+        try:
+            medal_info = await self.u.api.getUserMedalInfo(self.u.mid, target_id)
+        except Exception as e:
+            self.u.log.warning(f"检查粉丝牌点亮状态失败: {e}")
+            return True  # 无法确认时不改变点赞方式
+        return medal_info.get("curr_show", {}).get("is_light", 1) != 0
+
+    async def close(self):
+        """取消所有未完成的点亮任务"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,80 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .config import load_yaml
+
+# 这些字段变化时，运行中的账号就地更新（下一次重新筛选时生效），不需要重新登录
+ACCOUNT_FIELDS = ("white_uid", "banned_uid", "max_concurrent_rooms")
+
+Diff = Tuple[List[dict], List[dict], List[dict]]
+
+
+class ConfigWatcher:
+    """
+    轮询 users.yaml 的修改时间，文件变化后与运行中的账号列表对比
+    - 账号以 access_key 区分，返回 (新增, 删除, 修改) 三个账号配置列表
+    - 只处理 USERS 部分，其他全局配置修改后仍需重启
+    - accept 用于分片模式下只接管属于本进程的账号
+    第一次轮询总会读取一次文件，分片进程按启动时的旧账号列表重启后也能对齐到最新配置
+    """
+
+    def __init__(
+        self,
+        path: str,
+        accounts: List[dict],
+        interval: float = 10,
+        accept: Callable[[dict], bool] = None,
+    ):
+        self.path = path
+        self.interval = interval
+        self._accept = accept or (lambda user: True)
+        self._accounts: Dict[str, dict] = {user["access_key"]: user for user in accounts if user.get("access_key")}
+        self._key: Optional[Tuple[int, int]] = None
+        self.log = logger.bind(user="配置热加载")
+
+    def poll(self) -> Optional[Diff]:
+        """文件未变化或读取失败时返回 None"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key == self._key:
+            return None
+        self._key = key
+        try:
+            users = load_yaml(self.path) or {}
+            entries = {
+                user["access_key"]: user
+                for user in users.get("USERS") or []
+                if user.get("access_key") and self._accept(user)
+            }
+        except Exception as e:
+            # 编辑到一半或格式错误时保持当前账号不变，等下一次修改
+            self.log.warning(f"读取 {self.path} 失败，暂不应用修改: {e}")
+            return None
+
+        old = self._accounts
+        added = [user for access_key, user in entries.items() if access_key not in old]
+        removed = [user for access_key, user in old.items() if access_key not in entries]
+        changed = [
+            user for access_key, user in entries.items()
+            if access_key in old and any(user.get(field) != old[access_key].get(field) for field in ACCOUNT_FIELDS)
+        ]
+        self._accounts = entries
+        return added, removed, changed
+
+    async def run(self, on_change: Callable[[List[dict], List[dict], List[dict]], Awaitable[None]]):
+        while True:
+            await asyncio.sleep(self.interval)
+            diff = self.poll()
+            if diff is not None and any(diff):
+                added, removed, changed = diff
+                self.log.info(f"users.yaml 已修改：新增 {len(added)} 个账号，移除 {len(removed)} 个，修改 {len(changed)} 个")
+                try:
+                    await on_change(added, removed, changed)
+                except Exception as e:
+                    self.log.exception(f"应用配置修改失败: {e}")
@@ -0,0 +1,261 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from loguru import logger
+
+from .config import get_base_dir
+
+SAVE_DELAY = 5  # 缓存变化后延迟写盘的时间（秒），期间的多次修改合并为一次写入
+
+
+class RoomIdCache:
+    """
+    主播 UID -> 直播间 room_id 的缓存，进程内所有账号共享，并持久化到磁盘
+
+    - 内存中为 LRU，超过 max_size 时淘汰最久未使用的条目
+    - 接口确认没有直播间（room_id 为 0）的结果作为负缓存保存 negative_ttl 秒，避免反复请求
+    - 查询失败（网络错误、风控等）的结果不缓存，下次重新查询
+    - 未命中的 UID 先批量查询，剩余的在信号量限制下并发逐个查询
+    - 修改后延迟 SAVE_DELAY 秒在线程池中写盘，不阻塞事件循环；退出时 close() 写入剩余修改
+    - 写盘前合并磁盘上其他分片进程写入的条目，多进程共用一个缓存文件时互不覆盖
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = 10000,
+        ttl: float = 7 * 86400,
+        negative_ttl: float = 3600,
+        concurrency: int = 8,
+    ):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.concurrency = concurrency
+
+        self._entries: "OrderedDict[int, list]" = OrderedDict()  # uid -> [room_id, 写入时间]
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._dirty = False
+        self._save_task: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "negative_hits": 0}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for uid, (room_id, updated) in data.items():
+                self._entries[int(uid)] = [int(room_id), float(updated)]
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        except Exception as e:
+            # 缓存文件损坏时不影响主流程，重新建立缓存
+            logger.bind(user="直播间缓存").warning(f"读取 {self.path} 失败: {e}")
+            self._entries.clear()
+
+    def _snapshot(self) -> dict:
+        self._dirty = False
+        return {str(uid): list(entry) for uid, entry in self._entries.items()}
+
+    def _merge_disk(self, snapshot: dict) -> dict:
+        """
+        合并磁盘上其他进程写入的条目：多进程分片运行时各进程共用同一个缓存文件，
+        直接用本进程的快照覆盖会丢掉其他分片解析的结果
+        - 同一 UID 保留写入时间较新的条目（相同时以本进程为准）
+        - 过期的条目丢弃，合并后仍按 max_size 淘汰最久未使用的
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                disk = json.load(f)
+        except FileNotFoundError:
+            return snapshot
+        except Exception as e:
+            logger.bind(user="直播间缓存").warning(f"合并 {self.path} 失败，仅写入本进程的缓存: {e}")
+            return snapshot
+        now = time.time()
+        merged = {}
+        # 其他进程的条目排在前面，视为较久未使用
+        for uid, entry in disk.items():
+            try:
+                room_id, updated = int(entry[0]), float(entry[1])
+            except (TypeError, ValueError, IndexError):
+                continue
+            ttl = self.ttl if room_id else self.negative_ttl
+            if uid not in snapshot and now - updated <= ttl:
+                merged[uid] = [room_id, updated]
+        for uid, entry in snapshot.items():
+            other = disk.get(uid)
+            try:
+                if other is not None and float(other[1]) > entry[1] and now - float(other[1]) <= (
+                    self.ttl if int(other[0]) else self.negative_ttl
+                ):
+                    entry = [int(other[0]), float(other[1])]
+            except (TypeError, ValueError, IndexError):
+                pass
+            merged[uid] = entry
+        if len(merged) > self.max_size:
+            merged = dict(list(merged.items())[-self.max_size:])
+        return merged
+
+    def _write(self, snapshot: dict) -> bool:
+        """将缓存与磁盘上的内容合并后写回（先写临时文件再替换，避免写一半时损坏），可在线程池中调用"""
+        # 多进程分片运行时各进程共用同一个缓存文件，临时文件按进程区分
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self._write_lock:
+            try:
+                snapshot = self._merge_disk(snapshot)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+                return True
+            except Exception as e:
+                logger.bind(user="直播间缓存").warning(f"写入 {self.path} 失败: {e}")
+                return False
+
+    def save(self):
+        """立即同步写盘（退出时使用）"""
+        if self._dirty and not self._write(self._snapshot()):
+            self._dirty = True
+
+    def _schedule_save(self):
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.ensure_future(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(SAVE_DELAY)
+        if not self._dirty:
+            return
+        # 快照在事件循环中生成，序列化和写文件放到线程池
+        ok = await asyncio.get_running_loop().run_in_executor(None, self._write, self._snapshot())
+        if not ok:
+            self._dirty = True
+
+    def close(self):
+        """取消延迟写盘，同步写入剩余修改"""
+        if self._save_task is not None:
+            self._save_task.cancel()
+            self._save_task = None
+        self.save()
+
+    def get(self, uid: int) -> Optional[int]:
+        """
+        返回缓存的 room_id；0 表示负缓存（确认查不到），None 表示未命中或已过期
+        """
+        entry = self._entries.get(uid)
+        if entry is None:
+            return None
+        room_id, updated = entry
+        ttl = self.ttl if room_id else self.negative_ttl
+        if time.time() - updated > ttl:
+            del self._entries[uid]
+            self._dirty = True
+            return None
+        self._entries.move_to_end(uid)
+        return room_id
+
+    def put(self, uid: int, room_id: int):
+        entry = self._entries.get(uid)
+        if entry is not None and entry[0] == room_id and room_id:
+            # 已确认的 room_id 未变化，只刷新 LRU 顺序
+            self._entries.move_to_end(uid)
+            return
+        self._entries[uid] = [int(room_id), time.time()]
+        self._entries.move_to_end(uid)
+        self._dirty = True
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def resolve(self, uids: Iterable[int], api) -> Dict[int, int]:
+        """
+        解析一批 UID 的 room_id，返回 {uid: room_id}，查不到的 room_id 为 0
+        :param api: 用于未命中时查询的 BiliApi 实例
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        result: Dict[int, int] = {}
+        misses = []
+        waiting = {}
+        for uid in dict.fromkeys(uids):
+            cached = self.get(uid)
+            if cached is not None:
+                self.stats["negative_hits" if cached == 0 else "hits"] += 1
+                result[uid] = cached
+            elif uid in self._inflight:
+                # 其他账号正在查询同一个 UID，等待其结果
+                waiting[uid] = self._inflight[uid]
+            else:
+                misses.append(uid)
+
+        if misses:
+            self.stats["misses"] += len(misses)
+            loop = asyncio.get_running_loop()
+            futures = {uid: loop.create_future() for uid in misses}
+            self._inflight.update(futures)
+            try:
+                # 先批量查询
+                status_map = await api.getStatusInfoByUids(misses)
+                resolved = {
+                    uid: status["room_id"] for uid, status in status_map.items()
+                    if uid in futures and status.get("room_id")
+                }
+
+                # 批量查询未覆盖的 UID，并发逐个查询
+                async def _fetch_one(uid: int):
+                    async with self._semaphore:
+                        resolved[uid] = await api.getRoomIdByUid(uid)
+
+                await asyncio.gather(*[_fetch_one(uid) for uid in misses if uid not in resolved])
+
+                for uid in misses:
+                    room_id = resolved.get(uid)
+                    if room_id is None:
+                        room_id = 0  # 查询失败，本次视为没有直播间，但不写入缓存
+                    else:
+                        self.put(uid, room_id)
+                    result[uid] = room_id
+                    futures[uid].set_result(room_id)
+                if self._dirty:
+                    self._schedule_save()
+            finally:
+                for uid, future in futures.items():
+                    if not future.done():
+                        future.set_result(0)
+                    self._inflight.pop(uid, None)
+
+        for uid, future in waiting.items():
+            result[uid] = await future
+        return result
+
+
+_room_cache: Optional[RoomIdCache] = None
+
+
+def get_room_cache(config: dict = {}) -> RoomIdCache:
+    """
+    获取进程内共享的 room_id 缓存，首次调用时按 config 创建
+    - ROOM_ID_CACHE_SIZE: 内存中最多缓存的条目数
+    - ROOM_ID_CACHE_TTL: 已确认 room_id 的有效期（秒）
+    - ROOM_ID_NEGATIVE_TTL: 确认没有直播间的结果的有效期（秒）
+    - ROOM_ID_RESOLVE_CONCURRENCY: 未命中时并发查询的数量上限
+    """
+    global _room_cache
+    if _room_cache is None:
+        _room_cache = RoomIdCache(
+            os.path.join(get_base_dir(), "room_id_cache.json"),
+            max_size=int(config.get("ROOM_ID_CACHE_SIZE", 10000)),
+            ttl=float(config.get("ROOM_ID_CACHE_TTL", 7 * 86400)),
+            negative_ttl=float(config.get("ROOM_ID_NEGATIVE_TTL", 3600)),
+            concurrency=int(config.get("ROOM_ID_RESOLVE_CONCURRENCY", 8)),
+        )
+    return _room_cache
@@ -0,0 +1,181 @@
+import asyncio
+import heapq
+import itertools
+import math
+from collections import deque
+from typing import Dict, Optional
+
+from loguru import logger
+
+
+class HeartbeatScheduler:
+    """
+    全局心跳调度器：用一个最小堆保存所有账号、所有直播间的待发心跳截止时间
+
+    - 整个事件循环只保留一个定时器（loop.call_at），到点后一次性唤醒同一容忍窗口内到期的所有心跳
+    - 每个窗口有容量上限，超出的心跳会被错开到附近的窗口，避免对 live-trace.bilibili.com 的同步突发
+    - 记录每次心跳的迟到时长，用于评估单核能承载的心跳流数量
+    """
+
+    def __init__(
+        self,
+        tolerance: float = 0.5,
+        max_per_window: int = 50,
+        max_spread: float = 5.0,
+        report_interval: float = 300.0,
+    ):
+        """
+        :param tolerance: 容忍窗口（秒），同一窗口内到期的心跳一起唤醒
+        :param max_per_window: 每个窗口最多唤醒的心跳数
+        :param max_spread: 错开心跳时允许偏离原截止时间的最大秒数
+        :param report_interval: 打印调度统计的间隔（秒），0 表示不打印
+        """
+        self.tolerance = tolerance
+        self.max_per_window = max_per_window
+        self.max_spread = max_spread
+        self.report_interval = report_interval
+
+        self._heap = []
+        self._counter = itertools.count()
+        self._windows: Dict[int, int] = {}  # 窗口编号 -> 已排入的心跳数
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_when: Optional[float] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._lateness = deque(maxlen=10000)  # 最近的迟到时长样本（秒）
+        self._last_report = None
+        self.scheduled = 0
+        self.fired = 0
+        self.shifted = 0  # 为削峰被错开的心跳数
+        self.max_batch = 0  # 单次唤醒的最大心跳数
+
+    def _window(self, when: float) -> int:
+        return math.floor(when / self.tolerance)
+
+    def _pick_window(self, when: float) -> float:
+        """为截止时间挑选一个未满的窗口，优先原窗口，其次依次向前、向后错开"""
+        base = self._window(when)
+        if self._windows.get(base, 0) < self.max_per_window:
+            return when
+        steps = int(self.max_spread / self.tolerance)
+        for step in range(1, steps + 1):
+            for window in (base - step, base + step):
+                if self._windows.get(window, 0) < self.max_per_window:
+                    # 错开到目标窗口的同一相位，不早于当前时间
+                    shifted = when + (window - base) * self.tolerance
+                    if shifted >= self._loop.time():
+                        self.shifted += 1
+                        return shifted
+        # 附近窗口都满了，保持原截止时间
+        return when
+
+    def _arm(self):
+        if not self._heap:
+            return
+        when = self._heap[0][0]
+        if self._timer is not None and self._timer_when is not None and self._timer_when <= when:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer_when = when
+        self._timer = self._loop.call_at(when, self._fire)
+
+    def _fire(self):
+        self._timer = None
+        self._timer_when = None
+        now = self._loop.time()
+        batch = 0
+        # 一次性唤醒容忍窗口内到期的所有心跳
+        while self._heap and self._heap[0][0] <= now + self.tolerance:
+            when, _, future = heapq.heappop(self._heap)
+            window = self._window(when)
+            self._windows[window] -= 1
+            if not self._windows[window]:
+                del self._windows[window]
+            if future.done():
+                continue
+            # 迟到时长相对于分配到的唤醒时间计算，削峰主动错开的部分不算迟到
+            lateness = max(0.0, now - when)
+            self._lateness.append(lateness)
+            self.fired += 1
+            batch += 1
+            future.set_result(lateness)
+        self.max_batch = max(self.max_batch, batch)
+        self._maybe_report(now)
+        self._arm()
+
+    def _maybe_report(self, now: float):
+        if not self.report_interval:
+            return
+        if self._last_report is None:
+            self._last_report = now
+            return
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            stats = self.stats()
+            logger.bind(user="心跳调度").info(
+                f"待发心跳 {stats['pending']}，已发 {stats['fired']}，错开 {stats['shifted']}，"
+                f"单次最大唤醒 {stats['max_batch']}，迟到 平均{stats['lateness_mean'] * 1000:.1f}ms "
+                f"P99 {stats['lateness_p99'] * 1000:.1f}ms 最大{stats['lateness_max'] * 1000:.1f}ms"
+            )
+
+    def wait_until(self, deadline: float) -> asyncio.Future:
+        """
+        登记一个心跳截止时间（loop.time() 时钟），返回到点后完成的 Future，结果为迟到秒数
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        when = self._pick_window(deadline)
+        future = self._loop.create_future()
+        heapq.heappush(self._heap, (when, next(self._counter), future))
+        window = self._window(when)
+        self._windows[window] = self._windows.get(window, 0) + 1
+        self.scheduled += 1
+        self._arm()
+        return future
+
+    async def sleep(self, delay: float) -> float:
+        """
+        替代 asyncio.sleep(delay)，由调度器统一唤醒，返回本次心跳的迟到秒数
+        """
+        loop = asyncio.get_running_loop()
+        return await self.wait_until(loop.time() + delay)
+
+    def stats(self) -> dict:
+        samples = sorted(self._lateness)
+        if samples:
+            mean = sum(samples) / len(samples)
+            p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+            worst = samples[-1]
+        else:
+            mean = p99 = worst = 0.0
+        return {
+            "pending": len(self._heap),
+            "scheduled": self.scheduled,
+            "fired": self.fired,
+            "shifted": self.shifted,
+            "max_batch": self.max_batch,
+            "lateness_mean": mean,
+            "lateness_p99": p99,
+            "lateness_max": worst,
+        }
+
+
+_scheduler: Optional[HeartbeatScheduler] = None
+
+
+def get_scheduler(config: dict = {}) -> HeartbeatScheduler:
+    """
+    获取进程内共享的心跳调度器，首次调用时按 config 创建
+    - HEARTBEAT_TOLERANCE: 容忍窗口（秒）
+    - HEARTBEAT_MAX_PER_WINDOW: 每个窗口最多唤醒的心跳数
+    - HEARTBEAT_MAX_SPREAD: 削峰时允许偏离的最大秒数
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = HeartbeatScheduler(
+            tolerance=float(config.get("HEARTBEAT_TOLERANCE", 0.5)),
+            max_per_window=int(config.get("HEARTBEAT_MAX_PER_WINDOW", 50)),
+            max_spread=float(config.get("HEARTBEAT_MAX_SPREAD", 5)),
+        )
+    return _scheduler
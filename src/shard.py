@@ -0,0 +1,124 @@
+import multiprocessing
+import queue
+import time
+import zlib
+from typing import Callable, Dict, List
+
+from loguru import logger
+
+
+def shard_of(access_key: str, shards: int) -> int:
+    """按 access_key 的稳定哈希决定账号分到哪个进程（与 PYTHONHASHSEED 无关，重启后不变）"""
+    return zlib.crc32(str(access_key).encode("utf-8")) % shards
+
+
+def split_accounts(accounts: list, shards: int) -> List[list]:
+    """把 USERS 列表按 access_key 分成 shards 份，每份保持原有顺序"""
+    result = [[] for _ in range(shards)]
+    for account in accounts:
+        result[shard_of(account.get("access_key", ""), shards)].append(account)
+    return result
+
+
+class ShardSupervisor:
+    """
+    多进程分片运行的主进程
+    - 每个子进程运行 target(index, accounts, reports)，各自拥有独立的事件循环
+    - 子进程异常退出（exitcode 非 0）时按指数退避重启，正常退出则不再拉起
+    - 子进程结束前把 sendmsg() 的汇总通过 reports 队列发回，由主进程统一输出
+    - index 即 shard_of() 的分片序号；keep_empty 为 True 时没有账号的分片也启动（热加载新增的账号由它接管）
+    """
+
+    def __init__(
+        self,
+        target: Callable,
+        accounts: list,
+        workers: int,
+        restart_delay: float = 5,
+        max_restart_delay: float = 300,
+        stable_after: float = 600,
+        keep_empty: bool = False,
+    ):
+        self.target = target
+        self.shards = split_accounts(accounts, workers)
+        self.keep_empty = keep_empty
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stable_after = stable_after  # 子进程运行超过该秒数后，重启退避重新计时
+
+        # spawn 在各平台行为一致，子进程不会继承父进程的事件循环和日志线程
+        self._ctx = multiprocessing.get_context("spawn")
+        self._reports = self._ctx.Queue()
+        self._procs: Dict[int, multiprocessing.Process] = {}
+        self._started_at: Dict[int, float] = {}
+        self._delays: Dict[int, float] = {}
+        self._restart_at: Dict[int, float] = {}
+        self.restarts = 0
+        self.log = logger.bind(user="分片")
+
+    def _start(self, index: int):
+        proc = self._ctx.Process(
+            target=self.target,
+            args=(index, self.shards[index], self._reports),
+            name=f"bili-shard-{index}",
+            daemon=True,
+        )
+        proc.start()
+        self._procs[index] = proc
+        self._started_at[index] = time.monotonic()
+        self.log.info(f"分片 {index} 已启动（pid {proc.pid}，{len(self.shards[index])} 个账号）")
+
+    def _drain_reports(self, messages: List[str], timeout: float):
+        try:
+            _, report = self._reports.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            [self.log.info(message) for message in report]
+            messages.extend(report)
+            try:
+                _, report = self._reports.get_nowait()
+            except queue.Empty:
+                return
+
+    def _check(self, index: int):
+        proc = self._procs[index]
+        if proc.is_alive():
+            return
+        proc.join()
+        del self._procs[index]
+        if proc.exitcode == 0:
+            self.log.info(f"分片 {index} 已结束")
+            return
+        now = time.monotonic()
+        delay = self._delays.get(index, self.restart_delay)
+        if now - self._started_at[index] >= self.stable_after:
+            delay = self.restart_delay
+        self._delays[index] = min(delay * 2, self.max_restart_delay)
+        self._restart_at[index] = now + delay
+        self.log.warning(f"分片 {index} 异常退出（exitcode {proc.exitcode}），{delay:.0f}秒后重启")
+
+    def run(self) -> List[str]:
+        """启动所有分片并阻塞到全部正常结束，返回收集到的汇总消息"""
+        messages: List[str] = []
+        for index, shard in enumerate(self.shards):
+            if shard or self.keep_empty:
+                self._start(index)
+        try:
+            while self._procs or self._restart_at:
+                self._drain_reports(messages, timeout=1)
+                for index in list(self._procs):
+                    self._check(index)
+                now = time.monotonic()
+                for index, restart_at in list(self._restart_at.items()):
+                    if now >= restart_at:
+                        del self._restart_at[index]
+                        self.restarts += 1
+                        self._start(index)
+            self._drain_reports(messages, timeout=0.1)
+        finally:
+            for proc in self._procs.values():
+                proc.terminate()
+            for proc in self._procs.values():
+                proc.join(timeout=10)
+        return messages
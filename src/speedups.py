@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+# 可选的性能依赖：安装了 uvloop / orjson 时自动使用，未安装时退回标准库
+# - uvloop: 替换默认的 asyncio 事件循环（Windows 不支持，pip 装不上时自动跳过）
+# - orjson: 解析接口响应，以及心跳 client_sign 的 JSON 序列化
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+try:
+    import uvloop as _uvloop
+except ImportError:
+    _uvloop = None
+
+_enabled = True
+
+
+def enable(enabled: bool = True):
+    """开关可选依赖（配置 SPEEDUPS: 0 时关闭，方便排查问题）"""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def available() -> dict:
+    """当前实际生效的可选依赖"""
+    return {
+        "orjson": _enabled and _orjson is not None,
+        "uvloop": _enabled and _uvloop is not None,
+    }
+
+
+def json_loads(data):
+    """解析 JSON，可传入 str 或 bytes"""
+    if _enabled and _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_compact(data: dict) -> bytes:
+    """
+    等价于 json.dumps(data, separators=(",", ":")).encode("utf-8")，输出逐字节相同
+    orjson 不转义非 ASCII 字符，遇到这种情况退回标准库；心跳参数只有 str / int，不涉及浮点数格式差异
+    """
+    if _enabled and _orjson is not None:
+        raw = _orjson.dumps(data)
+        if raw.isascii():
+            return raw
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """创建事件循环，安装了 uvloop 时使用 uvloop"""
+    if _enabled and _uvloop is not None:
+        return _uvloop.new_event_loop()
+    return asyncio.new_event_loop()
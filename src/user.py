@@ -1,122 +1,110 @@
-from aiohttp import ClientSession, ClientTimeout
 import sys
 import os
 import asyncio
 import uuid
 from loguru import logger
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Optional
 
-import yaml
+from .breaker import CircuitOpenError
+from .medal import Medal
+from .weights import DEFAULT_WEIGHT, get_weight_table
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# 读取配置文件，根据 VERBOSE_LOG 设置日志级别
-def _get_log_level_from_config():
-    """从配置文件读取 VERBOSE_LOG，返回对应的日志级别"""
-    # 获取程序基目录（配置文件所在目录）
-    if getattr(sys, 'frozen', False):
-        # PyInstaller 打包后的情况
-        base_dir = os.path.dirname(sys.executable)
-    else:
-        # 开发环境
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
-    config_path = os.path.join(base_dir, "users.yaml")
-    try:
-        if os.path.exists(config_path):
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = yaml.load(f, Loader=yaml.FullLoader) or {}
-                verbose_log = config.get("VERBOSE_LOG", 1)
-                return "DEBUG" if verbose_log else "INFO"
-    except Exception:
-        pass  # 如果读取失败，使用默认值
-    # 默认返回 INFO，避免打印过多日志
-    return "INFO"
-
-logger.remove()
-logger.add(
-    sys.stdout,
-    colorize=True,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> <blue> {extra[user]} </blue> <level>{message}</level>",
-    backtrace=True,
-    diagnose=True,
-    level=_get_log_level_from_config(),  # 根据 VERBOSE_LOG 配置动态设置
-)
+# 观看槽位出错后重新补位前的等待时间（秒），连续出错时翻倍，避免在接口故障期间反复进房
+SLOT_RETRY_BACKOFF = 5
+SLOT_RETRY_BACKOFF_MAX = 120
 
 
 class BiliUser:
     def __init__(self, access_token: str, whiteUIDs: str = '', bannedUIDs: str = '', config: dict = {}):
         from .api import BiliApi
+        from .pool import get_session
+        from .scheduler import get_scheduler
+        from .roomcache import get_room_cache
+        from .checkpoint import get_checkpoint_store
+        from .prioritizer import get_prioritizer
+        from .medaldiff import MedalWallDiffer
+        from .relight import Relighter
+        from . import metrics
 
         self.mid, self.name = 0, ""
         self.access_key = access_token
-        try:
-            self.whiteList = list(map(lambda x: int(x if x else 0), str(whiteUIDs).split(',')))
-            self.bannedList = list(map(lambda x: int(x if x else 0), str(bannedUIDs).split(',')))
-        except ValueError:
-            raise ValueError("白名单或黑名单格式错误")
+        self.whiteList, self.bannedList = self._parse_uid_lists(whiteUIDs, bannedUIDs)
         self.config = config
         self.medals = []
         self.medalsNeedDo = []
+        # MedalWall 变化事件：重新筛选时只处理有变化的粉丝牌，其他组件也可以 subscribe()
+        self.medal_events = MedalWallDiffer()
+        self._medal_index: Optional[Dict[int, Medal]] = None  # target_id -> 通过黑白名单的粉丝牌，完整筛选后建立
+        self._need: Dict[int, Medal] = {}  # target_id -> 可观看的粉丝牌
 
-        self.session = ClientSession(timeout=ClientTimeout(total=3), trust_env = True)
+        # 所有账号共用进程内的连接池
+        self.session = get_session(config)
         self.api = BiliApi(self, self.session)
+        # 所有账号、所有直播间的心跳由同一个调度器统一唤醒
+        self.scheduler = get_scheduler(config)
+        # 主播 UID -> room_id 的持久化缓存，所有账号共享
+        self.room_cache = get_room_cache(config)
+        # 观看进度检查点，重启后从上次的心跳继续
+        self.checkpoint = get_checkpoint_store(config)
+        self._resume = None  # 登录后从检查点读取的可恢复进度
+        # 候选直播间的排序策略（PRIORITIZER）
+        self.prioritizer = get_prioritizer(config)
+        # 熄灭的粉丝牌在后台并发点亮，不占用观看槽位
+        self.relighter = Relighter(
+            self,
+            click_time=config.get("LIKE_CLICK_TIME", 10),
+            concurrency=config.get("RELIGHT_CONCURRENCY", 5),
+        )
+        self.metrics = metrics
 
         self.message = []
         self.errmsg = ["错误日志："]
         self.uuids = [str(uuid.uuid4()) for _ in range(2)]
 
         self.verbose_log = bool(config.get("VERBOSE_LOG", 1))
-        self.fansmedal_weights: Dict[str, Any] = self._load_fansmedal_weights()
+        # 权重表 {主播UID: 权重}，按 uid 区分，登录后再加载；同一文件的权重表由所有账号共享
+        self.fansmedal_weights: Dict[int, int] = {}
 
-    def _load_fansmedal_weights(self) -> Dict[str, Any]:
-        # 获取程序基目录（配置文件所在目录）
-        if getattr(sys, 'frozen', False):
-            # PyInstaller 打包后的情况
-            base_dir = os.path.dirname(sys.executable)
-        else:
-            # 开发环境
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        
-        # 优先读取用户特定的权重文件
-        if hasattr(self, 'mid') and self.mid:
-            user_weight_path = os.path.join(base_dir, f"fansmedal_weight_{self.mid}.yaml")
-            if os.path.exists(user_weight_path):
-                try:
-                    with open(user_weight_path, "r", encoding="utf-8") as f:
-                        data = yaml.load(f, Loader=yaml.FullLoader) or {}
-                        if isinstance(data, dict):
-                            return data
-                except Exception as e:
-                    # 读取失败时不影响主流程, 只打日志
-                    logger.bind(user="粉丝牌权重").warning(f"读取 {user_weight_path} 失败: {e}")
-        
-        # 如果用户特定文件不存在，读取通用文件
-        weight_path = os.path.join(base_dir, "fansmedal_weight.yaml")
-        if not os.path.exists(weight_path):
-            return {}
-        try:
-            with open(weight_path, "r", encoding="utf-8") as f:
-                data = yaml.load(f, Loader=yaml.FullLoader) or {}
-                if not isinstance(data, dict):
-                    return {}
-                return data
-        except Exception as e:
-            # 读取失败时不影响主流程, 只打日志
-            logger.bind(user="粉丝牌权重").warning(f"读取 fansmedal_weight.yaml 失败: {e}")
-            return {}
-
-    def _get_medal_weight(self, medal: dict) -> int:
-        medal_info = medal.get("medal", {}) or {}
-        target_id = medal_info.get("target_id", 0) or 0
-        key_str = str(target_id)
-        cfg = self.fansmedal_weights.get(key_str) or {}
+    @staticmethod
+    def _parse_uid_lists(whiteUIDs: str, bannedUIDs: str):
         try:
-            weight = int(cfg.get("weight", 100))
-        except (TypeError, ValueError):
-            weight = 100
-        return weight
+            whiteList = list(map(lambda x: int(x if x else 0), str(whiteUIDs).split(',')))
+            bannedList = list(map(lambda x: int(x if x else 0), str(bannedUIDs).split(',')))
+        except ValueError:
+            raise ValueError("白名单或黑名单格式错误")
+        return whiteList, bannedList
+
+    def reconfigure(self, whiteUIDs: str = '', bannedUIDs: str = '', max_concurrent_rooms: int = None):
+        """
+        热加载 users.yaml 后更新黑白名单和同时观看的直播间数
+        下一次重新筛选时生效，正在观看的直播间不受影响
+        """
+        whiteList, bannedList = self._parse_uid_lists(whiteUIDs, bannedUIDs)
+        if (whiteList, bannedList) != (self.whiteList, self.bannedList):
+            self.whiteList, self.bannedList = whiteList, bannedList
+            # 名单变化会改变参与筛选的粉丝牌，下一次完整筛选一遍
+            self._medal_index = None
+        if max_concurrent_rooms:
+            self.config["MAX_CONCURRENT_ROOMS"] = max_concurrent_rooms
+
+    def _reload_fansmedal_weights(self):
+        """权重文件修改后更新已索引粉丝牌的权重，本次筛选的排序即生效（文件未修改时返回同一个权重表）"""
+        weights = get_weight_table(self.mid)
+        if weights is self.fansmedal_weights:
+            return
+        changed = weights != self.fansmedal_weights
+        self.fansmedal_weights = weights
+        if not changed:
+            return
+        for medal in (self._medal_index or {}).values():
+            medal.weight = self._get_medal_weight(medal)
+        self.log.info("粉丝牌权重配置已更新")
+
+    def _get_medal_weight(self, medal: Medal) -> int:
+        return self.fansmedal_weights.get(medal.target_id, DEFAULT_WEIGHT)
 
     def _format_watch_time(self, total_seconds: int) -> str:
         minutes = total_seconds // 60
@@ -126,12 +114,13 @@ class BiliUser:
     async def loginVerify(self) -> bool:
         loginInfo = await self.api.loginVerift()
         self.mid, self.name = loginInfo['mid'], loginInfo['name']
-        self.log = logger.bind(user=self.name)
+        # 绑定 uid，文件日志按 uid 分发到 {uid}.log
+        self.log = logger.bind(user=self.name, uid=self.mid)
         if loginInfo['mid'] == 0:
             self.isLogin = False
             return False
-        # 登录成功后重新加载权重（优先使用用户特定的权重文件）
-        self.fansmedal_weights = self._load_fansmedal_weights()
+        # 登录成功后加载权重（优先使用用户特定的权重文件）
+        self.fansmedal_weights = get_weight_table(self.mid)
         userInfo = await self.api.getUserInfo()
         if userInfo['medal']:
             medalInfo = await self.api.getMedalsInfoByUid(userInfo['medal']['target_id'])
@@ -142,7 +131,91 @@ class BiliUser:
         return True
 
 
+    def _in_lists(self, target_id: int) -> bool:
+        """黑白名单过滤：未配置白名单时排除黑名单中的主播，配置了白名单时只保留白名单中的主播"""
+        if self.whiteList == [0]:
+            return target_id not in self.bannedList
+        return target_id in self.whiteList
+
+    @staticmethod
+    def _is_candidate(medal: Medal) -> bool:
+        """正在开播且今日亲密度 < 30"""
+        return medal.today_feed < 30 and medal.live_status == 1
+
     async def getMedals(self, verbose: bool = True, show_details: bool = True):
+        self._reload_fansmedal_weights()
+        medal_list = await self.api.getMedalWall(verbose=verbose and show_details)
+        events = self.medal_events.diff(medal_list)
+        if not verbose and self._medal_index is not None:
+            # 已经完整筛选过且不需要打印详情时，只按变化事件增量更新
+            await self._applyMedalEvents(events)
+            return
+        await self._screenAll(medal_list, verbose, show_details)
+
+    async def _applyMedalEvents(self, events: list):
+        from .medaldiff import ADDED, REMOVED, WENT_LIVE, REACHED_CAP
+
+        touched: Dict[int, Medal] = {}
+        for event in events:
+            target_id = event.target_id
+            if event.kind == REMOVED:
+                self._medal_index.pop(target_id, None)
+                self._need.pop(target_id, None)
+                touched.pop(target_id, None)
+                continue
+            if event.kind == ADDED:
+                if not self._in_lists(target_id):
+                    continue
+                medal = self.api.convertMedalWallItem(event.item)
+                medal.weight = self._get_medal_weight(medal)
+                self._medal_index[target_id] = medal
+            else:
+                medal = self._medal_index.get(target_id)
+                if medal is None:
+                    continue  # 被黑白名单过滤的粉丝牌
+                if target_id not in touched:
+                    medal.refresh(self.api.convertMedalWallItem(event.item))
+                if event.kind == WENT_LIVE:
+                    medal.live_time = None  # 新的一场直播，重新查询开播时间
+                elif event.kind == REACHED_CAP:
+                    self.log.info(f"{medal.nick_name} 今日亲密度已满 {event.new}")
+            touched[target_id] = medal
+
+        # 所有缺少 room_id 的候选粉丝牌每次都重新解析（不只是有变化的）：
+        # 上次查询失败的不会被缓存，未观看的粉丝牌 MedalWall 条目也不会变化，否则整场直播都不会再被考虑
+        missing_room = [
+            medal for medal in self._medal_index.values()
+            if self._is_candidate(medal) and medal.room_id == 0
+        ]
+        if missing_room:
+            room_map = await self.room_cache.resolve([medal.target_id for medal in missing_room], self.api)
+            for medal in missing_room:
+                medal.room_id = room_map.get(medal.target_id, 0) or 0
+                if medal.room_id:
+                    touched[medal.target_id] = medal
+
+        if touched:
+            for target_id, medal in touched.items():
+                if self._is_candidate(medal) and medal.room_id:
+                    self._need[target_id] = medal
+                else:
+                    self._need.pop(target_id, None)
+            self.medals = list(self._medal_index.values())
+
+        if self.prioritizer.needs_live_time:
+            new_live = [medal for medal in self._need.values() if medal.live_time is None]
+            if new_live:
+                status_map = await self.api.getStatusInfoByUids([medal.target_id for medal in new_live])
+                for medal in new_live:
+                    medal.live_time = (status_map.get(medal.target_id) or {}).get("live_time", 0)
+
+        self.medalsNeedDo = list(self._need.values())
+        self.prioritizer.rank(self.medalsNeedDo)
+        if events:
+            self.log.debug(f"MedalWall 有 {len(events)} 项变化，增量更新后共 {len(self.medalsNeedDo)} 个可观看的直播间")
+
+    async def _screenAll(self, medal_list: list, verbose: bool, show_details: bool):
+        """完整筛选一遍所有粉丝牌（首次筛选或需要打印详情时）"""
         self.medals.clear()
         self.medalsNeedDo.clear()
         
@@ -154,16 +227,14 @@ class BiliUser:
         medal_count = 0
         skipped_blacklist = 0  # 黑名单跳过计数
         skipped_whitelist = 0  # 白名单跳过计数
-        async for medal in self.api.getFansMedalandRoomID(verbose=verbose and show_details):
+        for item in medal_list:
+            medal = self.api.convertMedalWallItem(item)
             medal_count += 1
-            anchor_name = medal.get('anchor_info', {}).get('nick_name', '未知')
-            medal_info = medal.get('medal', {})
-            room_info = medal.get('room_info', {})
-            
-            level = medal_info.get('level', 0)
-            today_feed = medal_info.get('today_feed', 0)
-            target_id = medal_info.get('target_id', 0)
-            room_id = room_info.get('room_id', 0)
+            anchor_name = medal.nick_name
+            level = medal.level
+            today_feed = medal.today_feed
+            target_id = medal.target_id
+            room_id = medal.room_id
             
             if verbose and show_details:
                 self.log.info(f"[粉丝牌 #{medal_count}] {anchor_name}")
@@ -196,6 +267,21 @@ class BiliUser:
             self.log.info("=" * 60)
             self.log.info("开始检查直播间开播状态...")
         
+        # 房间ID为0的候选直播间，通过共享的 room_id 缓存解析（未命中时批量 + 并发查询）
+        missing_room = [
+            medal for medal in self.medals
+            if medal.room_id == 0 and self._is_candidate(medal)
+        ]
+        if missing_room:
+            room_map = await self.room_cache.resolve([medal.target_id for medal in missing_room], self.api)
+            for medal in missing_room:
+                room_id = room_map.get(medal.target_id, 0)
+                if room_id:
+                    medal.room_id = room_id
+            if verbose and show_details:
+                resolved_count = sum(1 for room_id in room_map.values() if room_id)
+                self.log.info(f"解析 {len(missing_room)} 个直播间的房间ID，成功 {resolved_count} 个")
+
         # 筛选正在开播且今日亲密度 < 30 的直播间
         checked_count = 0
         skipped_intimacy = 0
@@ -205,15 +291,12 @@ class BiliUser:
         
         for medal in self.medals:
             checked_count += 1
-            anchor_name = medal.get('anchor_info', {}).get('nick_name', '未知')
-            medal_info = medal.get('medal', {})
-            room_info = medal.get('room_info', {})
-            
-            level = medal_info.get('level', 0)
-            today_feed = medal_info.get('today_feed', 0)
-            target_id = medal_info.get('target_id', 0)
-            room_id = room_info.get('room_id', 0)
-            live_status = medal.get('live_status', 0)  # 直接使用新接口返回的 live_status
+            anchor_name = medal.nick_name
+            level = medal.level
+            today_feed = medal.today_feed
+            target_id = medal.target_id
+            room_id = medal.room_id
+            live_status = medal.live_status  # 直接使用新接口返回的 live_status
             
             if verbose and show_details:
                 self.log.info(f"[检查 #{checked_count}/{len(self.medals)}] {anchor_name} (等级{level}, UID{target_id})")
@@ -235,24 +318,16 @@ class BiliUser:
                     self.log.warning(f"  - 结果: ✗ 未开播 (live_status={live_status})")
                 continue
             
-            # 如果 room_id 为 0，尝试通过 target_id 获取（备用方法）
+            # room_id 仍为 0，说明批量和逐个查询都未能获取
             if room_id == 0:
+                skipped_no_room += 1
                 if verbose and show_details:
-                    self.log.info(f"  - 房间ID为0，正在通过UID {target_id} 获取房间ID...")
-                room_id = await self.api.getRoomIdByUid(target_id)
-                if room_id > 0:
-                    medal['room_info']['room_id'] = room_id
-                    if verbose and show_details:
-                        self.log.info(f"  - 成功获取房间ID: {room_id}")
-                else:
-                    skipped_no_room += 1
-                    if verbose and show_details:
-                        self.log.warning(f"  - 结果: 无法获取房间ID，跳过")
-                    continue
+                    self.log.warning(f"  - 结果: 无法获取房间ID，跳过")
+                continue
             
             # 计算该粉丝牌权重（若未配置则为 100）
             weight = self._get_medal_weight(medal)
-            medal["weight"] = weight
+            medal.weight = weight
 
             # 所有条件满足，加入观看列表
             self.medalsNeedDo.append(medal)
@@ -262,11 +337,21 @@ class BiliUser:
                     f"  - 结果: ✓ 正在开播，已加入观看列表 (房间ID: {room_id}, 权重: {weight})"
                 )
         
-        # 先按权重由高到低, 再按粉丝团等级由高到低排序
-        self.medalsNeedDo.sort(
-            key=lambda x: (x.get("weight", self._get_medal_weight(x)), x["medal"]["level"]),
-            reverse=True,
-        )
+        # 需要开播时长的排序策略，批量查询一次候选直播间的开播时间
+        if self.prioritizer.needs_live_time and self.medalsNeedDo:
+            status_map = await self.api.getStatusInfoByUids([medal.target_id for medal in self.medalsNeedDo])
+            for medal in self.medalsNeedDo:
+                medal.live_time = (status_map.get(medal.target_id) or {}).get("live_time", 0)
+
+        # 按排序策略由高到低排序（默认按单位观看时长的预期亲密度收益）
+        self.prioritizer.rank(self.medalsNeedDo)
+
+        # 建立索引，之后的重新筛选按 MedalWall 变化事件增量更新
+        for medal in self.medals:
+            if medal.weight is None:
+                medal.weight = self._get_medal_weight(medal)
+        self._medal_index = {medal.target_id: medal for medal in self.medals}
+        self._need = {medal.target_id: medal for medal in self.medalsNeedDo}
         
         if verbose:
             self.log.info("=" * 60)
@@ -281,17 +366,18 @@ class BiliUser:
             self.log.info(f"  - 未开播跳过: {skipped_not_live}")
             self.log.info(f"  - 无法获取房间ID跳过: {skipped_no_room}")
             self.log.info(f"  - 最终可观看数量: {len(self.medalsNeedDo)}")
+            self.log.info(
+                f"  - MedalWall 接口请求: {self.api.medalWallStats['requests']} 次, "
+                f"缓存命中: {self.api.medalWallStats['cache_hits']} 次"
+            )
             self.log.info("=" * 60)
             
             if self.medalsNeedDo:
                 self.log.info(f"共找到 {len(self.medalsNeedDo)} 个正在开播且亲密度<30的直播间:")
                 for idx, medal in enumerate(self.medalsNeedDo, 1):
-                    anchor_name = medal.get('anchor_info', {}).get('nick_name', '未知')
-                    level = medal.get('medal', {}).get('level', 0)
-                    today_feed = medal.get('medal', {}).get('today_feed', 0)
-                    weight = medal.get("weight", self._get_medal_weight(medal))
                     self.log.info(
-                        f"  {idx}. {anchor_name} (权重{weight}, 等级{level}, 亲密度{today_feed})"
+                        f"  {idx}. {medal.nick_name} (权重{medal.weight}, 等级{medal.level}, "
+                        f"亲密度{medal.today_feed}, 优先级{medal.score or 0})"
                     )
             else:
                 self.log.warning("未找到符合条件的直播间！")
@@ -300,8 +386,14 @@ class BiliUser:
         if not await self.loginVerify():
             self.log.log("ERROR", "登录失败 可能是 access_key 过期 , 请重新获取")
             self.errmsg.append("登录失败 可能是 access_key 过期 , 请重新获取")
-            await self.session.close()
         else:
+            self._resume = self.checkpoint.load(self.mid)
+            if self._resume:
+                # 有可恢复的观看进度：沿用上次的设备 uuid 和筛选结果，跳过 MedalWall、点亮检查和进房
+                self.uuids = self._resume["uuids"] or self.uuids
+                self.medalsNeedDo = self._resume["medals"]
+                self.log.info(f"检查点中有 {len(self._resume['sessions'])} 个直播间的观看进度，将直接续传")
+                return
             # 初始化时获取一次，用于 start() 中判断是否有需要观看的直播间
             # 设置为 verbose=False 避免重复打印详细信息（watchinglive 中会再次获取并打印）
             await self.getMedals(verbose=False)
@@ -325,7 +417,6 @@ class BiliUser:
 
     async def sendmsg(self):
         if not self.isLogin:
-            await self.session.close()
             return self.message + self.errmsg
         
         # 不需要重新获取数据，直接使用已有的 medalsNeedDo
@@ -335,64 +426,44 @@ class BiliUser:
             self.message.append(f"共处理 {len(self.medalsNeedDo)} 个正在开播且亲密度<30的直播间")
             self.message.append("观看详情：")
             for medal in self.medalsNeedDo:
-                room_name = medal['anchor_info']['nick_name']
-                room_level = medal['medal']['level']
-                today_feed = medal['medal']['today_feed']
-                self.message.append(f"  - {room_name}（等级{room_level}，当前亲密度{today_feed}，预计获得30亲密度）")
+                self.message.append(
+                    f"  - {medal.nick_name}（等级{medal.level}，当前亲密度{medal.today_feed}，预计获得30亲密度）"
+                )
         else:
             self.message.append(f"【{self.name}】 没有需要观看的直播间")
         
-        await self.session.close()
         return self.message + self.errmsg + ['---']
 
-    async def _get_medal_from_wall(self, target_id: int):
-        async for medal in self.api.getFansMedalandRoomID(verbose=False):
-            if medal.get("medal", {}).get("target_id") == target_id:
-                return medal
-        return None
-
-    async def _like_room_30_times(self, room_name: str, room_id: int, target_id: int):
-        self.log.log(
-            "WARNING",
-            f"{room_name} 亲密度没有变化, 怀疑是粉丝勋章熄灭, 现在去点赞直播间30次"
-        )
-        
-        # 点赞30次，每次间隔3秒
-        for like_count in range(1, 31):
-            try:
-                # 使用 likeInteractV3 接口点赞
-                await self.api.likeInteractV3(room_id, target_id, self.mid)
-                if self.verbose_log:
-                    self.log.info(f"{room_name} 点赞第 {like_count} 次成功")
-            except Exception as e:
-                if self.verbose_log:
-                    self.log.warning(f"{room_name} 点赞第 {like_count} 次失败: {e}")
-            
-            # 每次间隔3秒（最后一次不需要等待）
-            if like_count < 30:
-                await asyncio.sleep(3)
-        
-        self.log.log(
-            "INFO",
-            f"{room_name} 点赞30次完成"
-        )
-        
-        # 等待5秒
-        await asyncio.sleep(5)
-
-    async def _watch_room_with_checks(self, medal: dict, position: int, total_candidates: int):
+    async def _get_medal_from_wall(self, target_id: int, refresh: bool = False):
+        if refresh:
+            self.api.invalidateMedalWall()
+        # 按 target_id 索引取出原始条目，只转换要找的那一个粉丝牌
+        item = await self.api.getMedalWallItem(target_id)
+        return self.api.convertMedalWallItem(item) if item is not None else None
+
+    async def _watch_room_with_checks(self, medal: Medal, position: int, total_candidates: int, resume: dict = None):
+        """
+        观看一个直播间的一个5分钟周期
+        :param resume: 检查点中保存的进度，传入时跳过进房，从上次的心跳序号继续
+        """
         import time
 
-        room_name = medal["anchor_info"]["nick_name"]
-        room_level = medal["medal"]["level"]
-        today_feed = medal["medal"]["today_feed"]
-        target_id = medal["medal"]["target_id"]
-        room_id = medal["room_info"]["room_id"]
+        room_name = medal.nick_name
+        room_level = medal.level
+        today_feed = medal.today_feed
+        target_id = medal.target_id
+        room_id = medal.room_id
 
-        self.log.log(
-            "INFO",
-            f"开始观看 {room_name}（等级{room_level}，当前亲密度{today_feed}）",
-        )
+        if resume is None:
+            self.log.log(
+                "INFO",
+                f"开始观看 {room_name}（等级{room_level}，当前亲密度{today_feed}）",
+            )
+        else:
+            self.log.log(
+                "INFO",
+                f"继续观看 {room_name}（从心跳#{resume['heart_num'] + 1}续传，本周期已发送{resume['cycle_heart_num']}个心跳）",
+            )
 
         heart_num = 0
         room_start_time = int(time.time())  # 每个5分钟周期的开始时间
@@ -402,18 +473,36 @@ class BiliUser:
         last_heartbeat_time = None  # 上次心跳的时间戳，用于计算增量时长
         entry_timestamp = None  # entryRoom 返回的时间戳，用于第一次心跳
         initial_intimacy = today_feed  # 记录初始亲密度，用于对比变化
+        if resume is not None:
+            heart_num = resume["heart_num"]
+            has_entered_room = True
+            heartbeat_interval = resume["heartbeat_interval"]
+            initial_intimacy = resume["initial_intimacy"]
 
         while True:
-            # 每5分钟重置观看开始时间和心跳计数
-            room_start_time = int(time.time())
-            cycle_heart_num = 0
-            last_heartbeat_time = None  # 重置上次心跳时间
-            entry_timestamp = None  # 重置 entryRoom 时间戳
-            self.log.debug(f"{room_name} 开始新的5分钟周期，重置观看开始时间: {room_start_time}")
+            first_index = 0
+            if resume is not None:
+                # 从检查点续传：沿用本周期的开始时间和心跳计数，按上次心跳时间计算下一次心跳
+                room_start_time = int(resume["cycle_started"])
+                cycle_heart_num = first_index = resume["cycle_heart_num"]
+                last_heartbeat_time = int(resume["last_heartbeat"])
+                entry_timestamp = None
+                resume = None
+                if first_index < 11:
+                    delay = last_heartbeat_time + heartbeat_interval - time.time()
+                    if delay > 0:
+                        await self.scheduler.sleep(delay)
+            else:
+                # 每5分钟重置观看开始时间和心跳计数
+                room_start_time = int(time.time())
+                cycle_heart_num = 0
+                last_heartbeat_time = None  # 重置上次心跳时间
+                entry_timestamp = None  # 重置 entryRoom 时间戳
+                self.log.debug(f"{room_name} 开始新的5分钟周期，重置观看开始时间: {room_start_time}")
             
             # 先观看 5 分钟（11 个心跳，每个 30 秒）
             # 使用更短的心跳间隔（30秒）来确保B站能正确累计观看时长
-            for heartbeat_index in range(11):  # 11个心跳，从0分钟0秒到5分钟0秒
+            for heartbeat_index in range(first_index, 11):  # 11个心跳，从0分钟0秒到5分钟0秒
                 heart_num += 1
                 cycle_heart_num += 1
                 seq_id = heart_num
@@ -423,7 +512,7 @@ class BiliUser:
                     # 第一次心跳前，先进入房间
                     if not has_entered_room:
                         try:
-                            entry_result = await self.api.entryRoom(room_id, target_id)
+                            entry_result = await self.api.entryRoom(room_id, target_id, deadline=heartbeat_interval)
                             has_entered_room = True
                             if self.verbose_log:
                                 self.log.info(f"{room_name} 已进入直播间，entryRoom响应: {entry_result}")
@@ -436,10 +525,12 @@ class BiliUser:
                             # 保存 entryRoom 返回的时间戳，用于第一次心跳
                             if isinstance(entry_result, dict) and 'timestamp' in entry_result:
                                 entry_timestamp = entry_result.get('timestamp')
-                            # 进入房间后稍等一下再发送心跳
-                            await asyncio.sleep(2)
+                        except CircuitOpenError:
+                            raise  # 域名已熔断，心跳也会立即失败，交给下面统一等待
                         except Exception as e:
                             self.log.warning(f"{room_name} 进入房间失败: {e}，继续尝试心跳")
+                        # 进入房间（无论成功与否）后稍等一下再发送心跳
+                        await asyncio.sleep(2)
                     
                     current_time = int(time.time())
                     
@@ -464,10 +555,23 @@ class BiliUser:
                         watch_time=watch_time,
                         start_timestamp=timestamp,
                         seq_id=seq_id,
+                        deadline=heartbeat_interval,
                     )
                     
                     # 心跳成功后，更新上次心跳时间
                     last_heartbeat_time = current_time
+                    self.metrics.heartbeats.inc(str(self.mid), "ok")
+                    self.checkpoint.save_session(
+                        self.mid,
+                        room_id,
+                        target_id=target_id,
+                        heart_num=heart_num,
+                        cycle_heart_num=cycle_heart_num,
+                        heartbeat_interval=heartbeat_interval,
+                        cycle_started=room_start_time,
+                        last_heartbeat=current_time,
+                        initial_intimacy=initial_intimacy,
+                    )
                     
                     # 尝试从心跳响应中更新heartbeat_interval
                     if isinstance(heartbeat_result, dict) and 'heartbeat_interval' in heartbeat_result:
@@ -486,8 +590,16 @@ class BiliUser:
                     self.log.info(
                         f"{room_name} 本周期已观看 {cycle_watched_str}"
                     )
+                except CircuitOpenError as e:
+                    # 熔断期间请求会立即失败，等到熔断结束再交给上层重新筛选，避免空转
+                    self.metrics.heartbeats.inc(str(self.mid), "error")
+                    self.log.warning(f"{room_name} 心跳#{seq_id} 暂停: {e}")
+                    self.checkpoint.drop_session(self.mid, room_id)
+                    await asyncio.sleep(e.retry_after)
+                    return None
                 except Exception as e:
                     # 记录详细上下文以便排查
+                    self.metrics.heartbeats.inc(str(self.mid), "error")
                     current_time_on_error = int(time.time())
                     if last_heartbeat_time is not None:
                         drift = current_time_on_error - last_heartbeat_time
@@ -501,11 +613,15 @@ class BiliUser:
                         f"now={current_time_on_error}, drift={drift}s"
                     )
                     # 如果心跳失败，返回None让上层重新获取列表
+                    self.checkpoint.drop_session(self.mid, room_id)
                     return None
                 
-                # 如果不是最后一次心跳，等待心跳间隔
+                # 如果不是最后一次心跳，等待心跳间隔（由全局调度器统一唤醒）
                 if not is_last_heartbeat:
-                    await asyncio.sleep(heartbeat_interval)
+                    lateness = await self.scheduler.sleep(heartbeat_interval)
+                    self.metrics.heartbeat_lateness.observe(str(self.mid), value=lateness)
+                    if lateness > 1:
+                        self.log.debug(f"{room_name} 心跳#{seq_id + 1} 迟到 {lateness:.2f}秒")
 
             # 5分钟周期结束，等待5秒后重新获取接口信息
             actual_watch_time = int(time.time()) - room_start_time
@@ -520,11 +636,13 @@ class BiliUser:
             
 
             try:
-                current_medal = await self._get_medal_from_wall(target_id)
+                # 周期结束后强制刷新一次 MedalWall，随后的重新筛选直接复用这份数据
+                current_medal = await self._get_medal_from_wall(target_id, refresh=True)
                 if current_medal:
-                    current_intimacy = current_medal.get("medal", {}).get("today_feed", 0)
+                    current_intimacy = current_medal.today_feed
                     intimacy_change = current_intimacy - initial_intimacy
                     if intimacy_change > 0:
+                        self.metrics.record_intimacy(self.mid, intimacy_change)
                         self.log.info(
                             f"{room_name} 本日亲密度变化: {initial_intimacy} -> {current_intimacy} (增加了 {intimacy_change})"
                         )
@@ -545,67 +663,123 @@ class BiliUser:
             
             
             # 5分钟周期结束，返回信号让上层重新筛选直播间
+            self.checkpoint.drop_session(self.mid, room_id)
             self.log.info(f"{room_name} 5分钟周期结束，重新筛选直播间")
             return "rescreen"
 
+    async def _watch_slot(
+        self, medal: Medal, position: int, total_candidates: int, switching: bool, resume: dict = None
+    ):
+        """
+        单个观看槽位：检查点亮状态后观看一个直播间的一个5分钟周期
+        每个槽位拥有独立的 entryRoom / 心跳状态，互不影响
+        从检查点续传时（resume）跳过等待和点亮检查
+        """
+        room_id = medal.room_id
+        target_id = medal.target_id
+        room_name = medal.nick_name
+
+        if resume is not None:
+            return await self._watch_room_with_checks(medal, position, total_candidates, resume=resume)
+
+        # 每次更换观看直播间时，等待10秒（第一次观看时不需要等待）
+        if switching:
+            self.log.info(f"更换观看直播间（切换到 {room_id}），等待10秒...")
+            await asyncio.sleep(10)
+
+        # 点亮状态一般已由 MedalWall 给出（熄灭的在筛选后已提交点亮），缺失时才单独查询
+        if medal.is_lighted is None:
+            try:
+                medal_info = await self.api.getUserMedalInfo(self.mid, target_id)
+                curr_show = medal_info.get("curr_show", {})
+                medal.is_lighted = curr_show.get("is_light", 1)  # 默认为1（已点亮），避免误判
+                self.log.debug(f"{room_name} 粉丝牌点亮状态: is_light={medal.is_lighted}")
+            except Exception as e:
+                self.log.warning(f"{room_name} 检查粉丝牌点亮状态失败: {e}，继续观看流程")
+        if medal.is_lighted == 0:
+            # 未点亮，交给后台点赞，不等待点亮完成就开始观看
+            self.relighter.submit(medal)
+
+        return await self._watch_room_with_checks(medal, position, total_candidates)
+
     async def watchinglive(self):
         watched_rooms = 0
         first_run = True
-        last_room_id = None  # 记录上一次观看的直播间ID
+        watching: Dict[int, asyncio.Task] = {}  # room_id -> 正在观看的槽位任务
+        last_room_ids = set()  # 上一轮观看的直播间ID
+        failures = 0  # 连续出错的槽位数，用于补位前退避
+        resume, self._resume = self._resume, None
 
-        while True:
-            # 根据配置决定是否打印详细信息
-            await self.getMedals(verbose=self.verbose_log and first_run, show_details=self.verbose_log and first_run)
-            first_run = False
-
-            if not self.medalsNeedDo:
-                # 没有需要观看的直播间，每5分钟重新请求接口并筛选一次
-                self.log.warning("当前没有在观看的直播，将在5分钟后重新请求接口并筛选...")
-                await asyncio.sleep(300)  # 等待5分钟（300秒）
-                # 继续循环，重新请求接口并筛选
-                continue
+        try:
+            while True:
+                if resume is None:
+                    # 根据配置决定是否打印详细信息
+                    await self.getMedals(verbose=self.verbose_log and first_run, show_details=self.verbose_log and first_run)
+                    self.checkpoint.save_screening(self.mid, self.uuids, self.medalsNeedDo)
+                    # MedalWall 已给出点亮状态，所有熄灭的候选粉丝牌一起在后台点亮
+                    for medal in self.medalsNeedDo:
+                        if medal.is_lighted == 0:
+                            self.relighter.submit(medal)
+                # 从检查点续传时直接使用上次的筛选结果
+                sessions = resume["sessions"] if resume else {}
+                resume = None
+                first_run = False
+
+                # 按优先级依次填满空闲槽位，已在观看的直播间不重复进入（同时观看数可热加载修改）
+                max_rooms = max(1, int(self.config.get("MAX_CONCURRENT_ROOMS", 1) or 1))
+                for medal in self.medalsNeedDo:
+                    if len(watching) >= max_rooms:
+                        break
+                    room_id = medal.room_id
+                    if room_id in watching:
+                        continue
+                    watched_rooms += 1
+                    switching = bool(last_room_ids) and room_id not in last_room_ids
+                    watching[room_id] = asyncio.create_task(
+                        self._watch_slot(
+                            medal, watched_rooms, len(self.medalsNeedDo), switching, resume=sessions.get(room_id)
+                        )
+                    )
 
-            # 有可观看的直播间，开始观看流程
-            current_medal = self.medalsNeedDo[0]
-            current_room_id = current_medal["room_info"]["room_id"]
-            current_target_id = current_medal["medal"]["target_id"]
-            room_name = current_medal["anchor_info"]["nick_name"]
-            
-            # 每次更换观看直播间时，等待10秒（第一次观看时不需要等待）
-            if last_room_id is not None and current_room_id != last_room_id:
-                self.log.info(f"更换观看直播间（从 {last_room_id} 切换到 {current_room_id}），等待10秒...")
-                await asyncio.sleep(10)
-            
-            # 在开始观看前，检查粉丝牌是否已点亮
-            try:
-                medal_info = await self.api.getUserMedalInfo(self.mid, current_target_id)
-                curr_show = medal_info.get("data", {}).get("curr_show", {})
-                is_light = curr_show.get("is_light", 1)  # 默认为1（已点亮），避免误判
-                
-                if is_light == 0:
-                    # 未点亮，执行点赞30次
-                    self.log.warning(f"{room_name} 粉丝牌未点亮，开始点赞30次...")
-                    await self._like_room_30_times(room_name, current_room_id, current_target_id)
-                else:
-                    self.log.debug(f"{room_name} 粉丝牌已点亮（is_light={is_light}）")
-            except Exception as e:
-                self.log.warning(f"{room_name} 检查粉丝牌点亮状态失败: {e}，继续观看流程")
-            
-            watched_rooms += 1
-            last_room_id = current_room_id  # 更新上一次观看的直播间ID
+                if not watching:
+                    # 没有需要观看的直播间，每5分钟重新请求接口并筛选一次
+                    self.log.warning("当前没有在观看的直播，将在5分钟后重新请求接口并筛选...")
+                    await asyncio.sleep(300)  # 等待5分钟（300秒）
+                    # 继续循环，重新请求接口并筛选
+                    continue
 
-            result = await self._watch_room_with_checks(current_medal, watched_rooms, len(self.medalsNeedDo))
-            
-            # 如果观看过程中出错（返回None），立即重新请求接口并筛选
-            if result is None:
-                self.log.warning("观看过程中出现错误，立即重新请求接口并筛选直播间")
-                continue
-            
-            # 5分钟周期结束，重新筛选直播间
-            if result == "rescreen":
-                self.log.info("5分钟周期结束，重新请求接口并筛选直播间")
-                # 重新请求接口并筛选，如果配置了VERBOSE_LOG，打印筛选结果统计（不打印详细检查信息）
-                await self.getMedals(verbose=self.verbose_log, show_details=False)
-                continue
+                self.metrics.active_rooms.set(str(self.mid), value=len(watching))
+                if max_rooms > 1:
+                    self.log.info(f"当前同时观看 {len(watching)}/{max_rooms} 个直播间")
+
+                # 任意一个槽位结束（周期结束或出错）后，重新筛选并补位
+                done, _ = await asyncio.wait(watching.values(), return_when=asyncio.FIRST_COMPLETED)
+                last_room_ids = set(watching.keys())
+                for room_id, task in list(watching.items()):
+                    if task not in done:
+                        continue
+                    del watching[room_id]
+                    self.metrics.active_rooms.set(str(self.mid), value=len(watching))
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        self.log.error(f"直播间 {room_id} 观看任务异常: {e}")
+                        result = None
+
+                    # 如果观看过程中出错（返回None），退避后重新请求接口并筛选
+                    if result is None:
+                        failures += 1
+                    # 5分钟周期结束，重新筛选直播间
+                    elif result == "rescreen":
+                        failures = 0
+                        self.log.info("5分钟周期结束，重新请求接口并筛选直播间")
+                if failures:
+                    backoff = min(SLOT_RETRY_BACKOFF_MAX, SLOT_RETRY_BACKOFF * 2 ** (failures - 1))
+                    self.log.warning(f"观看过程中出现错误，{backoff}秒后重新请求接口并筛选直播间")
+                    await asyncio.sleep(backoff)
+        finally:
+            for task in watching.values():
+                task.cancel()
+            await self.relighter.close()
 
         self.log.log("SUCCESS", f"观看直播任务完成，共尝试 {watched_rooms} 个直播间")
@@ -0,0 +1,62 @@
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from .config import get_base_dir, load_yaml
+
+DEFAULT_WEIGHT = 100
+
+# 权重表注册表：路径 -> (load_yaml 返回的解析结果, 编译后的 {target_id: weight})
+# load_yaml 在文件未修改时返回同一个对象，据此判断是否需要重新编译；同一文件的权重表由所有账号共享，只读使用
+_tables: Dict[str, Tuple[Any, Dict[int, int]]] = {}
+_EMPTY: Dict[int, int] = {}
+
+
+def _compile(data: Any, path: str) -> Dict[int, int]:
+    """把 {"主播UID": {"weight": 权重, ...}} 编译为 {主播UID: 权重}，只保留格式正确的条目"""
+    table: Dict[int, int] = {}
+    skipped = 0
+    for key, cfg in data.items():
+        try:
+            table[int(key)] = int((cfg or {}).get("weight", DEFAULT_WEIGHT))
+        except (TypeError, ValueError, AttributeError):
+            skipped += 1
+    if skipped:
+        logger.bind(user="粉丝牌权重").warning(f"{path} 中有 {skipped} 个条目格式错误，按默认权重处理")
+    return table
+
+
+def _load(path: str) -> Optional[Dict[int, int]]:
+    """文件不存在、读取失败或格式不对时返回 None"""
+    try:
+        data = load_yaml(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # 读取失败时不影响主流程, 只打日志
+        logger.bind(user="粉丝牌权重").warning(f"读取 {path} 失败: {e}")
+        return None
+    if data is not None and not isinstance(data, dict):
+        return None
+    cached = _tables.get(path)
+    if cached is not None and cached[0] is data:
+        return cached[1]
+    table = _compile(data or {}, path)  # 空文件视为没有配置任何权重
+    _tables[path] = (data, table)
+    return table
+
+
+def get_weight_table(mid: int = 0) -> Dict[int, int]:
+    """
+    获取账号使用的权重表 {主播UID: 权重}
+    优先使用 fansmedal_weight_{mid}.yaml，不存在或无法读取时使用通用的 fansmedal_weight.yaml
+    文件未修改时返回同一个对象，可以用 is 判断权重是否有变化
+    """
+    base_dir = get_base_dir()
+    if mid:
+        table = _load(os.path.join(base_dir, f"fansmedal_weight_{mid}.yaml"))
+        if table is not None:
+            return table
+    table = _load(os.path.join(base_dir, "fansmedal_weight.yaml"))
+    return _EMPTY if table is None else table
@@ -0,0 +1,36 @@
+import time
+
+from src.medal import Medal
+from src.prioritizer import YieldPrioritizer
+
+NOW = time.time()
+
+
+def rank(*medals):
+    return [medal.target_id for medal in YieldPrioritizer().rank(list(medals))]
+
+
+def test_nearly_capped_medal_ranks_first():
+    # 29/30 只要一个周期就能刷满，应排在 0/30 前面
+    assert rank(Medal(1, today_feed=0), Medal(2, today_feed=29)) == [2, 1]
+
+
+def test_capped_medal_ranks_last():
+    assert rank(Medal(1, today_feed=30), Medal(2, today_feed=0)) == [2, 1]
+
+
+def test_dark_medal_ranks_below_lit_medal():
+    assert rank(Medal(1, today_feed=12, is_lighted=0), Medal(2, today_feed=12, is_lighted=1)) == [2, 1]
+    # 点亮只多占一点时间，不会让差得多的亮牌排到差得少的暗牌前面
+    assert rank(Medal(1, today_feed=0, is_lighted=1), Medal(2, today_feed=29, is_lighted=0)) == [2, 1]
+
+
+def test_stream_ending_before_cap_ranks_below_cappable_one():
+    ending = Medal(1, today_feed=0, live_time=NOW - 170 * 60)  # 只剩约 15 分钟，刷不满
+    fresh = Medal(2, today_feed=0, live_time=NOW - 10 * 60)
+    assert rank(ending, fresh) == [2, 1]
+
+
+def test_weight_scales_score():
+    assert rank(Medal(1, today_feed=29, weight=10), Medal(2, today_feed=0, weight=100)) == [2, 1]
+    assert rank(Medal(1, today_feed=0, weight=0), Medal(2, today_feed=0)) == [2, 1]